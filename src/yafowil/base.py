@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+from collections import namedtuple
+from collections.abc import MutableMapping
+from contextvars import ContextVar
 from node.behaviors import Attributes
 from node.behaviors import DictStorage
 from node.behaviors import MappingAdopt
@@ -8,14 +11,25 @@ from node.behaviors import MappingOrder
 from node.behaviors import NodeAttributes
 from node.behaviors import OdictStorage
 from node.utils import UNSET
-from node.utils import instance_property
+from odict import odict
+from plumber import Behavior
+from plumber import plumb
 from plumber import plumbing
-from threading import RLock
+from yafowil.cache import FragmentCache
+from yafowil.cache import _definition_uid
+from yafowil.cache import fingerprint
+from yafowil.cache import get_fragment_cache
 from yafowil.compat import ITER_TYPES
 from yafowil.compat import STR_TYPE
 from yafowil.utils import Tag
+from yafowil.utils import _awaited_values
 from yafowil.utils import attr_value
+from yafowil.utils import callable_value
+import asyncio
 import copy
+import inspect
+import time
+import weakref
 import webresource as wr
 
 
@@ -28,11 +42,113 @@ def _dict__repr__(self):
     )
 
 
+def _translate_noop(msg):
+    return msg
+
+
 class RuntimeDataAttributes(NodeAttributes):
     __str__ = __repr__ = _dict__repr__
 
 
+class RuntimeDataErrors(list):
+    """Extraction errors of runtime data.
+
+    Keeps the error count of the runtime data and its parents up to date.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data, errors=()):
+        list.__init__(self, errors)
+        self._data = data
+
+    def __reduce__(self):
+        # copies are plain lists, they must not count errors on the runtime
+        # data of the original
+        return (list, (list(self),))
+
+    def _changed(self, previous):
+        self._data._count_errors(len(self) - previous)
+
+    def append(self, error):
+        list.append(self, error)
+        self._data._count_errors(1)
+
+    def extend(self, errors):
+        previous = len(self)
+        list.extend(self, errors)
+        self._changed(previous)
+
+    def insert(self, index, error):
+        list.insert(self, index, error)
+        self._data._count_errors(1)
+
+    def pop(self, *args):
+        error = list.pop(self, *args)
+        self._data._count_errors(-1)
+        return error
+
+    def remove(self, error):
+        list.remove(self, error)
+        self._data._count_errors(-1)
+
+    def clear(self):
+        previous = len(self)
+        list.clear(self)
+        self._changed(previous)
+
+    def __setitem__(self, index, value):
+        previous = len(self)
+        list.__setitem__(self, index, value)
+        self._changed(previous)
+
+    def __delitem__(self, index):
+        previous = len(self)
+        list.__delitem__(self, index)
+        self._changed(previous)
+
+    def __iadd__(self, errors):
+        self.extend(errors)
+        return self
+
+    def __imul__(self, count):
+        previous = len(self)
+        list.__imul__(self, count)
+        self._changed(previous)
+        return self
+
+
+def _index_data(index, path, data):
+    index[path] = data
+    for name, child in data.items():
+        _index_data(index, '{0}.{1}'.format(path, name), child)
+
+
+def _unindex_data(index, path, data):
+    index.pop(path, None)
+    for name, child in data.items():
+        _unindex_data(index, '{0}.{1}'.format(path, name), child)
+
+
+class RuntimeDataTree(Behavior):
+    """Update error count and path index of runtime data and its parents if
+    children get added or removed.
+    """
+
+    @plumb
+    def __setitem__(next_, self, key, value):
+        previous = self.storage.get(key)
+        next_(self, key, value)
+        self._child_changed(key, value, previous)
+
+    @plumb
+    def __delitem__(next_, self, key):
+        previous = self.storage[key]
+        next_(self, key)
+        self._child_changed(key, None, previous)
+
+
 @plumbing(
+    RuntimeDataTree,
     Attributes,
     MappingConstraints,
     MappingAdopt,
@@ -42,6 +158,11 @@ class RuntimeData(object):
     """Holds Runtime data of widget.
     """
     attributes_factory = RuntimeDataAttributes
+    # number of errors of self and children
+    _error_count = 0
+    _errors = ()
+    # runtime data by dotted path, built on root on first ``fetch``
+    _path_index = None
 
     def __init__(self,
                  name=None,
@@ -60,7 +181,12 @@ class RuntimeData(object):
         self.extracted = UNSET
         self.rendered = UNSET
         self.errors = list()
-        self.translate_callable = lambda msg: msg
+        self.translate_callable = _translate_noop
+        # locale used by ``translate_callable``, set by integrations which
+        # provide translations. Part of the key of prerendered markup.
+        self.locale = None
+        # flag whether only selected children have been extracted
+        self.partial = False
         self._persist = persist
         self._persist_target = persist_target
         self._persist_writer = persist_writer
@@ -95,33 +221,87 @@ class RuntimeData(object):
         if self._persist_writer is None and value is not None:
             self._persist_writer = value
 
-    @instance_property
+    @property
+    def errors(self):
+        return self._errors
+
+    @errors.setter
+    def errors(self, value):
+        previous = len(self._errors)
+        self._errors = RuntimeDataErrors(self, value)
+        self._count_errors(len(self._errors) - previous)
+
+    def _count_errors(self, count):
+        """Add count to error count of self and parents."""
+        if not count:
+            return
+        node = self
+        while node is not None:
+            node._error_count += count
+            node = node.__parent__
+
+    @property
     def has_errors(self):
         """Return ``True`` if extraction error occurred on self or children
         of self, otherwise ``False``.
         """
-        error = bool(self.errors)
-        if not error:
-            for child in self.values():
-                error = child.has_errors
-                if error:
-                    break
-        return error
+        return self._error_count > 0
+
+    def _child_changed(self, key, value, previous):
+        """Update error count and path index after child has been added,
+        replaced or removed.
+        """
+        count = value._error_count if value is not None else 0
+        if previous is not None:
+            count -= previous._error_count
+        self._count_errors(count)
+        root = self
+        while root.__parent__ is not None:
+            root = root.__parent__
+        index = root._path_index
+        if index is None:
+            return
+        path = '.'.join([str(name) for name in self.path] + [str(key)])
+        if previous is not None:
+            _unindex_data(index, path, previous)
+        if value is not None:
+            _index_data(index, path, value)
 
     @property
     def tag(self):
         return Tag(self.translate_callable)
 
     def fetch(self, path):
-        if isinstance(path, STR_TYPE):
-            path = path.split('.')
-        data = self.root
-        if path[0] != data.name:
-            raise KeyError('Invalid name of root element')
-        __traceback_info__ = 'fetch path: {0}'.format(path)
-        for key in path[1:]:
-            data = data[key]
-        return data
+        """Return runtime data by dotted path.
+
+        Runtime data is looked up in an index on the root runtime data, which
+        is created on first call and updated if children get added or
+        removed.
+
+        :param path: Dotted path as string or list of names, starting with
+            the name of the root runtime data.
+        """
+        if not isinstance(path, STR_TYPE):
+            path = '.'.join([str(name) for name in path])
+        root = self.root
+        index = root._path_index
+        if index is None:
+            index = root._path_index = dict()
+            _index_data(index, str(root.__name__), root)
+        try:
+            return index[path]
+        except KeyError:
+            if path.split('.')[0] != root.__name__:
+                raise KeyError('Invalid name of root element')
+            raise KeyError(path)
+
+    def fetch_many(self, paths):
+        """Return list of extracted values of runtime data by dotted paths.
+
+        :param paths: List of dotted paths. See ``fetch``.
+        """
+        fetch = self.fetch
+        return [fetch(path).extracted for path in paths]
 
     def write(self, model, writer=None, recursiv=True):
         if self.has_errors:
@@ -167,6 +347,173 @@ class RuntimeData(object):
         return repr(self)
 
 
+class CompactRuntimeData(MutableMapping):
+    """Lightweight runtime data of widget.
+
+    Provides the same API as ``RuntimeData`` but uses slots, a plain dict for
+    child data and creates ``attrs`` on demand. Arbitrary attributes cannot be
+    set on instances.
+
+    Select it for a widget tree by setting ``runtime_data_factory`` on the
+    root widget.
+    """
+    __slots__ = (
+        '__name__',
+        '__parent__',
+        '_children',
+        '_attrs',
+        '_errors',
+        '_error_count',
+        '_path_index',
+        '_persist',
+        '_persist_target',
+        '_persist_writer',
+        'request',
+        'value',
+        'mode',
+        'preprocessed',
+        'extracted',
+        'rendered',
+        'translate_callable',
+        'locale',
+        'partial',
+        'current_prefix',
+    )
+
+    def __init__(self,
+                 name=None,
+                 parent=None,
+                 request=UNSET,
+                 persist=None,
+                 persist_target=None,
+                 persist_writer=None):
+        self.__name__ = name
+        self.__parent__ = parent
+        self._children = dict()
+        self._attrs = None
+        self._errors = ()
+        self._error_count = 0
+        self._path_index = None
+        if parent is not None:
+            parent[name] = self
+        self.request = request
+        self.value = UNSET
+        self.mode = None
+        self.preprocessed = False
+        self.extracted = UNSET
+        self.rendered = UNSET
+        self.errors = list()
+        self.translate_callable = _translate_noop
+        self.locale = None
+        self.partial = False
+        self.current_prefix = ''
+        self._persist = persist
+        self._persist_target = persist_target
+        self._persist_writer = persist_writer
+
+    persist = RuntimeData.persist
+    persist_target = RuntimeData.persist_target
+    persist_writer = RuntimeData.persist_writer
+    errors = RuntimeData.errors
+    _count_errors = RuntimeData._count_errors
+    _child_changed = RuntimeData._child_changed
+    has_errors = RuntimeData.has_errors
+    tag = RuntimeData.tag
+    fetch = RuntimeData.fetch
+    fetch_many = RuntimeData.fetch_many
+    write = RuntimeData.write
+    noderepr = RuntimeData.noderepr
+    __str__ = __repr__ = RuntimeData.__repr__
+
+    # runtime data is identified by instance, not by contents
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __bool__(self):
+        return True
+
+    @property
+    def name(self):
+        return self.__name__
+
+    @property
+    def parent(self):
+        return self.__parent__
+
+    @property
+    def path(self):
+        path = list()
+        node = self
+        while node is not None:
+            path.append(node.__name__)
+            node = node.__parent__
+        path.reverse()
+        return path
+
+    @property
+    def root(self):
+        node = self
+        while node.__parent__ is not None:
+            node = node.__parent__
+        return node
+
+    @property
+    def attrs(self):
+        attrs = self._attrs
+        if attrs is None:
+            attrs = self._attrs = RuntimeDataAttributes(
+                name='__attrs__',
+                parent=self
+            )
+        return attrs
+
+    attributes = attrs
+
+    def __getitem__(self, key):
+        return self._children[key]
+
+    def __setitem__(self, key, value):
+        previous = self._children.get(key)
+        value.__name__ = key
+        value.__parent__ = self
+        self._children[key] = value
+        self._child_changed(key, value, previous)
+
+    def __delitem__(self, key):
+        previous = self._children.pop(key)
+        self._child_changed(key, None, previous)
+
+    def __iter__(self):
+        return iter(self._children)
+
+    def __len__(self):
+        return len(self._children)
+
+    def __contains__(self, key):
+        return key in self._children
+
+    def get(self, key, default=None):
+        return self._children.get(key, default)
+
+    def keys(self):
+        return list(self._children)
+
+    def values(self):
+        return list(self._children.values())
+
+    def items(self):
+        return list(self._children.items())
+
+    def treerepr(self, indent=0, prefix=' '):
+        res = '{}{}\n'.format(indent * prefix, self.noderepr)
+        for child in self._children.values():
+            res += child.treerepr(indent=indent + 2, prefix=prefix)
+        return res
+
+    def printtree(self):
+        print(self.treerepr())                               # pragma: no cover
+
+
 class ExtractionError(Exception):
     """Indicates problems on extraction time, such as conversion, validation
     or similar problems.
@@ -230,33 +577,299 @@ class TBSupplementWidget(object):
         return tag('p', 'yafowil widget processing info:', tag('ul', li))
 
 
+# Chain part names currently processed, mapped by widget id. Kept in a
+# context variable instead of on the widget, so the same widget tree can be
+# rendered and extracted by several threads or asyncio tasks concurrently.
+_chain_prefixes = ContextVar('yafowil_chain_prefixes', default={})
+
+
+def _enter_awaited_values():
+    """Provide mapping for awaited values in current context.
+
+    Return token for resetting the mapping via ``_awaited_values.reset`` if
+    no mapping has been provided yet, otherwise ``None``.
+    """
+    if _awaited_values.get() is not None:
+        return None
+    return _awaited_values.set(dict())
+
+
+def _enter_chain_part(widget, name):
+    """Set ``name`` as current prefix of ``widget`` in current context.
+
+    Return token for resetting the prefix via ``_chain_prefixes.reset``.
+    """
+    prefixes = dict(_chain_prefixes.get())
+    prefixes[id(widget)] = name
+    return _chain_prefixes.set(prefixes)
+
+
+def _path_child(widget, name, data):
+    """Return child of widget for runtime data with name.
+
+    Structural children are omitted in dotted paths and have no runtime data,
+    their children are searched instead.
+    """
+    child = widget.get(name)
+    if child is not None and not attr_value('structural', child, data):
+        return child
+    for child in widget.values():
+        if attr_value('structural', child, data):
+            found = _path_child(child, name, data)
+            if found is not None:
+                return found
+    return None
+
+
+class FactoryDefaults(dict):
+    """Factory defaults for widget attributes.
+
+    Counts modifications in ``version``, which is used to invalidate
+    resolved widget attributes.
+    """
+    version = 0
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.version += 1
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kw):
+        dict.update(self, *args, **kw)
+        self.version += 1
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *args):
+        self.version += 1
+        return dict.pop(self, key, *args)
+
+    def popitem(self):
+        self.version += 1
+        return dict.popitem(self)
+
+    def clear(self):
+        dict.clear(self)
+        self.version += 1
+
+
+# marker for not existing attributes in resolved attribute tables
+_missing = object()
+
+
 @plumbing(MappingNode, DictStorage)
 class WidgetAttributes(object):
+    """Widget attributes.
+
+    Attribute lookup considers the chain part currently processed on the
+    widget. Resolved values are kept per chain part until the attributes or
+    the defaults get modified.
+    """
 
     __str__ = __repr__ = _dict__repr__
 
     def __init__(self, name=None, parent=None):
         self.__name__ = name
         self.__parent__ = parent
+        self._resolved = dict()
+        self._resolved_defaults = None
+        self._resolved_version = None
+        self._shared = False
+
+    def __setitem__(self, name, value):
+        if self._shared:
+            self._unshare()
+        self.storage[name] = value
+        self._modified(name)
+
+    def __delitem__(self, name):
+        if self._shared:
+            self._unshare()
+        del self.storage[name]
+        self._modified(name)
+
+    def _share(self, parent):
+        """Return attributes for ``parent`` sharing the storage with self.
+
+        The storage gets copied by the first modification on either side.
+        """
+        attrs = self.__class__(name=self.__name__, parent=parent)
+        attrs._storage = self.storage
+        attrs._shared = self._shared = True
+        return attrs
+
+    def _unshare(self):
+        self._storage = dict(self._storage)
+        self._shared = False
+
+    def _modified(self, name):
+        self._resolved = dict()
+        widget = self.parent
+        widget._uid = _definition_uid()
+        widget._invalidate_tree()
 
     def __getitem__(self, name):
-        prefixed = '{0}.{1}'.format(self.parent.current_prefix, name)
+        widget = self.parent
+        prefix = widget.current_prefix
+        defaults = widget.defaults
+        version = getattr(defaults, 'version', None)
+        if version is None:
+            # defaults modifications not trackable, resolve uncached
+            value = self._resolve(prefix, name, defaults)
+        else:
+            if (
+                defaults is not self._resolved_defaults
+                or version != self._resolved_version
+            ):
+                self._resolved = dict()
+                self._resolved_defaults = defaults
+                self._resolved_version = version
+            resolved = self._resolved
+            try:
+                table = resolved[prefix]
+            except KeyError:
+                table = resolved[prefix] = dict()
+            try:
+                value = table[name]
+            except KeyError:
+                value = table[name] = self._resolve(prefix, name, defaults)
+        if value is _missing:
+            raise KeyError((
+                'Property with key "{0}" is not given on widget "{1}" '
+                '(no default)'
+            ).format(name, widget.dottedpath))
+        return value
+
+    def _resolve(self, prefix, name, defaults):
+        prefixed = '{0}.{1}'.format(prefix, name)
         storage = self.storage
         if prefixed in storage:
             return storage[prefixed]
         if name in storage:
             return storage[name]
-        defaults = self.parent.defaults
         if prefixed in defaults:
             return defaults[prefixed]
         if name in defaults:
             return defaults[name]
-        raise KeyError((
-            'Property with key "{0}" is not given on widget "{1}" (no default)'
-        ).format(name, self.parent.dottedpath))
+        return _missing
+
+
+class WidgetProperties(dict):
+    """Properties passed to widget on creation.
+
+    The ``structural`` property is read for computing the dotted path of
+    widgets, thus modifications invalidate the memoized dotted paths of the
+    widgets using the properties.
+    """
+
+    def __init__(self, *args, **kw):
+        super(WidgetProperties, self).__init__(*args, **kw)
+        self._widgets = weakref.WeakSet()
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def _modified(self):
+        for widget in list(self._widgets):
+            widget._invalidate_path()
+            widget._invalidate_tree()
+
+    def __setitem__(self, key, value):
+        super(WidgetProperties, self).__setitem__(key, value)
+        self._modified()
+
+    def __delitem__(self, key):
+        super(WidgetProperties, self).__delitem__(key)
+        self._modified()
+
+    def __ior__(self, other):
+        super(WidgetProperties, self).update(other)
+        self._modified()
+        return self
+
+    def clear(self):
+        super(WidgetProperties, self).clear()
+        self._modified()
+
+    def pop(self, *args):
+        value = super(WidgetProperties, self).pop(*args)
+        self._modified()
+        return value
+
+    def popitem(self):
+        item = super(WidgetProperties, self).popitem()
+        self._modified()
+        return item
+
+    def setdefault(self, key, default=None):
+        value = super(WidgetProperties, self).setdefault(key, default)
+        self._modified()
+        return value
+
+    def update(self, *args, **kw):
+        super(WidgetProperties, self).update(*args, **kw)
+        self._modified()
+
+
+# properties holding callbacks of actions, which are never called while
+# rendering. Callable values of these properties do not prevent
+# prerendering and are not awaited on asynchronous processing.
+PRERENDER_IGNORED_PROPS = ('handler', 'next')
+
+
+class TreeInvalidation(Behavior):
+    """Drop caches depending on the widget tree of widget and its parents if
+    children get added, removed or reordered.
+    """
+
+    @plumb
+    def __setitem__(next_, self, key, value):
+        next_(self, key, value)
+        self._invalidate_tree()
+
+    @plumb
+    def __delitem__(next_, self, key):
+        next_(self, key)
+        self._invalidate_tree()
+
+    @plumb
+    def swap(next_, self, node_a, node_b):
+        next_(self, node_a, node_b)
+        self._invalidate_tree()
+
+    @plumb
+    def movebefore(next_, self, movenode, refnode):
+        next_(self, movenode, refnode)
+        self._invalidate_tree()
+
+    @plumb
+    def moveafter(next_, self, movenode, refnode):
+        next_(self, movenode, refnode)
+        self._invalidate_tree()
+
+    @plumb
+    def movefirst(next_, self, movenode):
+        next_(self, movenode)
+        self._invalidate_tree()
+
+    @plumb
+    def movelast(next_, self, movenode):
+        next_(self, movenode)
+        self._invalidate_tree()
 
 
 @plumbing(
+    TreeInvalidation,
     Attributes,
     MappingConstraints,
     MappingAdopt,
@@ -267,6 +880,18 @@ class Widget(object):
     """Base Widget Class.
     """
     attributes_factory = WidgetAttributes
+    # runtime data class used for widget trees with this widget as root,
+    # either ``RuntimeData`` or ``CompactRuntimeData``
+    runtime_data_factory = RuntimeData
+    # profilers called after each chain part, shared with the factory which
+    # created the widget. See ``Factory.register_profiler``.
+    _profilers = ()
+    # prerendered markup of static widget trees by key and static flags by
+    # mode. See ``_prerender_key``.
+    _prerendered = None
+    _static = None
+    # actions of widget tree by request key, see ``yafowil.controller``
+    _action_index = None
 
     def __init__(self,
                  blueprints,
@@ -317,22 +942,275 @@ class Widget(object):
             ``skip``.  Default is ``edit`` Expects string or callable accepting
             two parameters  ``widget`` and ``data``.
         """
-        self.__name__ = uniquename
-        self.__parent__ = None
+        # nothing memoized yet, set attributes directly instead of using
+        # the invalidating property setters
+        self._dottedpath = None
+        self._cssids = dict()
+        self._adopt_properties(properties)
+        self._parent = None
+        self._name = uniquename
         self.blueprints = blueprints
-        self.getter = value_or_getter
-        self.mode = mode
+        self._getter = value_or_getter
+        self._mode = mode
         self.extractors = extractors
         self.edit_renderers = edit_renderers
         self.display_renderers = display_renderers
-        self.preprocessors = preprocessors or list()
+        self.preprocessors = preprocessors or ()
         self.defaults = defaults
-        self.current_prefix = ''
-        # keep properties for use in dottedpath to avoid recursion errors
-        self.properties = properties
-        self.attrs.update(properties)
+        self._uid = _definition_uid()
+        self.attrs.storage.update(properties)
         self.custom = custom
-        self._lock = RLock()
+
+    @property
+    def __name__(self):
+        return self._name
+
+    @__name__.setter
+    def __name__(self, value):
+        self._name = value
+        self._invalidate_path()
+        self._invalidate_tree()
+
+    @property
+    def __parent__(self):
+        return self._parent
+
+    @__parent__.setter
+    def __parent__(self, value):
+        self._parent = value
+        self._invalidate_path()
+        self._invalidate_tree()
+
+    @property
+    def getter(self):
+        return self._getter
+
+    @getter.setter
+    def getter(self, value):
+        self._getter = value
+        self._invalidate_tree()
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @mode.setter
+    def mode(self, value):
+        self._mode = value
+        self._invalidate_tree()
+
+    @property
+    def properties(self):
+        # keep properties for use in dottedpath to avoid recursion errors
+        return self._properties
+
+    @properties.setter
+    def properties(self, value):
+        self._adopt_properties(value)
+        self._invalidate_path()
+        self._invalidate_tree()
+
+    def _adopt_properties(self, properties):
+        if not isinstance(properties, WidgetProperties):
+            properties = WidgetProperties(properties)
+        properties._widgets.add(self)
+        self._properties = properties
+
+    def _invalidate_path(self):
+        """Drop memoized ``dottedpath``, css ids and caches depending on the
+        widget tree of self and children.
+        """
+        self._prerendered = self._static = self._action_index = None
+        if self._dottedpath is None:
+            # paths are memoized along with the paths of all parents, see
+            # ``_compute_dottedpath``. If self has no memoized path, children
+            # have none either
+            return
+        self._dottedpath = None
+        self._cssids = dict()
+        for child in self.values():
+            child._invalidate_path()
+
+    def _invalidate_tree(self):
+        """Drop caches depending on the widget tree of self and parents.
+
+        These are prerendered markup, static flags and the action index used
+        by ``yafowil.controller.Controller``.
+        """
+        node = self
+        while node is not None:
+            node._prerendered = node._static = node._action_index = None
+            node = node._parent
+
+    def _is_static(self, mode):
+        """Check whether widget tree renders the same markup on each call in
+        given mode.
+
+        Static widgets have no value, a constant mode and no extractors if
+        they have no children. All renderers declare the properties they use
+        via ``yafowil.utils.managedprops`` and none of these properties is
+        callable. All children are static and share the defaults.
+        """
+        static = self._static
+        if static is None:
+            static = self._static = dict()
+        try:
+            return static[mode]
+        except KeyError:
+            result = static[mode] = self._check_static(mode)
+            return result
+
+    def _check_static(self, mode):
+        if self.getter is not UNSET or callable(self.mode):
+            return False
+        if not len(self) and self.extractors:
+            return False
+        renderers = self.display_renderers if mode == 'display' \
+            else self.edit_renderers
+        if not renderers:
+            return False
+        attrs = self.attrs
+        defaults = self.defaults
+        for ren_name, renderer in renderers:
+            props = getattr(renderer, '__yafowil_managed_props__', None)
+            if props is None:
+                return False
+            for prop in props:
+                if prop in PRERENDER_IGNORED_PROPS:
+                    continue
+                if callable(attrs._resolve(ren_name, prop, defaults)):
+                    return False
+        for child in self.values():
+            if child.defaults is not self.defaults:
+                return False
+            child_mode = child.mode
+            if child_mode == 'skip':
+                continue
+            if not isinstance(child_mode, STR_TYPE):
+                return False
+            if not child._is_static(child_mode):
+                return False
+        return True
+
+    def _prerender_key(self, data):
+        """Return key of prerendered markup for runtime data or ``None`` if
+        markup cannot be prerendered.
+
+        Prerendering is enabled with the ``prerender`` property and includes
+        the children of the widget. Markup is prerendered per mode, locale,
+        theme, defaults version and extraction state of the root, which
+        decides about ``valid_class``.
+        """
+        if data.value is not UNSET or data.errors:
+            return None
+        prerender = self.attrs._resolve('', 'prerender', self.defaults)
+        if prerender is _missing or not callable_value(prerender, self, data):
+            return None
+        locale = data.locale
+        if locale is None and data.translate_callable is not _translate_noop:
+            return None
+        version = getattr(self.defaults, 'version', None)
+        if version is None:
+            return None
+        mode = data.mode
+        if not self._is_static(mode):
+            return None
+        valid = bool(data.root.extracted)
+        return (mode, locale, factory.theme, version, valid)
+
+    def _fragment_cache(self, data):
+        """Return ``(cache, key)`` for caching rendered markup in fragment
+        cache or ``None`` if widget is not cached.
+
+        See ``yafowil.cache``.
+        """
+        cache = self.attrs._resolve('', 'cache', self.defaults)
+        cache = callable_value(
+            None if cache is _missing else cache,
+            self,
+            data
+        )
+        if not isinstance(cache, FragmentCache):
+            if not cache:
+                return None
+            cache = get_fragment_cache()
+        locale = data.locale
+        if locale is None and data.translate_callable is not _translate_noop:
+            return None
+        version = getattr(self.defaults, 'version', None)
+        if version is None:
+            return None
+        value = data.extracted if data.extracted is not UNSET else data.value
+        value = fingerprint(value)
+        if value is None:
+            return None
+        key = (
+            self._uid,
+            self.dottedpath,
+            data.mode,
+            value,
+            locale,
+            data.has_errors,
+            factory.theme,
+            version
+        )
+        return cache, key
+
+    def clone(self):
+        """Create a copy of the widget tree, e.g. for processing a request.
+
+        The widget acts as prototype. Chains, defaults, properties and custom
+        chain part definitions are shared with the clone. Widget attributes
+        are shared until modified on either side. Getter, mode and children
+        are per clone. Builders are not executed again.
+
+        The prototype itself should not be rendered, ``compound_renderer``
+        delegates values to the getters of children.
+        """
+        # prerendered markup contains dotted paths, keep it for clones of
+        # root widgets only
+        return self._clone(None, self.parent is None)
+
+    def _clone(self, parent, prerendered):
+        cls = self.__class__
+        widget = cls.__new__(cls)
+        state = dict(self.__dict__)
+        state['_dottedpath'] = None
+        state['_cssids'] = dict()
+        state['_parent'] = parent
+        for name in ('_prerendered', '_static'):
+            value = self.__dict__.get(name)
+            state[name] = dict(value) if prerendered and value else None
+        state['_action_index'] = None
+        state['blueprints'] = list(self.blueprints)
+        # children storage and attributes as created by node behaviors,
+        # accessed directly since cloning large trees should be cheap
+        children = state.get('_storage', ())
+        storage = state['_storage'] = odict()
+        state['__attrs__'] = self.attrs._share(widget)
+        widget.__dict__.update(state)
+        widget._properties._widgets.add(widget)
+        for name in children:
+            storage[name] = children[name]._clone(widget, prerendered)
+        return widget
+
+    @property
+    def current_prefix(self):
+        """Name of the chain part currently processed on this widget.
+
+        The prefix is bound to the current execution context, it is not
+        visible to other threads or asyncio tasks processing this widget.
+        """
+        return _chain_prefixes.get().get(id(self), '')
+
+    @current_prefix.setter
+    def current_prefix(self, value):
+        prefixes = dict(_chain_prefixes.get())
+        if value:
+            prefixes[id(self)] = value
+        else:
+            prefixes.pop(id(self), None)
+        _chain_prefixes.set(prefixes)
 
     def __call__(self, data=None, request=None):
         """Renders the widget.
@@ -348,19 +1226,156 @@ class Widget(object):
             data. but extraction does not happen. call extract explicit before
             if needed.
         """
+        data = self._render_data(data, request)
+        if data.mode == 'skip':
+            data.rendered = u''
+            return data.rendered
+        key = self._prerender_key(data)
+        if key is not None:
+            prerendered = self._prerendered
+            if prerendered is None:
+                prerendered = self._prerendered = dict()
+            rendered = prerendered.get(key)
+            if rendered is not None:
+                data.rendered = rendered
+                return rendered
+        fragment = self._fragment_cache(data)
+        if fragment is not None:
+            rendered = fragment[0].get(fragment[1])
+            if rendered is not None:
+                data.rendered = rendered
+                return rendered
+        for ren_name, renderer in self._renderers(data):
+            token = _enter_chain_part(self, ren_name)
+            try:
+                __traceback_supplement__ = (
+                    TBSupplementWidget,
+                    self,
+                    renderer,
+                    'render',
+                    "failed at '{0}' in mode '{1}'".format(
+                        ren_name,
+                        data.mode
+                    )
+                )
+                if self._profilers:
+                    data.rendered = self._profile(
+                        ren_name,
+                        'render',
+                        renderer,
+                        data
+                    )
+                else:
+                    data.rendered = renderer(self, data)
+            finally:
+                _chain_prefixes.reset(token)
+        if key is not None:
+            self._prerendered[key] = data.rendered
+        if fragment is not None:
+            fragment[0].set(fragment[1], data.rendered)
+        return data.rendered
+
+    def iter_render(self, data=None, request=None):
+        """Renders the widget as iterator of markup fragments.
+
+        Fragments are yielded in document order, joined they are the same as
+        the result of calling the widget. Renderers providing a streaming
+        variant via ``yafowil.utils.stream_renderer`` yield their fragments
+        directly, for all other renderers the fragments of the previous
+        renderers get joined and set as ``data.rendered`` before calling them.
+
+        Runtime data gets created and preprocessed immediately, rendering
+        happens while consuming the returned iterator.
+
+        :param data: Runtime data. See ``__call__``.
+        :param request: Request. See ``__call__``.
+        """
+        data = self._render_data(data, request)
+        if data.mode == 'skip':
+            data.rendered = u''
+            return iter(())
+        key = self._prerender_key(data)
+        if key is not None and self._prerendered:
+            rendered = self._prerendered.get(key)
+            if rendered is not None:
+                data.rendered = rendered
+                return iter((rendered,))
+        fragment = self._fragment_cache(data)
+        if fragment is not None:
+            rendered = fragment[0].get(fragment[1])
+            if rendered is not None:
+                data.rendered = rendered
+                return iter((rendered,))
+        fragments = None
+        for ren_name, renderer in self._renderers(data):
+            stream = getattr(renderer, '__yafowil_stream_renderer__', None)
+            if stream is None:
+                fragments = self._iter_renderer(
+                    ren_name,
+                    renderer,
+                    data,
+                    fragments
+                )
+                continue
+            if fragments is None:
+                fragments = iter((data.rendered,) if data.rendered else ())
+            fragments = self._iter_stream(ren_name, stream, data, fragments)
+        return fragments
+
+    def render_path(self, path, data=None, request=None):
+        """Renders the widget at dotted path in context of this widget tree.
+
+        Only the addressed widget and its children get rendered. Names, css
+        ids and css classes are the same as if this widget gets rendered.
+
+        :param path: Dotted path of the widget to render, starting with the
+            dotted path of this widget.
+        :param data: Runtime data of this widget, e.g. as returned by
+            ``extract``. Missing runtime data of widgets on the way to the
+            addressed widget gets created and preprocessed.
+        :param request: Request. See ``__call__``.
+        """
+        data = self._render_data(data, request)
+        prefix = self.dottedpath
+        if path != prefix and not path.startswith(prefix + '.'):
+            raise KeyError(
+                'Path "{0}" not contained in widget "{1}"'.format(path, prefix)
+            )
+        names = path[len(prefix) + 1:].split('.') if path != prefix else []
+        widget = self
+        for name in names:
+            child = _path_child(widget, name, data)
+            if child is None:
+                raise KeyError('No widget for path "{0}"'.format(path))
+            # delegate value of compound, see ``compound_renderer``
+            value = data.value
+            if value is not UNSET and name in value and child.getter is UNSET:
+                child.getter = value[name]
+            subdata = data.get(name)
+            if subdata is None:
+                subdata = child._runpreprocessors(child._create_runtime_data(
+                    name=child.name,
+                    parent=data,
+                    request=data.request
+                ))
+            widget = child
+            data = subdata
+        return widget(data=data)
+
+    def _render_data(self, data, request):
         if data is not None and request is not None:
             raise ValueError("if data is passed in, don't pass in request!")
         if data is None:
             if request is None:
                 request = UNSET
-            data = self._runpreprocessors(RuntimeData(
+            data = self._runpreprocessors(self._create_runtime_data(
                 name=self.name,
                 request=request
             ))
-        if data.mode == 'skip':
-            data.rendered = u''
-            return data.rendered
-        elif data.mode == 'display':
+        return data
+
+    def _renderers(self, data):
+        if data.mode == 'display':
             renderers = self.display_renderers
         else:
             renderers = self.edit_renderers
@@ -371,39 +1386,107 @@ class Widget(object):
                     data.mode
                 )
             )
-        with self._lock:
+        return renderers
+
+    def _iter_renderer(self, ren_name, renderer, data, fragments):
+        if fragments is not None:
+            data.rendered = u''.join(fragments)
+        token = _enter_chain_part(self, ren_name)
+        try:
+            __traceback_supplement__ = (
+                TBSupplementWidget,
+                self,
+                renderer,
+                'render',
+                "failed at '{0}' in mode '{1}'".format(ren_name, data.mode)
+            )
+            if self._profilers:
+                data.rendered = self._profile(
+                    ren_name,
+                    'render',
+                    renderer,
+                    data
+                )
+            else:
+                data.rendered = renderer(self, data)
+        finally:
+            _chain_prefixes.reset(token)
+        yield data.rendered
+
+    def _iter_stream(self, ren_name, stream, data, fragments):
+        # enter chain part for each step of the stream only, the prefix must
+        # not leak to the consumer of the iterator.
+        __traceback_supplement__ = (
+            TBSupplementWidget,
+            self,
+            stream,
+            'render',
+            "failed at '{0}' in mode '{1}'".format(ren_name, data.mode)
+        )
+        profilers = self._profilers
+        duration = 0.
+        exception = None
+        try:
+            token = _enter_chain_part(self, ren_name)
+            start = time.perf_counter()
             try:
-                for ren_name, renderer in renderers:
-                    self.current_prefix = ren_name
-                    __traceback_supplement__ = (
-                        TBSupplementWidget,
-                        self,
-                        renderer,
-                        'render',
-                        "failed at '{0}' in mode '{1}'".format(
-                            ren_name,
-                            data.mode
-                        )
-                    )
-                    data.rendered = renderer(self, data)
+                iterator = iter(stream(self, data, fragments))
             finally:
-                self.current_prefix = ''
-        return data.rendered
+                duration += time.perf_counter() - start
+                _chain_prefixes.reset(token)
+            while True:
+                token = _enter_chain_part(self, ren_name)
+                start = time.perf_counter()
+                try:
+                    fragment = next(iterator, _missing)
+                finally:
+                    duration += time.perf_counter() - start
+                    _chain_prefixes.reset(token)
+                if fragment is _missing:
+                    break
+                yield fragment
+        except Exception as e:
+            exception = e
+            raise
+        finally:
+            if profilers:
+                self._notify_profilers(
+                    ren_name,
+                    'render',
+                    duration,
+                    exception
+                )
 
-    def extract(self, request, parent=None):
+    def extract(self, request, parent=None, paths=None):
         """Extract the data from the request by calling the given extractors.
 
         :param request: Expects a dict-like object
         :param parent: Parent data
+        :param paths: Optional list of dotted paths of widgets to extract. If
+            given, only the widgets at paths and their children get
+            extracted. Preprocessors of the widgets on the way to these
+            widgets are executed, but not their extractors. Runtime data of
+            these widgets gets flagged ``partial`` and contains only the
+            runtime data of the extracted children. Runtime data for all
+            other widgets is not created.
         """
-        data = self._runpreprocessors(RuntimeData(
+        data = self._runpreprocessors(
+            self._create_extraction_data(request, parent=parent)
+        )
+        return self._extract_data(data, request, paths=paths)
+
+    def _create_extraction_data(self, request, parent=None):
+        return self._create_runtime_data(
             name=self.name,
             parent=parent,
             request=request,
             persist=self.attrs.get('persist'),
             persist_target=self.attrs.get('persist_target'),
             persist_writer=self.attrs.get('persist_writer')
-        ))
+        )
+
+    def _extract_data(self, data, request, paths=None):
+        # extract preprocessed runtime data. see ``extract``
         # don't extract if skip mode
         if data.mode == 'skip':
             return data
@@ -416,44 +1499,111 @@ class Widget(object):
             # XXX: Use ``attr_value`` after signature change.
             if not self.attrs.get('display_proxy'):
                 return data
-        with self._lock:
+        if paths is not None:
+            selected = self._selected_children(data, paths)
+            if selected is not None:
+                for child, child_paths in selected:
+                    child.extract(request, parent=data, paths=child_paths)
+                data.partial = True
+                data.extracted = odict([
+                    (k, v.extracted) for k, v in data.items()
+                ])
+                return data
+        for ex_name, extractor in self.extractors:
+            token = _enter_chain_part(self, ex_name)
             try:
-                for ex_name, extractor in self.extractors:
-                    self.current_prefix = ex_name
-                    # update persistence settings for data node. necessary for
-                    # blueprint specific factory defaults to work.
-                    data.persist = self.attrs.get('persist')
-                    data.persist_target = self.attrs.get('persist_target')
-                    data.persist_writer = self.attrs.get('persist_writer')
-                    __traceback_supplement__ = (
-                        TBSupplementWidget,
-                        self,
-                        extractor,
-                        'extract',
-                        "failed at '{0}'".format(ex_name)
-                    )
-                    try:
+                # update persistence settings for data node. necessary for
+                # blueprint specific factory defaults to work.
+                data.persist = self.attrs.get('persist')
+                data.persist_target = self.attrs.get('persist_target')
+                data.persist_writer = self.attrs.get('persist_writer')
+                __traceback_supplement__ = (
+                    TBSupplementWidget,
+                    self,
+                    extractor,
+                    'extract',
+                    "failed at '{0}'".format(ex_name)
+                )
+                try:
+                    if self._profilers:
+                        data.extracted = self._profile(
+                            ex_name,
+                            'extract',
+                            extractor,
+                            data
+                        )
+                    else:
                         data.extracted = extractor(self, data)
-                    except ExtractionError as e:
-                        data.errors.append(e)
-                        if e.abort:
-                            break
+                except ExtractionError as e:
+                    data.errors.append(e)
+                    if e.abort:
+                        break
             finally:
-                self.current_prefix = ''
+                _chain_prefixes.reset(token)
         return data
 
+    def _selected_children(self, data, paths):
+        """Return list of ``(child, paths)`` tuples for partial extraction or
+        ``None`` if widget itself is selected by ``paths``.
+        """
+        path = self.dottedpath
+        prefix = path + '.'
+        selected = odict()
+        for selected_path in paths:
+            if selected_path == path or path.startswith(selected_path + '.'):
+                return None
+            if not selected_path.startswith(prefix):
+                raise KeyError(
+                    'Path "{0}" not contained in widget "{1}"'.format(
+                        selected_path,
+                        path
+                    )
+                )
+            name = selected_path[len(prefix):].split('.')[0]
+            child = _path_child(self, name, data)
+            if child is None:
+                raise KeyError(
+                    'No widget for path "{0}"'.format(selected_path)
+                )
+            if child.name in selected:
+                selected[child.name][1].append(selected_path)
+            else:
+                selected[child.name] = (child, [selected_path])
+        return list(selected.values())
+
     @property
     def dottedpath(self):
-        if self.path[0] is None:
-            raise ValueError('Root widget has no name! Pass it to factory.')
-        path = list()
-        node = self
-        while node is not None:
-            if not node.properties.get('structural'):
-                path.append(node.name)
-            node = node.parent
-        path.reverse()
-        return '.'.join(path)
+        """Dotted path of widget, structural widgets are omitted.
+
+        The path is memoized until the widget or one of its parents gets
+        renamed, re-parented or its ``structural`` property changes.
+        """
+        dottedpath = self._dottedpath
+        if dottedpath is None:
+            dottedpath = self._dottedpath = self._compute_dottedpath()
+        return dottedpath
+
+    def _compute_dottedpath(self):
+        structural = self.properties.get('structural')
+        parent = self._parent
+        if parent is None:
+            if self._name is None:
+                raise ValueError(
+                    'Root widget has no name! Pass it to factory.'
+                )
+            return '' if structural else self._name
+        # memoizes paths of parents
+        path = parent.dottedpath
+        if structural:
+            return path
+        return '{0}.{1}'.format(path, self._name) if path else self._name
+
+    def _create_runtime_data(self, parent=None, **kw):
+        # child data is of the same type as parent data, root data type is
+        # defined by root widget
+        if parent is not None:
+            return type(parent)(parent=parent, **kw)
+        return self.root.runtime_data_factory(**kw)
 
     def _runpreprocessors(self, data):
         __traceback_supplement__ = (
@@ -465,14 +1615,8 @@ class Widget(object):
         )
         if data.preprocessed:
             return data
-        if callable(self.getter):
-            data.value = self.getter(self, data)
-        else:
-            data.value = self.getter
-        if callable(self.mode):
-            data.mode = self.mode(self, data)
-        else:
-            data.mode = self.mode
+        data.value = callable_value(self.getter, self, data)
+        data.mode = callable_value(self.mode, self, data)
         if data.mode not in ('edit', 'display', 'skip'):
             raise ValueError(
                 "mode must be one out of 'edit', 'display', 'skip', but "
@@ -487,13 +1631,333 @@ class Widget(object):
                 'preprocessor',
                 "failed at '{0}'".format(pp_name)
             )
-            data = pp(self, data)
+            if self._profilers:
+                data = self._profile(pp_name, 'preprocess', pp, data)
+            else:
+                data = pp(self, data)
         data.current_prefix = ''
         data.preprocessed = True
         return data
 
+    def _profile(self, part, phase, func, data):
+        start = time.perf_counter()
+        exception = None
+        try:
+            return func(self, data)
+        except Exception as e:
+            exception = e
+            raise
+        finally:
+            self._notify_profilers(
+                part,
+                phase,
+                time.perf_counter() - start,
+                exception
+            )
+
+    async def _profile_async(self, part, phase, func, data):
+        start = time.perf_counter()
+        exception = None
+        try:
+            result = func(self, data)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        except Exception as e:
+            exception = e
+            raise
+        finally:
+            self._notify_profilers(
+                part,
+                phase,
+                time.perf_counter() - start,
+                exception
+            )
+
+    def _notify_profilers(self, part, phase, duration, exception):
+        try:
+            path = self.dottedpath
+        except ValueError:
+            # root widget without name
+            path = ''
+        for profiler in self._profilers:
+            profiler(path, part, phase, duration, exception)
+
+    async def extract_async(self, request, parent=None, paths=None):
+        """Asynchronously extract the data from the request.
+
+        Same as ``extract``, but coroutine function getters, modes and
+        property values of the widget get awaited before they are used, and
+        extractors returning awaitables get awaited. Extractors providing an
+        asynchronous variant via ``yafowil.utils.async_extractor`` are awaited
+        instead, ``compound_extractor`` this way extracts its children
+        concurrently.
+
+        :param request: Expects a dict-like object
+        :param parent: Parent data
+        :param paths: Optional list of dotted paths of widgets to extract.
+            See ``extract``.
+        """
+        token = _enter_awaited_values()
+        try:
+            data = await self._runpreprocessors_async(
+                self._create_runtime_data(
+                    name=self.name,
+                    parent=parent,
+                    request=request,
+                    persist=self.attrs.get('persist'),
+                    persist_target=self.attrs.get('persist_target'),
+                    persist_writer=self.attrs.get('persist_writer')
+                )
+            )
+            if data.mode == 'skip':
+                return data
+            if data.mode == 'display':
+                # XXX: Use ``attr_value`` after signature change.
+                if not self.attrs.get('display_proxy'):
+                    return data
+            if paths is not None:
+                selected = self._selected_children(data, paths)
+                if selected is not None:
+                    await asyncio.gather(*[
+                        child.extract_async(
+                            request,
+                            parent=data,
+                            paths=child_paths
+                        ) for child, child_paths in selected
+                    ])
+                    data.partial = True
+                    data.extracted = odict([
+                        (k, v.extracted) for k, v in data.items()
+                    ])
+                    return data
+            for ex_name, extractor in self.extractors:
+                ex_token = _enter_chain_part(self, ex_name)
+                try:
+                    data.persist = self.attrs.get('persist')
+                    data.persist_target = self.attrs.get('persist_target')
+                    data.persist_writer = self.attrs.get('persist_writer')
+                    __traceback_supplement__ = (
+                        TBSupplementWidget,
+                        self,
+                        extractor,
+                        'extract',
+                        "failed at '{0}'".format(ex_name)
+                    )
+                    extract = getattr(
+                        extractor,
+                        '__yafowil_async_extractor__',
+                        extractor
+                    )
+                    try:
+                        if self._profilers:
+                            data.extracted = await self._profile_async(
+                                ex_name,
+                                'extract',
+                                extract,
+                                data
+                            )
+                        else:
+                            extracted = extract(self, data)
+                            if inspect.isawaitable(extracted):
+                                extracted = await extracted
+                            data.extracted = extracted
+                    except ExtractionError as e:
+                        data.errors.append(e)
+                        if e.abort:
+                            break
+                finally:
+                    _chain_prefixes.reset(ex_token)
+            return data
+        finally:
+            if token is not None:
+                _awaited_values.reset(token)
+
+    async def render_async(self, data=None, request=None):
+        """Asynchronously render the widget.
+
+        Coroutine function getters, modes and property values of the widget
+        and its children get awaited concurrently, afterwards the widget tree
+        gets rendered. See ``__call__`` for the parameters.
+        """
+        if data is not None and request is not None:
+            raise ValueError("if data is passed in, don't pass in request!")
+        token = _enter_awaited_values()
+        try:
+            if data is None:
+                data = await self._runpreprocessors_async(
+                    self._create_runtime_data(
+                        name=self.name,
+                        request=UNSET if request is None else request
+                    )
+                )
+            await self._await_tree(data)
+            return self(data=data)
+        finally:
+            if token is not None:
+                _awaited_values.reset(token)
+
+    async def _runpreprocessors_async(self, data):
+        if not data.preprocessed:
+            await self._await_values(data, self.getter, self.mode)
+            data = self._runpreprocessors(data)
+        await self._await_values(data, *self._awaited_properties())
+        return data
+
+    def _awaited_properties(self):
+        """Return property values read by the chain, which might be coroutine
+        functions to await before processing the chain.
+
+        Callbacks of actions are never awaited. If all extractors and
+        renderers declare their managed properties, only values of these are
+        returned.
+        """
+        managed = set()
+        for _, part in (
+            tuple(self.extractors)
+            + tuple(self.edit_renderers)
+            + tuple(self.display_renderers)
+        ):
+            props = getattr(part, '__yafowil_managed_props__', None)
+            if props is None:
+                managed = None
+                break
+            managed.update(props)
+        values = list()
+        for key, value in self.properties.items():
+            name = key.rpartition('.')[2] if isinstance(key, STR_TYPE) \
+                else key
+            if name in PRERENDER_IGNORED_PROPS:
+                continue
+            if managed is not None and name not in managed:
+                continue
+            values.append(value)
+        return values
+
+    async def _await_values(self, data, *values):
+        awaited = _awaited_values.get()
+        values = dict([
+            (id(value), value) for value in values
+            if inspect.iscoroutinefunction(value)
+            and (id(value), id(self)) not in awaited
+        ])
+        if not values:
+            return
+        results = await asyncio.gather(*[
+            value(self, data) for value in values.values()
+        ])
+        for key, result in zip(values, results):
+            awaited[(key, id(self))] = result
+
+    async def _await_tree(self, data):
+        # children without runtime data get preprocessed while rendering,
+        # their values get awaited with not preprocessed runtime data.
+        values = self._awaited_properties()
+        if not data.preprocessed:
+            values += [self.getter, self.mode]
+        elif len(self):
+            # compound renderer delegates getter value to children
+            values.append(self.getter)
+        await self._await_values(data, *values)
+        subtrees = list()
+        for child in self.values():
+            if attr_value('structural', child, data):
+                subdata = data
+            else:
+                subdata = data.get(child.name)
+                if subdata is None:
+                    subdata = child._create_runtime_data(
+                        name=child.name,
+                        request=data.request
+                    )
+            subtrees.append(child._await_tree(subdata))
+        if subtrees:
+            await asyncio.gather(*subtrees)
+
+
+class StateOverlay(MutableMapping):
+    """Copy on write mapping on top of a base mapping.
+
+    Used for saving factory state. Values are read from the base mapping
+    until the key gets written or deleted on the overlay. Values are deep
+    copied on first access, so the base mapping is never modified.
+    """
+
+    def __init__(self, base):
+        self._base = base
+        self._data = dict()
+        self._deleted = set()
+        self._version = 0
+
+    @property
+    def version(self):
+        return self._version + getattr(self._base, 'version', 0)
+
+    def __getitem__(self, key):
+        try:
+            return self._data[key]
+        except KeyError:
+            if key in self._deleted:
+                raise
+        value = copy.deepcopy(self._base[key])
+        self._data[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._deleted.discard(key)
+        self._version += 1
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._data.pop(key, None)
+        self._deleted.add(key)
+        self._version += 1
+
+    def __contains__(self, key):
+        if key in self._data:
+            return True
+        return key not in self._deleted and key in self._base
+
+    def __iter__(self):
+        data = self._data
+        deleted = self._deleted
+        for key in self._base:
+            if key not in deleted:
+                yield key
+        for key in data:
+            if key not in self._base:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def copy(self):
+        return dict(self.items())
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self.items()), memo)
+
+
+ChainPlan = namedtuple('ChainPlan', [
+    'blueprints',
+    'macro_props',
+    'extractors',
+    'edit_renderers',
+    'display_renderers',
+    'preprocessors',
+    'builders',
+    # keep custom chain parts alive, cache key is their identity
+    'custom',
+])
+
 
 class Factory(object):
+    chain_cache_size = 1024
 
     def __init__(self):
         self._blueprints = dict()
@@ -501,30 +1965,82 @@ class Factory(object):
         self._macros = dict()
         self._themes = dict()
         self.theme = 'default'
-        self.defaults = dict()
+        self.defaults = FactoryDefaults()
         self.doc = {
             'props': dict(),
             'blueprint': dict(),
         }
         self._states = list()
+        self._chain_cache = dict()
+        self.chain_cache_hits = 0
+        self.chain_cache_misses = 0
+        self._profilers = list()
 
     def clear(self):
         states = self._states
+        profilers = self._profilers
         self.__init__()
         self._states = states
+        self._profilers = profilers
+
+    def register_profiler(self, profiler):
+        """Register a profiler for widgets created by this factory.
+
+        ``profiler`` is a callable which gets called after each chain part
+        has been processed with ``dottedpath``, ``part``, ``phase``,
+        ``duration`` and ``exception`` as arguments. ``part`` is the chain
+        part name, ``phase`` one out of ``preprocess``, ``extract`` and
+        ``render``, ``duration`` the processing time in seconds and
+        ``exception`` the exception raised by the chain part or ``None``.
+
+        Affects all widgets created by this factory, also the ones already
+        created. See ``yafowil.profiling.ProfileCollector``.
+        """
+        self._profilers.append(profiler)
+
+    def unregister_profiler(self, profiler):
+        """Unregister a profiler registered with ``register_profiler``.
+        """
+        self._profilers.remove(profiler)
+
+    def invalidate_chain_cache(self):
+        """Drop all cached blueprint chain plans.
+
+        Called automatically whenever blueprints, macros or global
+        preprocessors change. Call it explicitly after manipulating the
+        registry bypassing the registration API.
+        """
+        self._chain_cache.clear()
 
     def push_state(self):
+        """Save current registry state.
+
+        Subsequent modifications are written to copy on write overlays, thus
+        pushing state does not copy the registry.
+
+        Widgets keep the defaults object of the state they were created in.
+        Defaults modified after pushing state only affect widgets created
+        afterwards, and these widgets keep the modified defaults after
+        ``pop_state``.
+        """
         self._states.append(dict(
-            _blueprints=copy.deepcopy(self._blueprints),
-            _global_preprocessors=copy.deepcopy(self._global_preprocessors),
-            _macros=copy.deepcopy(self._macros),
-            _themes=copy.deepcopy(self._themes),
-            theme=copy.deepcopy(self.theme),
-            defaults=copy.deepcopy(self.defaults),
-            doc=copy.deepcopy(self.doc)
+            _blueprints=self._blueprints,
+            _global_preprocessors=self._global_preprocessors,
+            _macros=self._macros,
+            _themes=self._themes,
+            theme=self.theme,
+            defaults=self.defaults,
+            doc=self.doc
         ))
+        self._blueprints = StateOverlay(self._blueprints)
+        self._macros = StateOverlay(self._macros)
+        self._themes = StateOverlay(self._themes)
+        self.defaults = StateOverlay(self.defaults)
+        self.doc = StateOverlay(self.doc)
 
     def pop_state(self):
+        """Restore registry state saved by last ``push_state`` call.
+        """
         state = self._states.pop()
         self._blueprints = state['_blueprints']
         self._global_preprocessors = state['_global_preprocessors']
@@ -533,6 +2049,7 @@ class Factory(object):
         self.theme = state['theme']
         self.defaults = state['defaults']
         self.doc = state['doc']
+        self.invalidate_chain_cache()
 
     def _name_check(self, name):
         for chara in '*:#':
@@ -560,15 +2077,19 @@ class Factory(object):
             builders,
             display_renderers
         )
+        self.invalidate_chain_cache()
 
     def register_global_preprocessors(self, preprocessors):
-        self._global_preprocessors += preprocessors
+        # create new list, the current one might be saved by ``push_state``
+        self._global_preprocessors = self._global_preprocessors + preprocessors
+        self.invalidate_chain_cache()
 
     def register_macro(self, name, blueprints, props):
         self._name_check(name)
         if isinstance(blueprints, STR_TYPE):
             blueprints = blueprints.split(':')
         self._macros[name] = blueprints, props
+        self.invalidate_chain_cache()
 
     def register_theme(
         self,
@@ -697,6 +2218,76 @@ class Factory(object):
                 result.append(blueprint)
         return result, props
 
+    def _chain_plan(self, blueprints, custom):
+        """Return the ``ChainPlan`` for given blueprints and custom parts.
+
+        Plans are cached by blueprint definition and the identity of the
+        passed custom chain parts.
+        """
+        key = (
+            blueprints if isinstance(blueprints, STR_TYPE)
+            else tuple(blueprints),
+            tuple(sorted((k, id(v)) for k, v in custom.items()))
+        )
+        plan = self._chain_cache.get(key)
+        if plan is not None:
+            self.chain_cache_hits += 1
+            return plan
+        self.chain_cache_misses += 1
+        expanded, macro_props = self._expand_blueprints(blueprints, dict())
+        extractors = list()
+        edit_renderers = list()
+        disp_renderers = list()
+        preprocessors = [
+            ('__GLOBAL__', _) for _ in self._global_preprocessors
+        ]
+        builders = list()
+        parts = list()
+        for blueprint in expanded:
+            if blueprint.startswith('*'):
+                part_name = blueprint[1:]
+                if type(custom[part_name]) in ITER_TYPES:
+                    if len(custom[part_name]) < 5:
+                        # BBB:
+                        ex, eren, pre, bui = custom[part_name]
+                        dren = []
+                    else:
+                        ex, eren, pre, bui, dren = custom[part_name]
+                else:  # expect dict
+                    ex = custom[part_name].get('extractors', list())
+                    eren = custom[part_name].get('edit_renderers', list())
+                    pre = custom[part_name].get('preprocessors', list())
+                    bui = custom[part_name].get('builders', list())
+                    dren = custom[part_name].get('display_renderers', list())
+            else:
+                part_name = blueprint
+                ex, eren, pre, bui, dren = self._blueprints[part_name]
+            parts.append((part_name, ex, eren, dren))
+            preprocessors += [(part_name, _) for _ in pre]
+            builders += [(part_name, _) for _ in bui]
+        # outer blueprints wrap inner ones, thus extractors and renderers of
+        # the last blueprint in chain are executed first
+        for part_name, ex, eren, dren in reversed(parts):
+            extractors += [(part_name, _) for _ in ex]
+            edit_renderers += [(part_name, _) for _ in eren]
+            disp_renderers += [(part_name, _) for _ in dren]
+        cache = self._chain_cache
+        while len(cache) >= self.chain_cache_size:
+            # evict oldest plan, custom chain parts created per call would
+            # grow the cache unbounded otherwise
+            del cache[next(iter(cache))]
+        plan = cache[key] = ChainPlan(
+            blueprints=tuple(expanded),
+            macro_props=macro_props,
+            extractors=tuple(extractors),
+            edit_renderers=tuple(edit_renderers),
+            display_renderers=tuple(disp_renderers),
+            preprocessors=tuple(preprocessors),
+            builders=tuple(builders),
+            custom=tuple(custom.values())
+        )
+        return plan
+
     def __call__(
         self,
         blueprints,
@@ -742,43 +2333,18 @@ class Factory(object):
             returning one of 'edit', 'display', 'skip' or direct value.
             Defaults to 'edit'.
         """
-        extractors = list()
-        edit_renderers = list()
-        disp_renderers = list()
-        preprocessors = list()
-        builders = list()
-        blueprints, props = self._expand_blueprints(blueprints, props)
-        for blueprint in blueprints:
-            if blueprint.startswith('*'):
-                part_name = blueprint[1:]
-                if type(custom[part_name]) in ITER_TYPES:
-                    if len(custom[part_name]) < 5:
-                        # BBB:
-                        ex, eren, pre, bui = custom[part_name]
-                        dren = []
-                    else:
-                        ex, eren, pre, bui, dren = custom[part_name]
-                else:  # expect dict
-                    ex = custom[part_name].get('extractors', list())
-                    eren = custom[part_name].get('edit_renderers', list())
-                    pre = custom[part_name].get('preprocessors', list())
-                    bui = custom[part_name].get('builders', list())
-                    dren = custom[part_name].get('display_renderers', list())
-            else:
-                part_name = blueprint
-                ex, eren, pre, bui, dren = self._blueprints[part_name]
-            extractors = [(part_name, _) for _ in ex] + extractors
-            edit_renderers = [(part_name, _) for _ in eren] + edit_renderers
-            disp_renderers = [(part_name, _) for _ in dren] + disp_renderers
-            preprocessors = preprocessors + [(part_name, _) for _ in pre]
-            builders = builders + [(part_name, _) for _ in bui]
-        global_pre = [('__GLOBAL__', _) for _ in self._global_preprocessors]
+        plan = self._chain_plan(blueprints, custom)
+        if plan.macro_props:
+            # do not modify passed properties, they might be shared
+            props = dict(props)
+            for key, value in plan.macro_props.items():
+                props.setdefault(key, value)
         widget = Widget(
-            blueprints,
-            extractors,
-            edit_renderers,
-            disp_renderers,
-            global_pre + preprocessors,
+            list(plan.blueprints),
+            plan.extractors,
+            plan.edit_renderers,
+            plan.display_renderers,
+            plan.preprocessors,
             uniquename=name,
             value_or_getter=value,
             properties=props,
@@ -786,14 +2352,19 @@ class Factory(object):
             defaults=self.defaults,
             mode=mode
         )
-        for part_name, builder_func in builders:
-            widget.current_prefix = part_name
-            builder_func(widget, self)
-            widget.current_prefix = ''
+        widget._profilers = self._profilers
+        for part_name, builder_func in plan.builders:
+            token = _enter_chain_part(widget, part_name)
+            try:
+                builder_func(widget, self)
+            finally:
+                _chain_prefixes.reset(token)
         return widget
 
     def extractors(self, name):
-        return self._blueprints[name][0]
+        # copies are returned, registered lists must not be modified in
+        # place, cached chain plans would get stale
+        return list(self._blueprints[name][0])
 
     def renderers(self, name):
         raise RuntimeError(
@@ -801,16 +2372,16 @@ class Factory(object):
         )
 
     def edit_renderers(self, name):
-        return self._blueprints[name][1]
+        return list(self._blueprints[name][1])
 
     def display_renderers(self, name):
-        return self._blueprints[name][4]
+        return list(self._blueprints[name][4])
 
     def preprocessors(self, name):
         return self._global_preprocessors + self._blueprints[name][2]
 
     def builders(self, name):
-        return self._blueprints[name][3]
+        return list(self._blueprints[name][3])
 
 
 factory = Factory()
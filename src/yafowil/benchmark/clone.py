@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Widget clone benchmark.
+
+Compares building a form with the factory with cloning a prototype form via
+``Widget.clone``. Run with ``python -m yafowil.benchmark.clone``.
+"""
+from yafowil.benchmark.threads import create_form
+from yafowil.benchmark.utils import measure
+from yafowil.benchmark.utils import print_table
+import argparse
+
+
+def run(fields=300, iterations=20):
+    """Run widget clone benchmark.
+
+    :param fields: Number of fields in benchmarked form.
+    :param iterations: Number of iterations per benchmark.
+    :return: List of dicts with ``name`` and the timings as returned by
+        ``measure``.
+    """
+    prototype = create_form(fields)
+    benchmarks = [
+        ('rebuild', lambda: create_form(fields)),
+        ('clone', prototype.clone),
+    ]
+    results = list()
+    for name, func in benchmarks:
+        result = {'name': name}
+        result.update(measure(func, iterations))
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--fields', type=int, default=300)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args(argv)
+    results = run(fields=args.fields, iterations=args.iterations)
+    base = results[0]['min']
+    print_table(
+        [
+            ('benchmark', 's'),
+            ('min (ms)', '.3f'),
+            ('mean (ms)', '.3f'),
+            ('ratio', '.2f'),
+        ],
+        [(
+            result['name'],
+            result['min'] * 1e3,
+            result['mean'] * 1e3,
+            result['min'] / base
+        ) for result in results]
+    )
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
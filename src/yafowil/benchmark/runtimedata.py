@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Runtime data memory and allocation benchmark.
+
+Compares ``RuntimeData`` and ``CompactRuntimeData`` when extracting a form.
+Run with ``python -m yafowil.benchmark.runtimedata``.
+"""
+from yafowil.base import CompactRuntimeData
+from yafowil.base import RuntimeData
+from yafowil.benchmark.threads import create_form
+from yafowil.benchmark.threads import create_request
+from yafowil.benchmark.utils import measure
+from yafowil.benchmark.utils import print_table
+import argparse
+import gc
+import tracemalloc
+
+
+RUNTIME_DATA_FACTORIES = [
+    ('RuntimeData', RuntimeData),
+    ('CompactRuntimeData', CompactRuntimeData),
+]
+
+
+def measure_memory(form, request):
+    """Measure memory and number of memory blocks held by one extracted data
+    tree.
+    """
+    # warm up caches
+    form.extract(request)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        snapshot = tracemalloc.take_snapshot()
+        data = form.extract(request)
+        stats = tracemalloc.take_snapshot().compare_to(snapshot, 'filename')
+        memory = sum(stat.size_diff for stat in stats)
+        allocations = sum(stat.count_diff for stat in stats)
+        del data
+    finally:
+        tracemalloc.stop()
+    return memory, allocations
+
+
+def run(fields=500, iterations=20):
+    """Run runtime data benchmark.
+
+    :param fields: Number of fields in benchmarked form.
+    :param iterations: Number of timed extractions.
+    :return: List of dicts with ``name``, ``memory`` (bytes held by one data
+        tree), ``allocations`` (memory blocks held by one data tree) and the
+        extraction timings as returned by ``measure``.
+    """
+    form = create_form(fields)
+    request = create_request(fields)
+    results = list()
+    for name, runtime_data_factory in RUNTIME_DATA_FACTORIES:
+        form.runtime_data_factory = runtime_data_factory
+        memory, allocations = measure_memory(form, request)
+        result = {
+            'name': name,
+            'memory': memory,
+            'allocations': allocations,
+        }
+        result.update(measure(lambda: form.extract(request), iterations))
+        results.append(result)
+    del form.runtime_data_factory
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--fields', type=int, default=500)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args(argv)
+    results = run(fields=args.fields, iterations=args.iterations)
+    print_table(
+        [
+            ('runtime data', 's'),
+            ('memory (KiB)', '.1f'),
+            ('allocations', 'd'),
+            ('min (ms)', '.3f'),
+            ('mean (ms)', '.3f'),
+        ],
+        [(
+            result['name'],
+            result['memory'] / 1024.,
+            result['allocations'],
+            result['min'] * 1e3,
+            result['mean'] * 1e3
+        ) for result in results]
+    )
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Select rendering benchmark.
+
+Renders a multivalued select with a large vocabulary and many selected values
+in block and checkbox format. Run with ``python -m yafowil.benchmark.select``.
+"""
+from yafowil.base import factory
+from yafowil.benchmark.utils import measure
+from yafowil.benchmark.utils import print_table
+import argparse
+
+
+def create_select(options=10000, selected=1000, format='block'):
+    """Create multivalued select widget.
+
+    :param options: Number of vocabulary entries.
+    :param selected: Number of selected values. Every n-th option is selected.
+    :param format: Select format, either ``block`` or ``single``.
+    """
+    vocab = [
+        ('option_{0}'.format(i), 'Option {0}'.format(i))
+        for i in range(options)
+    ]
+    step = max(options // selected, 1) if selected else options + 1
+    value = [key for key, _ in vocab[::step]][:selected]
+    return factory(
+        'select',
+        name='select',
+        value=value,
+        props={
+            'vocabulary': vocab,
+            'multivalued': True,
+            'format': format,
+            'disabled': value[:len(value) // 2],
+        })
+
+
+def run(options=10000, selected=1000, iterations=5):
+    """Run select rendering benchmark.
+
+    :param options: Number of vocabulary entries.
+    :param selected: Number of selected values.
+    :param iterations: Number of iterations per benchmark.
+    :return: List of dicts with ``name`` and the timings as returned by
+        ``measure``.
+    """
+    benchmarks = [
+        ('block', create_select(options, selected, format='block')),
+        ('checkbox', create_select(options, selected, format='single')),
+    ]
+    results = list()
+    for name, widget in benchmarks:
+        result = {'name': name}
+        result.update(measure(widget, iterations))
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--options', type=int, default=10000)
+    parser.add_argument('--selected', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args(argv)
+    results = run(
+        options=args.options,
+        selected=args.selected,
+        iterations=args.iterations
+    )
+    print_table(
+        [('benchmark', 's'), ('min (ms)', '.3f'), ('mean (ms)', '.3f')],
+        [
+            (result['name'], result['min'] * 1e3, result['mean'] * 1e3)
+            for result in results
+        ]
+    )
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Factory state benchmark.
+
+Measures ``Factory.push_state`` and ``Factory.pop_state`` with the full
+``yafowil.loader`` registry loaded and compares it with deep copying the
+registry, which ``push_state`` did before using copy on write overlays. Run
+with ``python -m yafowil.benchmark.state``.
+"""
+from yafowil.base import factory
+from yafowil.benchmark.utils import measure
+from yafowil.benchmark.utils import print_table
+import argparse
+import copy
+
+
+def deepcopy_state():
+    return dict(
+        _blueprints=copy.deepcopy(factory._blueprints),
+        _global_preprocessors=copy.deepcopy(factory._global_preprocessors),
+        _macros=copy.deepcopy(factory._macros),
+        _themes=copy.deepcopy(factory._themes),
+        theme=copy.deepcopy(factory.theme),
+        defaults=copy.deepcopy(factory.defaults),
+        doc=copy.deepcopy(factory.doc)
+    )
+
+
+def push_pop():
+    factory.push_state()
+    factory.pop_state()
+
+
+def push_modify_pop():
+    factory.push_state()
+    factory.theme = 'benchmark'
+    factory.defaults['text.class'] = 'benchmark'
+    factory.doc['props']['text.class'] = 'Benchmark'
+    factory('text', name='text')()
+    factory.pop_state()
+
+
+BENCHMARKS = [
+    ('deepcopy registry', deepcopy_state),
+    ('push/pop', push_pop),
+    ('push/modify/pop', push_modify_pop),
+]
+
+
+def run(iterations=1000):
+    """Run factory state benchmark.
+
+    :param iterations: Number of iterations per benchmark.
+    :return: List of dicts with ``name`` and the timings as returned by
+        ``measure``.
+    """
+    results = list()
+    for name, func in BENCHMARKS:
+        result = {'name': name}
+        result.update(measure(func, iterations))
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=1000)
+    args = parser.parse_args(argv)
+    print_table(
+        [('benchmark', 's'), ('min (us)', '.1f'), ('mean (us)', '.1f')],
+        [
+            (result['name'], result['min'] * 1e6, result['mean'] * 1e6)
+            for result in run(iterations=args.iterations)
+        ]
+    )
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Benchmark suite.
+
+Times factory construction, rendering empty forms, extraction of valid and
+invalid requests and rendering after extraction for all forms returned by
+``yafowil.example.get_example`` and for synthetic forms with many fields.
+Results are written as JSON, two result files can be compared in order to
+detect regressions.
+
+Run with ``yafowil-benchmark run --output results.json`` and compare with
+``yafowil-benchmark compare before.json after.json``.
+"""
+from yafowil.base import factory
+from yafowil.benchmark.threads import create_form
+from yafowil.benchmark.utils import measure
+from yafowil.benchmark.utils import print_table
+from yafowil.utils import vocabulary
+import argparse
+import json
+import platform
+import sys
+import time
+
+
+# number of fields of synthetic forms
+SYNTHETIC_FIELDS = (1000, 10000)
+
+# request values by leaf blueprint
+VALID_VALUES = {
+    'email': 'benchmark@example.com',
+    'number': '1',
+    'url': 'http://example.com',
+}
+INVALID_VALUES = {
+    'email': 'invalid',
+    'number': 'invalid',
+    'url': 'invalid',
+}
+
+# blueprints rendering an exists marker
+EXISTS_MARKER_BLUEPRINTS = ('checkbox', 'select')
+
+
+def leaf_widgets(widget):
+    """Yield all widgets without children of widget tree.
+    """
+    if not len(widget):
+        yield widget
+        return
+    for child in widget.values():
+        yield from leaf_widgets(child)
+
+
+def create_request(widget, valid=True):
+    """Create request for all leaf widgets of widget tree.
+
+    :param widget: Root widget.
+    :param valid: Flag whether to create values passing validation. Invalid
+        values are empty or malformed.
+    :return: Request dict.
+    """
+    request = dict()
+    for leaf in leaf_widgets(widget):
+        blueprint = leaf.blueprints[-1]
+        if blueprint == 'file':
+            continue
+        path = leaf.dottedpath
+        if blueprint in EXISTS_MARKER_BLUEPRINTS:
+            request['{0}-exists'.format(path)] = 'exists'
+        if not valid:
+            request[path] = INVALID_VALUES.get(blueprint, '')
+        elif blueprint == 'select':
+            vocab = vocabulary(leaf.attrs.get('vocabulary', []))
+            request[path] = vocab[0][0] if vocab else ''
+        else:
+            request[path] = VALID_VALUES.get(blueprint, 'value')
+    return request
+
+
+def form_benchmarks(name, construct):
+    """Return list of ``(name, callable)`` tuples for form.
+
+    :param name: Name of the benchmarked form.
+    :param construct: Callable returning the form widget.
+    """
+    form = construct()
+    valid = create_request(form, valid=True)
+    invalid = create_request(form, valid=False)
+    extracted = form.extract(invalid)
+    return [
+        ('{0}.construct'.format(name), construct),
+        ('{0}.render_empty'.format(name), form),
+        ('{0}.extract_valid'.format(name), lambda: form.extract(valid)),
+        ('{0}.extract_invalid'.format(name), lambda: form.extract(invalid)),
+        ('{0}.render_extracted'.format(name), lambda: form(data=extracted)),
+    ]
+
+
+def _example_constructor(example):
+    return lambda: example()['widget']
+
+
+def run(iterations=100, synthetic_iterations=3, fields=SYNTHETIC_FIELDS,
+        select=None):
+    """Run benchmark suite.
+
+    :param iterations: Number of iterations per example form benchmark.
+    :param synthetic_iterations: Number of iterations per synthetic form
+        benchmark.
+    :param fields: Iterable of field counts of synthetic forms.
+    :param select: Optional substring, only benchmarks containing it in their
+        name are run.
+    :return: Dict with ``python`` version, ``created`` timestamp and
+        ``results`` mapping benchmark names to ``measure`` results.
+    """
+    from yafowil.example import EXAMPLES
+    factory.push_state()
+    try:
+        # examples use the field macro, which is provided by themes. register
+        # it in order to get comparable results independent of installed
+        # themes.
+        factory.register_macro('field', 'field:label:help:error', {})
+        benchmarks = list()
+        for example in EXAMPLES:
+            construct = _example_constructor(example)
+            benchmarks.append((
+                'example.{0}'.format(construct().name),
+                construct,
+                iterations
+            ))
+        for count in fields:
+            benchmarks.append((
+                'synthetic.{0}'.format(count),
+                lambda count=count: create_form(count),
+                synthetic_iterations
+            ))
+        results = dict()
+        for form_name, construct, count in benchmarks:
+            for name, func in form_benchmarks(form_name, construct):
+                if select and select not in name:
+                    continue
+                results[name] = measure(func, count)
+    finally:
+        factory.pop_state()
+    return {
+        'python': platform.python_version(),
+        'created': time.time(),
+        'results': results,
+    }
+
+
+def compare(before, after, threshold=0.1):
+    """Compare two benchmark results.
+
+    Minimum durations of benchmarks contained in both results are compared.
+
+    :param before: Result dict as returned by ``run``.
+    :param after: Result dict as returned by ``run``.
+    :param threshold: Relative slowdown considered as regression.
+    :return: List of dicts with ``name``, ``before`` and ``after`` duration,
+        relative ``change`` and ``regression`` flag, sorted by name.
+    """
+    comparison = list()
+    for name in sorted(set(before['results']) & set(after['results'])):
+        duration_before = before['results'][name]['min']
+        duration_after = after['results'][name]['min']
+        change = (duration_after - duration_before) / duration_before
+        comparison.append({
+            'name': name,
+            'before': duration_before,
+            'after': duration_after,
+            'change': change,
+            'regression': change > threshold,
+        })
+    return comparison
+
+
+def _run(args):
+    results = run(
+        iterations=args.iterations,
+        synthetic_iterations=args.synthetic_iterations,
+        fields=[int(_) for _ in args.fields.split(',') if _],
+        select=args.select
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        return 0
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+    return 0
+
+
+def _compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    comparison = compare(before, after, threshold=args.threshold)
+    print_table(
+        [
+            ('benchmark', 's'),
+            ('before (ms)', '.3f'),
+            ('after (ms)', '.3f'),
+            ('change', '+.1%'),
+            ('', 's'),
+        ],
+        [(
+            result['name'],
+            result['before'] * 1000,
+            result['after'] * 1000,
+            result['change'],
+            'REGRESSION' if result['regression'] else ''
+        ) for result in comparison]
+    )
+    return 1 if [_ for _ in comparison if _['regression']] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='Run benchmarks')
+    run_parser.add_argument('--iterations', type=int, default=100)
+    run_parser.add_argument('--synthetic-iterations', type=int, default=3)
+    run_parser.add_argument(
+        '--fields',
+        default=','.join([str(_) for _ in SYNTHETIC_FIELDS])
+    )
+    run_parser.add_argument('--select', default=None)
+    run_parser.add_argument('--output', default=None)
+    run_parser.set_defaults(func=_run)
+    compare_parser = subparsers.add_parser(
+        'compare',
+        help='Compare two benchmark results, exit with 1 on regression'
+    )
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+    compare_parser.set_defaults(func=_compare)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
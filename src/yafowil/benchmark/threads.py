@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Thread scaling benchmark.
+
+Extracts and renders one shared widget tree from an increasing number of
+threads. Run with ``python -m yafowil.benchmark.threads``.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from yafowil.base import factory
+from yafowil.benchmark.utils import measure
+from yafowil.benchmark.utils import print_table
+import argparse
+
+
+def create_form(fields):
+    form = factory('form', name='form', props={'action': 'benchmark'})
+    for index in range(fields):
+        form['field_{0}'.format(index)] = factory(
+            'field:label:error:text',
+            props={
+                'label': 'Field {0}'.format(index),
+                'required': True,
+            })
+    return form
+
+
+def create_request(fields):
+    return dict([
+        ('form.field_{0}'.format(index), 'Value {0}'.format(index))
+        for index in range(fields)
+    ])
+
+
+def process(form, request, iterations):
+    for _ in range(iterations):
+        form(data=form.extract(request))
+
+
+def process_parallel(executor, count, form, request, iterations):
+    futures = [
+        executor.submit(process, form, request, iterations)
+        for _ in range(count)
+    ]
+    for future in futures:
+        future.result()
+
+
+def run(fields=50, iterations=200, threads=(1, 2, 4, 8)):
+    """Run thread scaling benchmark.
+
+    :param fields: Number of fields in benchmarked form.
+    :param iterations: Number of extract and render cycles per thread count.
+    :param threads: Iterable of thread counts to benchmark.
+    :return: List of dicts with ``threads``, ``duration`` and ``throughput``
+        (cycles per second).
+    """
+    form = create_form(fields)
+    request = create_request(fields)
+    # warm up caches
+    process(form, request, 1)
+    results = list()
+    for count in threads:
+        per_thread = max(iterations // count, 1)
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            duration = measure(
+                lambda: process_parallel(
+                    executor, count, form, request, per_thread
+                ),
+                1
+            )['min']
+        results.append({
+            'threads': count,
+            'duration': duration,
+            'throughput': per_thread * count / duration,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--fields', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--threads', default='1,2,4,8')
+    args = parser.parse_args(argv)
+    threads = [int(_) for _ in args.threads.split(',')]
+    results = run(
+        fields=args.fields,
+        iterations=args.iterations,
+        threads=threads
+    )
+    base = results[0]['throughput']
+    print_table(
+        [
+            ('threads', 'd'),
+            ('duration (s)', '.3f'),
+            ('cycles/s', '.1f'),
+            ('scaling', '.2f'),
+        ],
+        [(
+            result['threads'],
+            result['duration'],
+            result['throughput'],
+            result['throughput'] / base
+        ) for result in results]
+    )
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
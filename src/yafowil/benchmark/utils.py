@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Helpers shared by benchmark modules.
+"""
+import importlib
+import time
+
+
+# benchmarks use the full blueprint registry
+importlib.import_module('yafowil.loader')
+
+
+def measure(func, iterations):
+    """Call ``func`` ``iterations`` times.
+
+    :return: Dict with ``iterations`` and ``min`` and ``mean`` duration of
+        one call in seconds.
+    """
+    timings = list()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'iterations': iterations,
+        'min': min(timings),
+        'mean': sum(timings) / iterations,
+    }
+
+
+def print_table(columns, rows):
+    """Print rows as table.
+
+    The first column is left aligned, all other columns are right aligned.
+
+    :param columns: List of ``(title, spec)`` tuples, where ``spec`` is the
+        format spec applied to the cell values of the column.
+    :param rows: List of row tuples.
+    """
+    lines = [[title for title, _ in columns]]
+    for row in rows:
+        lines.append([
+            format(value, spec) for value, (_, spec) in zip(row, columns)
+        ])
+    widths = [max([len(cell) for cell in column]) for column in zip(*lines)]
+    for line in lines:
+        cells = [line[0].ljust(widths[0])]
+        cells += [
+            cell.rjust(width) for cell, width in zip(line[1:], widths[1:])
+        ]
+        print('  '.join(cells).rstrip())
@@ -15,6 +15,11 @@ from yafowil.utils import managedprops
     'tag_type',
     'label',
     'class',
+    'class_add',
+    'title',
+    'data',
+    'autofocus',
+    'disabled',
     'action',
     'handler',
     'next',
@@ -106,6 +111,9 @@ Flag the submit field as disabled.
     'disabled',
     'class',
     'class_add',
+    'title',
+    'data',
+    'name',
     'accesskey')
 def button_renderer(widget, data):
     expression = attr_value('expression', widget, data)
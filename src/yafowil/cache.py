@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""Cache for rendered markup of widgets.
+
+Widgets opt in with the ``cache`` property. If ``True``, the markup is
+cached in the default fragment cache, alternatively a fragment cache instance
+can be passed::
+
+    >>> from yafowil.base import factory
+    >>> from yafowil.cache import FileFragmentCache
+    >>> from yafowil.cache import set_fragment_cache
+    >>> set_fragment_cache(FileFragmentCache('/tmp/fragments', ttl=60))
+    >>> widget = factory(
+    ...     'display_record',
+    ...     name='record',
+    ...     value={'title': 'Title', 'date': date(2025, 1, 1)},
+    ...     mode='display',
+    ...     props={'cache': True})
+
+Cached markup is keyed by the identity of the widget definition, dotted path,
+mode, value fingerprint, locale, error state, theme and factory defaults
+version. The definition identity is kept by clones and renewed if the widget
+attributes get modified. It is unique across processes, markup is shared
+between processes for widgets created before forking.
+
+Values are fingerprinted by ``fingerprint``, markup of widgets with values
+without stable fingerprint is not cached. Values of children are only
+considered if delegated by the value of the cached widget.
+"""
+from collections import OrderedDict
+from decimal import Decimal
+from node.utils import UNSET
+import datetime
+import hashlib
+import itertools
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+
+class FragmentCache(object):
+    """Base class of fragment caches."""
+
+    def get(self, key):
+        """Return cached markup for key or ``None``."""
+        raise NotImplementedError(
+            'Abstract ``FragmentCache`` does not implement ``get``'
+        )
+
+    def set(self, key, markup):
+        """Cache markup for key."""
+        raise NotImplementedError(
+            'Abstract ``FragmentCache`` does not implement ``set``'
+        )
+
+    def clear(self):
+        """Drop all cached markup."""
+        raise NotImplementedError(
+            'Abstract ``FragmentCache`` does not implement ``clear``'
+        )
+
+
+class LRUFragmentCache(FragmentCache):
+    """In process fragment cache.
+
+    Least recently used markup gets dropped if ``size`` is exceeded, markup
+    older than ``ttl`` seconds is dropped on access.
+    """
+
+    def __init__(self, size=1024, ttl=None):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                markup, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return markup
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, markup):
+        expires = None
+        if self.ttl is not None:
+            expires = time.monotonic() + self.ttl
+        with self._lock:
+            entries = self._entries
+            entries[key] = (markup, expires)
+            entries.move_to_end(key)
+            while len(entries) > self.size:
+                entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class FileFragmentCache(FragmentCache):
+    """File based fragment cache, which can be shared between processes.
+
+    Markup is written to one file per key in ``directory``, markup older
+    than ``ttl`` seconds is ignored and removed on access.
+    """
+
+    def __init__(self, directory, ttl=None):
+        self.directory = directory
+        self.ttl = ttl
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, '{0}.html'.format(name))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if (
+                self.ttl is not None
+                and os.path.getmtime(path) + self.ttl <= time.time()
+            ):
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return f.read().decode('utf-8')
+        except (IOError, OSError):
+            return None
+
+    def set(self, key, markup):
+        # write to temporary file and rename, readers in other processes
+        # must never see partially written markup
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(markup.encode('utf-8'))
+            os.replace(tmp, self._path(key))
+        except Exception:
+            os.remove(tmp)
+            raise
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.html'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except (IOError, OSError):
+                    pass
+
+
+_fragment_cache = LRUFragmentCache()
+
+
+def get_fragment_cache():
+    """Return default fragment cache."""
+    return _fragment_cache
+
+
+def set_fragment_cache(cache):
+    """Set default fragment cache used by widgets with ``cache=True``."""
+    global _fragment_cache
+    _fragment_cache = cache
+
+
+# values of these types have a ``repr`` reflecting their contents
+_fingerprint_types = (
+    str,
+    bytes,
+    int,
+    float,
+    Decimal,
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+    type(None),
+)
+
+
+def fingerprint(value):
+    """Return fingerprint of value for keying cached markup or ``None`` if
+    value has no stable fingerprint.
+
+    Strings, numbers, dates, ``None`` and ``UNSET`` are supported, as well as
+    lists, tuples, sets and dicts containing them.
+    """
+    if value is UNSET:
+        return 'UNSET'
+    if isinstance(value, _fingerprint_types):
+        return repr(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [fingerprint(item) for item in value]
+        if None in items:
+            return None
+    elif isinstance(value, dict):
+        pairs = [
+            (fingerprint(key), fingerprint(item))
+            for key, item in value.items()
+        ]
+        for pair in pairs:
+            if None in pair:
+                return None
+        items = ['{0}: {1}'.format(*pair) for pair in pairs]
+    else:
+        return None
+    if isinstance(value, (set, frozenset, dict)):
+        items = sorted(items)
+    return '{0}({1})'.format(type(value).__name__, ', '.join(items))
+
+
+# identities of widget definitions. The prefix is renewed in forked
+# processes, definitions created there must not collide with definitions of
+# other processes in shared fragment caches
+_uid_prefix = uuid.uuid4().hex
+_uid_counter = itertools.count()
+
+
+def _renew_uid_prefix():
+    global _uid_prefix
+    _uid_prefix = uuid.uuid4().hex
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_renew_uid_prefix)
+
+
+def _definition_uid():
+    """Return new identity of a widget definition."""
+    return (_uid_prefix, next(_uid_counter))
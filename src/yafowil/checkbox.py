@@ -96,14 +96,14 @@ def checkbox_display_renderer(widget, data):
         'class_': ' '.join([_ for _ in cssclasses if _ is not None])
     }
     if attr_value('display_proxy', widget, data):
-        widget.attrs['type'] = 'hidden'
         if fmt == 'string':
             input_attrs = input_attributes_common(widget, data, value=value)
+            input_attrs['type'] = 'hidden'
             content += data.tag('input', **input_attrs)
         elif bool(value):
             input_attrs = input_attributes_common(widget, data, value='')
+            input_attrs['type'] = 'hidden'
             content += data.tag('input', **input_attrs)
-        del widget.attrs['type']
         input_attrs = {
             'type': 'hidden',
             'value': 'checkboxexists',
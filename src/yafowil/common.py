@@ -62,6 +62,20 @@ factory.doc['props']['display_class'] = """\
 CSS-class to put on widgets in display mode.
 """
 
+factory.defaults['prerender'] = False
+factory.doc['props']['prerender'] = """\
+Flag whether markup of the widget and its children gets rendered once and
+reused afterwards if the widget tree is static. Only enable it for widget
+trees whose renderers declare all properties they use via ``managedprops``.
+"""
+
+factory.defaults['cache'] = None
+factory.doc['props']['cache'] = """\
+Cache rendered markup in fragment cache. If ``True``, the default fragment
+cache is used, alternatively a ``yafowil.cache.FragmentCache`` instance can be
+given. See ``yafowil.cache``.
+"""
+
 factory.defaults['autofocus'] = None
 factory.doc['props']['autofocus'] = """\
 Whether this field gets the focus automatically or not (if browser supports
@@ -231,13 +245,22 @@ def input_generic_renderer(widget, data, custom_attrs={}):
     return data.tag('input', **input_attrs)
 
 
+# attributes overriding input attributes of display proxies. widget
+# attributes must not be modified while rendering, widgets might get rendered
+# concurrently
+_hidden_proxy_attrs = {
+    'type': 'hidden',
+    'min': None,
+    'max': None,
+    'step': None,
+}
+
+
 # multivalued is not documented, because its only valid for specific blueprints
 @managedprops('display_proxy')
 def display_proxy_renderer(widget, data):
     rendered = data.rendered
     if attr_value('display_proxy', widget, data):
-        orgin_type = attr_value('type', widget, data)
-        widget.attrs['type'] = 'hidden'
         value = fetch_value(widget, data)
         multivalued = attr_value('multivalued', widget, data)
         if multivalued and isinstance(value, STR_TYPE):
@@ -245,13 +268,14 @@ def display_proxy_renderer(widget, data):
         if multivalued or type(value) in ITER_TYPES:
             for val in value:
                 input_attrs = input_attributes_full(widget, data, value=val)
+                input_attrs.update(_hidden_proxy_attrs)
                 rendered += data.tag('input', **input_attrs)
         else:
-            rendered += input_generic_renderer(widget, data)
-        if orgin_type:
-            widget.attrs['type'] = orgin_type
-        else:
-            del widget.attrs['type']
+            rendered += input_generic_renderer(
+                widget,
+                data,
+                custom_attrs=_hidden_proxy_attrs
+            )
     return rendered
 
 
@@ -3,45 +3,69 @@ from node.utils import UNSET
 from odict import odict
 from yafowil.base import factory
 from yafowil.utils import as_data_attrs
+from yafowil.utils import async_extractor
 from yafowil.utils import attr_value
+from yafowil.utils import callable_value
 from yafowil.utils import css_managed_props
 from yafowil.utils import cssclasses
 from yafowil.utils import cssid
 from yafowil.utils import managedprops
+from yafowil.utils import stream_renderer
+import asyncio
+import itertools
 
 
 ###############################################################################
 # compound
 ###############################################################################
 
-@managedprops('structural')
-def compound_extractor(widget, data):
-    """Delegates extraction to children.
+def _extraction_children(widget, data):
+    """Yield children of compound extracting data on their own.
     """
     for child in widget.values():
         # regular child widget, extract
         if not attr_value('structural', child, data):
-            child.extract(data.request, parent=data)
+            yield child
             continue
         # structural child widget, go one level deeper
         for subchild in child.values():
             # sub child widget may be structural as well
             structural = attr_value('structural', subchild, data)
-            # use compound extractor if sub child widget has children and is
-            # structural
+            # use children of sub child widget if sub child widget has
+            # children and is structural
             if len(subchild) and structural:
-                compound_extractor(subchild, data)
-            # call extract on sub child widget directly if not structural
+                yield from _extraction_children(subchild, data)
+            # extract sub child widget directly if not structural
             elif not structural:
-                subchild.extract(data.request, parent=data)
+                yield subchild
+
+
+async def compound_async_extractor(widget, data):
+    """Delegates extraction to children, which get extracted concurrently.
+    """
+    await asyncio.gather(*[
+        child.extract_async(data.request, parent=data)
+        for child in _extraction_children(widget, data)
+    ])
     return odict([(k, v.extracted) for k, v in data.items()])
 
 
-def compound_renderer(widget, data):
-    """Delegates rendering to children.
+@managedprops('structural')
+@async_extractor(compound_async_extractor)
+def compound_extractor(widget, data):
+    """Delegates extraction to children.
+    """
+    for child in _extraction_children(widget, data):
+        child.extract(data.request, parent=data)
+    return odict([(k, v.extracted) for k, v in data.items()])
+
+
+def _compound_children(widget, data):
+    """Yield ``(child, subdata)`` tuples for rendering children of compound.
+
+    ``subdata`` is ``None`` if no runtime data exists for child.
     """
     value = widget.getter
-    result = u''
     for childname in widget:
         child = widget[childname]
         if attr_value('structural', child, data):
@@ -50,27 +74,46 @@ def compound_renderer(widget, data):
                 child.getter = value
         else:
             subdata = data.get(childname, None)
-            if callable(value):
-                value = value(widget, data)
+            value = callable_value(value, widget, data)
             if value is not UNSET and childname in value:
                 # XXX: if compound renderer is called multiple times on the
-                #      same widget within one form processing cycle
-                #      ``child.getter`` has been set, so the condition is True
-                #      and ``ValueError`` is raised. Think about widget
-                #      instance annotations to mark value delegation already
+                #      same widget with a different value, ``child.getter``
+                #      has been set, so the condition is True and
+                #      ``ValueError`` is raised. Think about widget instance
+                #      annotations to mark value delegation already
                 #      processed.
                 if child.getter is UNSET:
                     child.getter = value[childname]
-                else:
+                elif child.getter is not value[childname]:
                     raise ValueError(
                         u"Both compound and compound member "
                         u"provide a value for '{0}'".format(childname)
                     )
+        yield child, subdata
+
+
+def compound_stream_renderer(widget, data, fragments):
+    """Streams rendered children.
+    """
+    for child, subdata in _compound_children(widget, data):
+        if subdata is None:
+            yield from child.iter_render(request=data.request)
+        else:
+            yield from child.iter_render(data=subdata)
+
+
+@managedprops('structural')
+@stream_renderer(compound_stream_renderer)
+def compound_renderer(widget, data):
+    """Delegates rendering to children.
+    """
+    result = list()
+    for child, subdata in _compound_children(widget, data):
         if subdata is None:
-            result += child(request=data.request)
+            result.append(child(request=data.request))
         else:
-            result += child(data=subdata)
-    return result
+            result.append(child(data=subdata))
+    return u''.join(result)
 
 
 factory.register(
@@ -95,7 +138,14 @@ will not have an own runtime-data.
 # hybrid
 ###############################################################################
 
+async def hybrid_async_extractor(widget, data):
+    if len(widget) and not attr_value('leaf', widget, data):
+        return await compound_async_extractor(widget, data)
+    return data.extracted
+
+
 @managedprops('leaf')
+@async_extractor(hybrid_async_extractor)
 def hybrid_extractor(widget, data):
     """This extractor can be used if a blueprint can act as compound or leaf.
     """
@@ -104,7 +154,14 @@ def hybrid_extractor(widget, data):
     return data.extracted
 
 
+def hybrid_stream_renderer(widget, data, fragments):
+    if len(widget) and not attr_value('leaf', widget, data):
+        return compound_stream_renderer(widget, data, fragments)
+    return fragments
+
+
 @managedprops('leaf')
+@stream_renderer(hybrid_stream_renderer)
 def hybrid_renderer(widget, data):
     """This renderer can be used if a blueprint can act as compound or leaf.
     """
@@ -134,14 +191,23 @@ side effects due to multiple child rendering and extraction.
 # div
 ###############################################################################
 
-@managedprops('id', *css_managed_props)
-def div_renderer(widget, data):
+def _div_attrs(widget, data):
     attrs = {
         'id': attr_value('id', widget, data),
         'class_': cssclasses(widget, data)
     }
     attrs.update(as_data_attrs(attr_value('data', widget, data)))
-    return data.tag('div', data.rendered, **attrs)
+    return attrs
+
+
+def div_stream_renderer(widget, data, fragments):
+    return data.tag.stream('div', fragments, **_div_attrs(widget, data))
+
+
+@managedprops('id', *css_managed_props)
+@stream_renderer(div_stream_renderer)
+def div_renderer(widget, data):
+    return data.tag('div', data.rendered, **_div_attrs(widget, data))
 
 
 factory.register(
@@ -182,17 +248,32 @@ Dict containing data attributes for div tag.
 # fieldset
 ###############################################################################
 
-@managedprops('legend', *css_managed_props)
-def fieldset_renderer(widget, data):
-    fs_attrs = {
+def _fieldset_attrs(widget, data):
+    return {
         'id': cssid(widget, 'fieldset'),
         'class_': cssclasses(widget, data)
     }
+
+
+def fieldset_stream_renderer(widget, data, fragments):
+    legend = attr_value('legend', widget, data)
+    if legend:
+        fragments = itertools.chain((data.tag('legend', legend),), fragments)
+    return data.tag.stream(
+        'fieldset',
+        fragments,
+        **_fieldset_attrs(widget, data)
+    )
+
+
+@managedprops('legend', *css_managed_props)
+@stream_renderer(fieldset_stream_renderer)
+def fieldset_renderer(widget, data):
     rendered = data.rendered
     legend = attr_value('legend', widget, data)
     if legend:
         rendered = data.tag('legend', legend) + rendered
-    return data.tag('fieldset', rendered, **fs_attrs)
+    return data.tag('fieldset', rendered, **_fieldset_attrs(widget, data))
 
 
 factory.register(
@@ -223,8 +304,7 @@ factory.defaults['fieldset.class'] = None
 # form
 ###############################################################################
 
-@managedprops('action', 'method', 'enctype', 'novalidate', *css_managed_props)
-def form_edit_renderer(widget, data):
+def _form_attrs(widget, data):
     method = attr_value('method', widget, data)
     enctype = method == 'post' and attr_value('enctype', widget, data) or None
     noval = attr_value('novalidate', widget, data) and 'novalidate' or None
@@ -237,9 +317,24 @@ def form_edit_renderer(widget, data):
         'id': 'form-{0}'.format('-'.join(widget.path)),
     }
     form_attrs.update(as_data_attrs(attr_value('data', widget, data)))
-    return data.tag('form', data.rendered, **form_attrs)
+    return form_attrs
+
+
+def form_edit_stream_renderer(widget, data, fragments):
+    return data.tag.stream('form', fragments, **_form_attrs(widget, data))
+
+
+@managedprops('action', 'method', 'enctype', 'novalidate', *css_managed_props)
+@stream_renderer(form_edit_stream_renderer)
+def form_edit_renderer(widget, data):
+    return data.tag('form', data.rendered, **_form_attrs(widget, data))
+
+
+def form_display_stream_renderer(widget, data, fragments):
+    return data.tag.stream('div', fragments)
 
 
+@stream_renderer(form_display_stream_renderer)
 def form_display_renderer(widget, data):
     return data.tag('div', data.rendered)
 
@@ -1,8 +1,34 @@
+def action_index(widget):
+    """Return actions of widget tree by request key.
+
+    The index is a dict mapping ``action.<dottedpath>`` request keys to
+    ``(position, action)`` tuples, where position is the index of the action
+    in tree order. It is kept on the widget until the widget tree gets
+    modified.
+    """
+    version = getattr(widget.defaults, 'version', None)
+    cached = widget._action_index
+    if cached is not None and version is not None and cached[0] == version:
+        return cached[1]
+    index = dict()
+
+    def collect_actions(level):
+        for child in level.values():
+            if child.attrs.get('action'):
+                key = 'action.{0}'.format(child.dottedpath)
+                index[key] = (len(index), child)
+            collect_actions(child)
+
+    collect_actions(widget)
+    widget._action_index = (version, index)
+    return index
+
+
 class Controller(object):
     """Form controller.
     """
 
-    def __init__(self, widget, request):
+    def __init__(self, widget, request, lazy=False):
         """Initialize controller
 
         ``widget``
@@ -10,22 +36,31 @@ class Controller(object):
 
         ``request``
             native request
+
+        ``lazy``
+            Flag whether to extract the widget tree only if an action not
+            skipping form processing gets triggered. Otherwise extraction
+            happens on first access of ``data``.
         """
         self.widget = widget
         self.performed = False
         self.error = False
         self.next = None
-        self.data = self.widget.extract(request)
-        self.request = self.data.request
-        self._error(self.data)
-        for action in self.actions:
-            if not self.triggered(action):
-                continue
+        self.request = request
+        self._data = None
+        self._preprocessed = None
+        if lazy:
+            self._preprocess()
+        else:
+            self._extract()
+        for action in self.triggered_actions:
             if action.attrs.get('skip'):
                 if action.attrs.get('next'):
                     self.next = action.attrs['next'](self.request)
                 return
             self.performed = True
+            if self._data is None:
+                self._extract()
             if self.error:
                 return
             if action.attrs.get('handler'):
@@ -33,6 +68,33 @@ class Controller(object):
             if action.attrs.get('next'):
                 self.next = action.attrs['next'](self.request)
 
+    @property
+    def data(self):
+        if self._data is None:
+            self._extract()
+        return self._data
+
+    def _preprocess(self):
+        # run preprocessors of root widget without extraction, they might
+        # convert the native request. preprocessed runtime data gets reused
+        # for extraction
+        widget = self.widget
+        data = widget._runpreprocessors(
+            widget._create_extraction_data(self.request)
+        )
+        self._preprocessed = data
+        self.request = data.request
+
+    def _extract(self):
+        data = self._preprocessed
+        if data is None:
+            self._data = self.widget.extract(self.request)
+        else:
+            self._preprocessed = None
+            self._data = self.widget._extract_data(data, self.request)
+        self.request = self._data.request
+        self._error(self._data)
+
     @property
     def rendered(self):
         if not self.performed:
@@ -41,24 +103,31 @@ class Controller(object):
 
     @property
     def actions(self):
-        result = []
+        return [action for _, action in action_index(self.widget).values()]
 
-        def collect_actions(level):
-            for widget in level.values():
-                if widget.attrs.get('action'):
-                    result.append(widget)
-                collect_actions(widget)
-
-        collect_actions(self.widget)
-        return result
+    @property
+    def triggered_actions(self):
+        """Actions triggered by request in tree order.
+        """
+        index = action_index(self.widget)
+        request = self.request
+        # scan the smaller one of request and action index
+        if isinstance(request, dict) and len(request) < len(index):
+            triggered = [
+                index[key] for key in request
+                if key in index and request[key] is not None
+            ]
+            triggered.sort(key=lambda item: item[0])
+        else:
+            triggered = [
+                item for key, item in index.items()
+                if request.get(key) is not None
+            ]
+        return [action for _, action in triggered]
 
     def triggered(self, action):
         action_name = 'action.{0}'.format(action.dottedpath)
         return self.request.get(action_name) is not None
 
     def _error(self, data):
-        if data.errors:
-            self.error = True
-            return
-        for subdata in data.values():
-            self._error(subdata)
+        self.error = data.has_errors
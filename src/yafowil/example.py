@@ -399,9 +399,11 @@ def fileupload():
     }
 
 
+EXAMPLES = [
+    plaintext, email, number, integer, password, url, textarea, radio,
+    dropdown, checkbox, block, single_checkbox, fileupload
+]
+
+
 def get_example():
-    return [
-        plaintext(), email(), number(), integer(), password(), url(),
-        textarea(), radio(), dropdown(), checkbox(), block(),
-        single_checkbox(), fileupload()
-    ]
+    return [example() for example in EXAMPLES]
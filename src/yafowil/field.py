@@ -50,7 +50,7 @@ Put the class given with this property on the div if an error happened.
 # label
 ###############################################################################
 
-@managedprops('position', 'label', 'for', *css_managed_props)
+@managedprops('position', 'label', 'for', 'title', *css_managed_props)
 def label_renderer(widget, data):
     tag = data.tag
     label_text = attr_value('label', widget, data, widget.name)
@@ -171,29 +171,24 @@ def file_options_renderer(widget, data):
         value = ['keep']
     radio_class = attr_value('radio_class', widget, data)
     radio_input_class = attr_value('radio_input_class', widget, data)
+    input_tag = tag.compile(
+        'input',
+        type='radio',
+        name_='{0}-action'.format(widget.dottedpath),
+        class_=(cssclasses(widget, data) and radio_input_class)
+        or cssclasses(widget, data) or radio_input_class
+    )
+    wrapper_tag = tag.compile('div', class_=radio_class or None)
     tags = []
     vocab = attr_value('vocabulary', widget, data, [])
     for key, term in vocabulary(vocab):
-        attrs = {
-            'type': 'radio',
-            'value': key,
-            'checked': (key in value) and 'checked' or None,
-            'name_': '{0}-action'.format(widget.dottedpath),
-            'id': cssid(widget, 'input', key),
-            'class_': (cssclasses(widget, data) and radio_input_class)
-                      or cssclasses(widget, data) or radio_input_class
-        }
-        taginput = tag('input', **attrs)
+        taginput = input_tag(
+            value=key,
+            checked=(key in value) and 'checked' or None,
+            id=cssid(widget, 'input', key)
+        )
         text = tag('span', term)
-        tags.append(tag(
-            'div',
-            taginput,
-            text,
-            **{
-                'id': cssid(widget, 'radio', key),
-                'class': radio_class or None
-            }
-        ))
+        tags.append(wrapper_tag(taginput, text, id=cssid(widget, 'radio', key)))
     return data.rendered + u''.join(tags)
 
 
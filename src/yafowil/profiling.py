@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Profiling of widget processing.
+
+Example::
+
+    >>> from yafowil.base import factory
+    >>> from yafowil.profiling import ProfileCollector
+    >>> collector = ProfileCollector()
+    >>> factory.register_profiler(collector)
+    >>> form(data=form.extract(request))
+    >>> factory.unregister_profiler(collector)
+    >>> print(collector.report())
+
+"""
+
+
+class ProfileStats(object):
+    """Aggregated timings of one profiled key."""
+
+    __slots__ = ('calls', 'errors', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.
+        self.min = None
+        self.max = 0.
+
+    def add(self, duration, exception):
+        self.calls += 1
+        if exception is not None:
+            self.errors += 1
+        self.total += duration
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+
+    @property
+    def mean(self):
+        return self.total / self.calls if self.calls else 0.
+
+
+class ProfileCollector(object):
+    """Profiler aggregating timings per chain part and per widget path.
+
+    Register it with ``Factory.register_profiler``. Durations of chain parts
+    include the processing time of child widgets processed inside, e.g. by
+    ``compound_renderer``.
+    """
+
+    def __init__(self):
+        # ``(phase, part)`` -> ``ProfileStats``
+        self.parts = dict()
+        # ``(phase, dottedpath)`` -> ``ProfileStats``
+        self.paths = dict()
+
+    def __call__(self, dottedpath, part, phase, duration, exception):
+        stats = self.parts.get((phase, part))
+        if stats is None:
+            stats = self.parts[(phase, part)] = ProfileStats()
+        stats.add(duration, exception)
+        stats = self.paths.get((phase, dottedpath))
+        if stats is None:
+            stats = self.paths[(phase, dottedpath)] = ProfileStats()
+        stats.add(duration, exception)
+
+    def clear(self):
+        self.parts.clear()
+        self.paths.clear()
+
+    def report(self, limit=None):
+        """Return report of collected timings as string.
+
+        Chain parts and widget paths are sorted by total duration.
+
+        :param limit: Maximum number of lines per section.
+        """
+        lines = list()
+        for title, stats in [
+            ('chain part', self.parts),
+            ('widget path', self.paths)
+        ]:
+            lines.append(
+                '{0:<10}  {1:<30}  {2:>7}  {3:>6}  {4:>10}  {5:>10}  '
+                '{6:>10}'.format(
+                    'phase', title, 'calls', 'errors',
+                    'total (ms)', 'mean (ms)', 'max (ms)'
+                )
+            )
+            items = sorted(
+                stats.items(),
+                key=lambda item: item[1].total,
+                reverse=True
+            )
+            for (phase, name), stat in items[:limit]:
+                lines.append(
+                    '{0:<10}  {1:<30}  {2:>7}  {3:>6}  {4:>10.3f}  '
+                    '{5:>10.3f}  {6:>10.3f}'.format(
+                        phase,
+                        name,
+                        stat.calls,
+                        stat.errors,
+                        stat.total * 1000,
+                        stat.mean * 1000,
+                        stat.max * 1000
+                    )
+                )
+            lines.append('')
+        return '\n'.join(lines)
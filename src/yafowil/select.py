@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 from node.utils import UNSET
+from yafowil.base import ExtractionError
+from yafowil.base import _translate_noop
 from yafowil.base import factory
 from yafowil.base import fetch_value
 from yafowil.common import display_proxy_renderer
@@ -13,21 +15,59 @@ from yafowil.datatypes import convert_value_to_datatype
 from yafowil.datatypes import convert_values_to_datatype
 from yafowil.datatypes import generic_datatype_extractor
 from yafowil.datatypes import generic_emptyvalue_extractor
+from yafowil.tsf import _
 from yafowil.utils import EMPTY_VALUE
 from yafowil.utils import as_data_attrs
 from yafowil.utils import attr_value
+from yafowil.utils import callable_value
 from yafowil.utils import css_managed_props
 from yafowil.utils import cssclasses
 from yafowil.utils import cssid
+from yafowil.utils import is_lazy_vocabulary
+from yafowil.utils import is_vocabulary_iterator
+from yafowil.utils import iter_vocabulary
 from yafowil.utils import managedprops
 from yafowil.utils import vocabulary
+import threading
+import weakref
 
 
 ###############################################################################
 # select
 ###############################################################################
 
-@managedprops('multivalued', 'disabled')
+def _lazy_vocabulary_key(widget, data, key):
+    datatype = widget.attrs.get('datatype', None)
+    if not datatype:
+        return key
+    emptyvalue = attr_value('emptyvalue', widget, data, EMPTY_VALUE)
+    return convert_value_to_datatype(key, datatype, empty_value=emptyvalue)
+
+
+def _validate_lazy_vocabulary(widget, data, vocab, extracted):
+    keys = extracted if isinstance(extracted, list) else [extracted]
+    for key in keys:
+        if key in [None, UNSET, '']:
+            continue
+        try:
+            key = _lazy_vocabulary_key(widget, data, key)
+        except (ValueError, UnicodeDecodeError, UnicodeEncodeError):
+            # conversion errors are reported by datatype extractor
+            continue
+        try:
+            vocab.term_for(key)
+        except KeyError:
+            raise ExtractionError(
+                attr_value('vocabulary_message', widget, data)
+            )
+
+
+@managedprops(
+    'multivalued',
+    'disabled',
+    'vocabulary',
+    'vocabulary_validate',
+    'vocabulary_message')
 def select_extractor(widget, data):
     extracted = generic_extractor(widget, data)
     multivalued = attr_value('multivalued', widget, data)
@@ -41,6 +81,15 @@ def select_extractor(widget, data):
         return extracted
     if multivalued and isinstance(extracted, STR_TYPE):
         extracted = [extracted]
+    # extracted keys are validated against lazy vocabularies only. callable
+    # vocabularies are resolved only if validation is enabled explicitly,
+    # they might be expensive
+    vocab = widget.attrs.get('vocabulary', None)
+    if callable(vocab) and not is_lazy_vocabulary(vocab):
+        if attr_value('vocabulary_validate', widget, data):
+            vocab = callable_value(vocab, widget, data)
+    if is_lazy_vocabulary(vocab):
+        _validate_lazy_vocabulary(widget, data, vocab, extracted)
     disabled = widget.attrs.get('disabled', False)
     if not disabled:
         return extracted
@@ -68,6 +117,44 @@ def select_exists_marker(widget, data):
     return tag('input', **attrs)
 
 
+class _Membership(object):
+    """Membership test for selected and disabled values.
+
+    Hashable values are looked up in a set, unhashable values fall back to
+    comparison one by one.
+    """
+    __slots__ = ('values', 'hashed', 'unhashed')
+
+    def __init__(self, values):
+        self.values = values
+        self.hashed = set()
+        self.unhashed = []
+        for value in values:
+            try:
+                self.hashed.add(value)
+            except TypeError:
+                self.unhashed.append(value)
+
+    def __contains__(self, value):
+        try:
+            if value in self.hashed:
+                return True
+        except TypeError:
+            return value in self.values
+        return value in self.unhashed
+
+
+def _membership(values):
+    # strings keep substring semantics of ``in``
+    if (
+        not values
+        or isinstance(values, STR_TYPE)
+        or not hasattr(values, '__iter__')
+    ):
+        return values
+    return _Membership(values)
+
+
 def select_edit_renderer_props(widget, data):
     value = fetch_value(widget, data)
     multivalued = attr_value('multivalued', widget, data)
@@ -83,12 +170,27 @@ def select_edit_renderer_props(widget, data):
     return value, multivalued, datatype, emptyvalue, disabled
 
 
-def select_block_edit_renderer(widget, data, custom_attrs={}):
-    value, multivalued, datatype, emptyvalue, disabled = \
-        select_edit_renderer_props(widget, data)
-    optiontags = []
-    vocab = attr_value('vocabulary', widget, data, [])
-    for key, term in vocabulary(vocab):
+# compiled options of block format selections by widget
+_compiled_options = weakref.WeakKeyDictionary()
+_compiled_options_lock = threading.Lock()
+
+
+def _option_markers(tag):
+    markers = dict(tag._attributes({
+        'disabled': 'disabled',
+        'selected': 'selected'
+    }))
+    return (
+        u' {0}'.format(markers['disabled']),
+        u' {0}'.format(markers['selected'])
+    )
+
+
+def _iter_options(widget, data, vocab, datatype, emptyvalue, markers):
+    tag = data.tag
+    disabled_marker, selected_marker = markers
+    start = len(u'<option') + len(disabled_marker)
+    for key, term in vocab:
         vval = key
         if datatype:
             vval = convert_value_to_datatype(
@@ -97,14 +199,129 @@ def select_block_edit_renderer(widget, data, custom_attrs={}):
                 empty_value=emptyvalue
             )
         key = '' if key in [None, UNSET] else key
-        attrs = {
-            'selected': 'selected' if vval in value else None,
-            'value': key,
-            'id': cssid(widget, 'input', key),
-        }
-        if disabled and disabled is not True and vval in disabled:
-            attrs['disabled'] = 'disabled'
-        optiontags.append(data.tag('option', term, **attrs))
+        markup = tag(
+            'option',
+            term,
+            disabled='disabled',
+            selected='selected',
+            value=key,
+            id=cssid(widget, 'input', key)
+        )
+        # attributes are rendered sorted by name, thus markup starts with
+        # disabled marker and selected marker follows the id attribute
+        index = markup.index(selected_marker, start)
+        yield (
+            vval,
+            markup[start:index],
+            markup[index + len(selected_marker):]
+        )
+
+
+def _compile_options(widget, data, vocab, datatype, emptyvalue):
+    markers = _option_markers(data.tag)
+    options = list(_iter_options(
+        widget,
+        data,
+        vocab,
+        datatype,
+        emptyvalue,
+        markers
+    ))
+    return markers, options
+
+
+def select_compiled_options(widget, data, vocab, datatype, emptyvalue):
+    """Return compiled option markup of block format selection.
+
+    Returns ``((disabled_marker, selected_marker), options)``, where options
+    is a list of ``(value, head, tail)`` tuples. Option markup is
+    ``<option``, followed by disabled marker if option is disabled, head,
+    selected marker if option is selected and tail.
+
+    Compiled options are cached per widget and locale as long as the
+    normalized vocabulary, datatype, emptyvalue and dotted path of the widget
+    are unchanged. See ``yafowil.utils.vocabulary`` for caching of
+    normalized vocabularies. If a translation callable is set without a
+    locale, options are not cached.
+    """
+    locale = data.locale
+    cacheable = locale is not None \
+        or data.translate_callable is _translate_noop
+    key = (datatype, emptyvalue, widget.dottedpath)
+    if cacheable:
+        entry = _compiled_options.get(widget, {}).get(locale)
+        if entry is not None and entry[0] is vocab and entry[1] == key:
+            return entry[2]
+    compiled = _compile_options(widget, data, vocab, datatype, emptyvalue)
+    if cacheable:
+        with _compiled_options_lock:
+            entries = _compiled_options.setdefault(widget, {})
+            entries[locale] = (vocab, key, compiled)
+    return compiled
+
+
+def select_vocabulary_page(widget, data, vocab, selected):
+    """Return list of ``(key, term)`` tuples to render for lazy vocabulary.
+
+    Contains the terms of selected keys followed by the first
+    ``vocabulary_limit`` terms of the vocabulary.
+    """
+    terms = []
+    for key in selected:
+        if key in [None, UNSET, EMPTY_VALUE]:
+            continue
+        try:
+            terms.append((key, vocab.term_for(key)))
+        except KeyError:
+            continue
+    selected = _membership([key for key, _ in terms])
+    limit = attr_value('vocabulary_limit', widget, data)
+    for key, term in vocab.search(limit=limit):
+        if key not in selected:
+            terms.append((key, term))
+    return terms
+
+
+def select_block_edit_renderer(widget, data, custom_attrs={}):
+    value, multivalued, datatype, emptyvalue, disabled = \
+        select_edit_renderer_props(widget, data)
+    vocab = attr_value('vocabulary', widget, data, [])
+    if is_lazy_vocabulary(vocab):
+        vocab = iter(select_vocabulary_page(widget, data, vocab, value))
+    elif is_vocabulary_iterator(vocab):
+        vocab = iter_vocabulary(vocab)
+    if is_vocabulary_iterator(vocab):
+        # options get rendered while consuming the vocabulary
+        markers = _option_markers(data.tag)
+        options = _iter_options(
+            widget,
+            data,
+            vocab,
+            datatype,
+            emptyvalue,
+            markers
+        )
+    else:
+        markers, options = select_compiled_options(
+            widget,
+            data,
+            vocabulary(vocab),
+            datatype,
+            emptyvalue
+        )
+    value, disabled = _membership(value), _membership(disabled)
+    disabled_marker, selected_marker = markers
+    check_disabled = disabled and disabled is not True
+    parts = []
+    for vval, head, tail in options:
+        parts.append(u'<option')
+        if check_disabled and vval in disabled:
+            parts.append(disabled_marker)
+        parts.append(head)
+        if vval in value:
+            parts.append(selected_marker)
+        parts.append(tail)
+    optiontags = [u''.join(parts)] if parts else []
     autofocus = \
         attr_value('autofocus', widget, data) and 'autofocus' or None
     required = attr_value('required', widget, data) and 'required' or None
@@ -128,12 +345,6 @@ def select_block_edit_renderer(widget, data, custom_attrs={}):
         optiontags = [' ']
     rendered = data.tag('select', *optiontags, **select_attrs)
     if multivalued:
-        attrs = {
-            'type': 'hidden',
-            'value': 'exists',
-            'name_': '{0}-exists'.format(widget.dottedpath),
-            'id': cssid(widget, 'exists'),
-        }
         rendered = select_exists_marker(widget, data) + rendered
     return rendered
 
@@ -141,6 +352,12 @@ def select_block_edit_renderer(widget, data, custom_attrs={}):
 def select_cb_edit_renderer(widget, data, custom_attrs={}):
     value, multivalued, datatype, emptyvalue, disabled = \
         select_edit_renderer_props(widget, data)
+    vocab = attr_value('vocabulary', widget, data, [])
+    if is_lazy_vocabulary(vocab):
+        vocab = select_vocabulary_page(widget, data, vocab, value)
+    else:
+        vocab = iter_vocabulary(vocab)
+    value, disabled = _membership(value), _membership(disabled)
     tags = []
     label_pos = attr_value('listing_label_position', widget, data)
     if label_pos == 'inner':
@@ -164,8 +381,15 @@ def select_cb_edit_renderer(widget, data, custom_attrs={}):
         # B/C deprecated as of yafowil 2.2
         if not label_class:
             label_class = attr_value('label_radio_class', widget, data)
-    vocab = attr_value('vocabulary', widget, data, [])
-    for key, term in vocabulary(vocab):
+    tag = data.tag
+    input_tag = tag.compile(
+        'input',
+        type=tagtype,
+        name_=widget.dottedpath,
+        class_=cssclasses(widget, data, additional=[input_class_additional])
+    )
+    item_wrapper_tag = tag.compile(item_tag, class_=wrapper_class)
+    for key, term in vocab:
         vval = key
         if datatype:
             vval = convert_value_to_datatype(
@@ -175,29 +399,18 @@ def select_cb_edit_renderer(widget, data, custom_attrs={}):
             )
         key = '' if key in [None, UNSET] else key
         input_attrs = {
-            'type': tagtype,
             'value': key,
             'checked': 'checked' if vval in value else None,
-            'name_': widget.dottedpath,
             'id': cssid(widget, 'input', key),
-            'class_': cssclasses(
-                widget,
-                data,
-                additional=[input_class_additional]
-            ),
         }
         if (disabled and disabled is not True and vval in disabled) \
            or disabled is True:
             input_attrs['disabled'] = 'disabled'
-        inputtag = data.tag('input', **input_attrs)
+        inputtag = input_tag(**input_attrs)
         label_attrs = dict(for_=input_attrs['id'], _class=label_class)
         item = generic_positional_rendering_helper(
-            'label', term, label_attrs, inputtag, label_pos, data.tag)
-        item_wrapper = data.tag(item_tag, item, **{
-            'id': cssid(widget, tagtype, key),
-            'class': wrapper_class,
-        })
-        tags.append(item_wrapper)
+            'label', term, label_attrs, inputtag, label_pos, tag)
+        tags.append(item_wrapper_tag(item, id=cssid(widget, tagtype, key)))
     wrapper_attrs = {
         'id': cssid(widget, tagtype, 'wrapper'),
         'class': cssclasses(widget, data, classattr='wrapper_class')
@@ -213,6 +426,7 @@ def select_cb_edit_renderer(widget, data, custom_attrs={}):
     'title',
     'format',
     'vocabulary',
+    'vocabulary_limit',
     'multivalued',
     'disabled',
     'listing_label_position',
@@ -240,6 +454,55 @@ def select_edit_renderer(widget, data, custom_attrs={}):
     return select_cb_edit_renderer(widget, data, custom_attrs=custom_attrs)
 
 
+def _display_keys(value):
+    if isinstance(value, STR_TYPE) or not hasattr(value, '__iter__'):
+        return [value]
+    return value
+
+
+def _lazy_display_terms(vocab, value):
+    # lookup terms of displayed keys only
+    terms = dict()
+    for key in _display_keys(value):
+        try:
+            terms[key] = vocab.term_for(key)
+        except (KeyError, TypeError):
+            continue
+    return terms
+
+
+def _mapping_display_terms(vocab, value):
+    # lookup terms of displayed keys only
+    terms = dict()
+    for key in _display_keys(value):
+        try:
+            terms[key] = vocab[key]
+        except (KeyError, TypeError):
+            continue
+    return terms
+
+
+def _stream_display_terms(entries, value):
+    # consume ``(key, term)`` entries until terms of all displayed keys are
+    # resolved
+    pending = set()
+    for key in _display_keys(value):
+        try:
+            pending.add(key)
+        except TypeError:
+            continue
+    terms = dict()
+    if not pending:
+        return terms
+    for key, term in entries:
+        if key in pending:
+            terms[key] = term
+            pending.discard(key)
+            if not pending:
+                break
+    return terms
+
+
 @managedprops('data', 'template', 'class', 'multivalued', 'empty_display_value')
 def select_display_renderer(widget, data):
     value = fetch_value(widget, data)
@@ -249,10 +512,19 @@ def select_display_renderer(widget, data):
             value = u''
     multivalued = attr_value('multivalued', widget, data)
     vocab = attr_value('vocabulary', widget, data, [])
-    # fallback for list of strings
-    if type(vocab) == list and all(isinstance(item, str) for item in vocab):
-        vocab = enumerate(vocab)
-    vocab = dict(vocab)
+    if is_lazy_vocabulary(vocab):
+        vocab = _lazy_display_terms(vocab, value)
+    elif is_vocabulary_iterator(vocab):
+        vocab = _stream_display_terms(iter_vocabulary(vocab), value)
+    elif hasattr(vocab, 'keys'):
+        vocab = _mapping_display_terms(vocab, value)
+    else:
+        # fallback for list of strings
+        if type(vocab) == list and all(
+            isinstance(item, str) for item in vocab
+        ):
+            vocab = enumerate(vocab)
+        vocab = _stream_display_terms(vocab, value)
     if not multivalued or not value:
         value = vocab.get(value, value)
         if not value:
@@ -271,12 +543,13 @@ def select_display_renderer(widget, data):
         'class_': ' '.join([_ for _ in cssclasses if _ is not None])
     }
     attrs.update(as_data_attrs(attr_value('data', widget, data)))
-    content = u''
     if multivalued and isinstance(value, STR_TYPE):
         value = [value]
-    for key in value:
-        content += data.tag('li', vocab.get(key, key),
-                            **{'class_': attr_value("display_item_class", widget, data)})
+    item_tag = data.tag.compile(
+        'li',
+        class_=attr_value('display_item_class', widget, data)
+    )
+    content = u''.join([item_tag(vocab.get(key, key)) for key in value])
     return data.tag('ul', content, **attrs)
 
 
@@ -400,6 +673,37 @@ Vocabulary to be used for the selection list. Expects a dict-like or an
 iterable or a callable which returns one of both first. An iterable can consist
 out of strings or out of tuples with ``(key, value)``. The items in the result
 list are in the same order like the vocabulary.
+
+Iterators like generators are consumed once while rendering, they are not
+cached. In display mode they are consumed until all displayed keys are
+resolved.
+
+Huge vocabularies can be passed as lazy vocabulary, see
+``yafowil.utils.LazyVocabulary``. Only the terms of selected keys and the
+first ``vocabulary_limit`` terms get rendered. Extracted keys are validated
+against a lazy vocabulary. If the lazy vocabulary is returned by a callable,
+keys are only validated if ``vocabulary_validate`` is set.
+"""
+
+factory.defaults['select.vocabulary_limit'] = 100
+factory.doc['props']['select.vocabulary_limit'] = """\
+Maximum number of terms rendered in addition to the selected terms if
+vocabulary is a lazy vocabulary.
+"""
+
+factory.defaults['select.vocabulary_validate'] = False
+factory.doc['props']['select.vocabulary_validate'] = """\
+Flag whether to call a callable vocabulary on extraction for validating
+extracted keys if it returns a lazy vocabulary. Callable vocabularies are not
+called on extraction by default.
+"""
+
+factory.defaults['select.vocabulary_message'] = _(
+    'vocabulary_message',
+    default=u'Selected value is not contained in vocabulary'
+)
+factory.doc['props']['select.vocabulary_message'] = """\
+Message to be shown if extracted value is not contained in a lazy vocabulary.
 """
 
 factory.doc['props']['select.disabled'] = """\
@@ -7,19 +7,28 @@ from yafowil.utils import attr_value
 from yafowil.utils import css_managed_props
 from yafowil.utils import cssclasses
 from yafowil.utils import managedprops
+from yafowil.utils import stream_renderer
 
 
 ###############################################################################
 # table
 ###############################################################################
 
-@managedprops('id', *css_managed_props)
-def table_renderer(widget, data):
-    attrs = {
+def _table_attrs(widget, data):
+    return {
         'id': attr_value('id', widget, data),
         'class_': cssclasses(widget, data),
     }
-    return data.tag('table', data.rendered, **attrs)
+
+
+def table_stream_renderer(widget, data, fragments):
+    return data.tag.stream('table', fragments, **_table_attrs(widget, data))
+
+
+@managedprops('id', *css_managed_props)
+@stream_renderer(table_stream_renderer)
+def table_renderer(widget, data):
+    return data.tag('table', data.rendered, **_table_attrs(widget, data))
 
 
 factory.register(
@@ -47,6 +56,12 @@ Value of table id attribute.
 # thead
 ###############################################################################
 
+def thead_stream_renderer(widget, data, fragments):
+    return data.tag.stream('thead', fragments)
+
+
+@managedprops()
+@stream_renderer(thead_stream_renderer)
 def thead_renderer(widget, data):
     return data.tag('thead', data.rendered)
 
@@ -72,6 +87,12 @@ factory.doc['blueprint']['thead'] = """\
 # tbody
 ###############################################################################
 
+def tbody_stream_renderer(widget, data, fragments):
+    return data.tag.stream('tbody', fragments)
+
+
+@managedprops()
+@stream_renderer(tbody_stream_renderer)
 def tbody_renderer(widget, data):
     return data.tag('tbody', data.rendered)
 
@@ -97,13 +118,14 @@ factory.doc['blueprint']['tbody'] = """\
 # tr
 ###############################################################################
 
+def tr_stream_renderer(widget, data, fragments):
+    return data.tag.stream('tr', fragments, **_table_attrs(widget, data))
+
+
 @managedprops('id', *css_managed_props)
+@stream_renderer(tr_stream_renderer)
 def tr_renderer(widget, data):
-    attrs = {
-        'id': attr_value('id', widget, data),
-        'class_': cssclasses(widget, data),
-    }
-    return data.tag('tr', data.rendered, **attrs)
+    return data.tag('tr', data.rendered, **_table_attrs(widget, data))
 
 
 factory.register(
@@ -1,11 +1,26 @@
+from collections.abc import MutableMapping
 from node.tests import NodeTestCase
+from odict import odict
 from node.utils import UNSET
+from yafowil.base import CompactRuntimeData
 from yafowil.base import ExtractionError
 from yafowil.base import Factory
+from yafowil.base import FactoryDefaults
 from yafowil.base import fetch_value
 from yafowil.base import RuntimeData
+from yafowil.base import StateOverlay
 from yafowil.base import TBSupplementWidget
 from yafowil.base import Widget
+from yafowil.base import WidgetProperties
+from yafowil.base import _missing
+from yafowil.utils import attr_value
+from yafowil.utils import managedprops
+from yafowil.utils import stream_renderer
+import asyncio
+import copy
+import json
+import pickle
+import threading
 import webresource as wr
 
 
@@ -29,6 +44,11 @@ def _test_getter(widget, data):
     return 'Test Value'
 
 
+def _container_extractor(widget, data):
+    for child in widget.values():
+        child.extract(data.request, parent=data)
+
+
 def _test_preprocessor(widget, data):
     data.attrs['_test_preprocessor'] = 'called'
     return data
@@ -94,6 +114,251 @@ class TestBase(NodeTestCase):
         with self.assertRaises(KeyError):
             data['fieldset']['age'].fetch('root.unknown')
 
+    def test_CompactRuntimeData(self):
+        # Compact runtime data provides the API of RuntimeData
+        data = CompactRuntimeData()
+        self.assertEqual(data.request, UNSET)
+        self.assertEqual(data.value, UNSET)
+        self.assertEqual(data.extracted, UNSET)
+        self.assertEqual(data.rendered, UNSET)
+        self.assertEqual(data.errors, [])
+        self.assertEqual(data.keys(), [])
+        self.assertEqual(repr(data.__name__), 'None')
+        self.assertTrue(bool(data))
+        self.assertTrue(isinstance(data, MutableMapping))
+
+        # Arbitrary attributes are not supported
+        with self.assertRaises(AttributeError):
+            data.foo = 'foo'
+
+        # Attributes are created on demand
+        data = CompactRuntimeData('root')
+        self.assertEqual(data._attrs, None)
+        data.attrs['somekey'] = 'somevalue'
+        self.assertEqual(data.attrs['somekey'], 'somevalue')
+        self.assertTrue(data.attrs is data.attributes)
+
+        # Children
+        data['surname'] = CompactRuntimeData()
+        data['fieldset'] = CompactRuntimeData()
+        CompactRuntimeData(name='age', parent=data['fieldset']).value = 36
+        self.assertEqual(data.keys(), ['surname', 'fieldset'])
+        self.assertEqual(data['surname'].__name__, 'surname')
+        self.assertEqual(data['surname'].name, 'surname')
+        self.assertTrue(data['surname'].parent is data)
+        self.assertTrue('surname' in data)
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data.get('unknown'), None)
+        self.assertEqual(
+            [_.name for _ in data.values()],
+            ['surname', 'fieldset']
+        )
+        self.assertEqual(
+            [k for k, v in data.items()],
+            ['surname', 'fieldset']
+        )
+        age = data['fieldset']['age']
+        self.assertEqual(age.path, ['root', 'fieldset', 'age'])
+        self.assertTrue(age.root is data)
+
+        # Fetch
+        self.assertEqual(data.fetch('root.fieldset.age').value, 36)
+        self.assertEqual(age.fetch(['root', 'surname']).name, 'surname')
+        with self.assertRaises(KeyError):
+            age.fetch('root.unknown')
+
+        # Instances are compared by identity
+        self.assertNotEqual(CompactRuntimeData(), CompactRuntimeData())
+        self.assertEqual(len(set([data, data])), 1)
+
+        # Representation
+        self.checkOutput("""
+        <RuntimeData root, value=<UNSET>, extracted=<UNSET>,
+        attrs={'somekey': 'somevalue'} at ...>
+          <RuntimeData root.surname, value=<UNSET>, extracted=<UNSET> at ...>
+          <RuntimeData root.fieldset, value=<UNSET>, extracted=<UNSET> at ...>
+            <RuntimeData root.fieldset.age, value=36, extracted=<UNSET> at ...>
+        """, data.treerepr())
+
+        # Errors
+        self.assertFalse(data.has_errors)
+        data = CompactRuntimeData('root')
+        CompactRuntimeData(name='child', parent=data).errors.append(
+            ExtractionError('error')
+        )
+        self.assertTrue(data.has_errors)
+
+        del data['child']
+        self.assertEqual(data.keys(), [])
+
+        # Persistence
+        class Model(object):
+            pass
+
+        def writer(model, target, value):
+            setattr(model, target, value)
+
+        data = CompactRuntimeData('root', persist_writer=writer)
+        child = CompactRuntimeData(name='child', parent=data, persist=True)
+        child.extracted = 'value'
+        model = Model()
+        data.write(model)
+        self.assertEqual(model.child, 'value')
+
+        # Compact runtime data is selected per widget tree on root widget
+        factory = Factory()
+        factory.register('compact', [_test_extractor], [_test_edit_renderer])
+        factory.register('container', [_container_extractor], [])
+        root = factory('container', name='root')
+        root['child'] = factory('compact')
+        data = root.extract({})
+        self.assertIsInstance(data, RuntimeData)
+        self.assertIsInstance(data['child'], RuntimeData)
+
+        root.runtime_data_factory = CompactRuntimeData
+        data = root.extract({})
+        self.assertIsInstance(data, CompactRuntimeData)
+        self.assertIsInstance(data['child'], CompactRuntimeData)
+        self.assertEqual(data['child'].extracted, 'e1')
+
+        # Data created for child widgets without parent data follows root
+        self.assertIsInstance(
+            root['child']._create_runtime_data(name='child'),
+            CompactRuntimeData
+        )
+
+    def test_error_count(self):
+        for factory in (RuntimeData, CompactRuntimeData):
+            root = factory(name='root')
+            child = factory(name='child', parent=root)
+            leaf = factory(name='leaf', parent=child)
+            self.assertFalse(root.has_errors)
+
+            # Errors are counted on self and parents
+            error = ExtractionError('error')
+            leaf.errors.append(error)
+            self.assertEqual(
+                [root._error_count, child._error_count, leaf._error_count],
+                [1, 1, 1]
+            )
+            self.assertTrue(root.has_errors)
+            self.assertTrue(child.has_errors)
+            child.errors.extend([error, error])
+            child.errors.insert(0, error)
+            self.assertEqual(root._error_count, 4)
+            child.errors.pop()
+            child.errors.remove(error)
+            del child.errors[:]
+            self.assertEqual(root._error_count, 1)
+            child.errors += [error]
+            child.errors *= 2
+            self.assertEqual(root._error_count, 3)
+            child.errors[:] = []
+            leaf.errors.clear()
+            self.assertFalse(root.has_errors)
+
+            # Assigned errors are counted
+            leaf.errors = [error, error]
+            self.assertEqual(root._error_count, 2)
+            leaf.errors = []
+            self.assertFalse(root.has_errors)
+
+            # Errors of added and removed children are counted
+            other = factory(name='other')
+            other.errors.append(error)
+            child['other'] = other
+            self.assertTrue(root.has_errors)
+            child['other'] = factory(name='other')
+            self.assertFalse(root.has_errors)
+            child['other'] = other
+            del child['other']
+            self.assertFalse(root.has_errors)
+
+            # Errors of children created with parent are counted
+            data = factory(name='root')
+            for name in ('a', 'b'):
+                sub = factory(name=name, parent=data)
+                sub.errors.append(error)
+            self.assertEqual(data._error_count, 2)
+
+            # Copies of errors are plain lists not counting on runtime data
+            errors = data['a'].errors
+            for copied in (
+                copy.copy(errors),
+                copy.deepcopy(errors),
+                pickle.loads(pickle.dumps(errors))
+            ):
+                self.assertEqual(type(copied), list)
+                self.assertEqual(len(copied), 1)
+                copied.append(error)
+            self.assertEqual(data._error_count, 2)
+            self.assertEqual(data['a']._error_count, 1)
+
+    def test_fetch_index(self):
+        for factory in (RuntimeData, CompactRuntimeData):
+            root = factory(name='root')
+            section = factory(name='section', parent=root)
+            field = factory(name='field', parent=section)
+            field.extracted = 'value'
+            self.assertEqual(root._path_index, None)
+
+            # Index gets created on root on first fetch
+            self.assertTrue(field.fetch('root.section.field') is field)
+            self.assertTrue(root.fetch(['root', 'section']) is section)
+            self.assertEqual(
+                sorted(root._path_index),
+                ['root', 'root.section', 'root.section.field']
+            )
+            self.assertEqual(section._path_index, None)
+
+            # Index gets updated if children are added or removed
+            other = factory(name='other')
+            factory(name='sub', parent=other).extracted = 'sub'
+            section['other'] = other
+            self.assertEqual(
+                root.fetch('root.section.other.sub').extracted,
+                'sub'
+            )
+            self.assertEqual(
+                root.fetch_many([
+                    'root.section.field',
+                    'root.section.other.sub'
+                ]),
+                ['value', 'sub']
+            )
+            section['other'] = factory(name='other')
+            with self.assertRaises(KeyError):
+                root.fetch('root.section.other.sub')
+            del section['other']
+            with self.assertRaises(KeyError) as arc:
+                root.fetch('root.section.other')
+            self.assertEqual(str(arc.exception), "'root.section.other'")
+            factory(name='new', parent=section)
+            self.assertEqual(
+                root.fetch('root.section.new').path,
+                ['root', 'section', 'new']
+            )
+
+            # Invalid root name
+            with self.assertRaises(KeyError) as arc:
+                root.fetch('other.section')
+            self.assertEqual(
+                str(arc.exception),
+                "'Invalid name of root element'"
+            )
+
+            # Non string child names are indexed by their string
+            # representation
+            factory(name=0, parent=section).extracted = 'row'
+            self.assertEqual(root.fetch('root.section.0').extracted, 'row')
+            self.assertEqual(
+                root.fetch(['root', 'section', 0]).extracted,
+                'row'
+            )
+            del section[0]
+            with self.assertRaises(KeyError):
+                root.fetch('root.section.0')
+
     def test_Widget(self):
         def _test_extractor2(widget, data):
             return 'e2'
@@ -838,6 +1103,66 @@ class TestBase(NodeTestCase):
         <class 'yafowil.base.Widget'>: 2
         """, widget.treerepr())
 
+    def test_dottedpath_memo(self):
+        # Dotted path is memoized until the widget tree changes
+        factory = Factory()
+        factory.register('widget_test', [_test_extractor], [_test_edit_renderer])
+
+        root = factory('widget_test', name='root')
+        child = root['child'] = factory('widget_test')
+        sub = child['sub'] = factory('widget_test')
+        self.assertEqual(sub.dottedpath, 'root.child.sub')
+        self.assertEqual(sub._dottedpath, 'root.child.sub')
+        sub._cssids['memo'] = 'memo'
+
+        # Paths of parents are memoized along with the path of children
+        self.assertEqual(child._dottedpath, 'root.child')
+        self.assertEqual(root._dottedpath, 'root')
+
+        # Renaming a parent invalidates the memoized paths of children
+        root.__name__ = 'renamed'
+        self.assertEqual(sub._dottedpath, None)
+        self.assertEqual(sub._cssids, {})
+        self.assertEqual(sub.dottedpath, 'renamed.child.sub')
+
+        # Re-parenting invalidates the memoized paths
+        other = factory('widget_test', name='other')
+        other['moved'] = root.detach('child')
+        self.assertEqual(sub.dottedpath, 'other.moved.sub')
+
+        # Changing the structural property invalidates the memoized paths
+        other['moved'].properties = {'structural': True}
+        self.assertEqual(sub.dottedpath, 'other.sub')
+        other['moved'].properties = {}
+        self.assertEqual(sub.dottedpath, 'other.moved.sub')
+
+        # Modifying properties in place invalidates the memoized paths
+        sub.dottedpath
+        other['moved'].properties['structural'] = True
+        self.assertEqual(sub._dottedpath, None)
+        self.assertEqual(sub.dottedpath, 'other.sub')
+        del other['moved'].properties['structural']
+        self.assertEqual(sub.dottedpath, 'other.moved.sub')
+
+        # Clones share properties
+        clone = other.clone()
+        self.assertEqual(clone['moved']['sub'].dottedpath, 'other.moved.sub')
+        other['moved'].properties.update(structural=True)
+        self.assertEqual(sub.dottedpath, 'other.sub')
+        self.assertEqual(clone['moved']['sub'].dottedpath, 'other.sub')
+        self.assertIsInstance(
+            copy.deepcopy(other['moved'].properties),
+            WidgetProperties
+        )
+
+        # Root widget without name
+        nameless = factory('widget_test')
+        nameless['child'] = factory('widget_test')
+        with self.assertRaises(ValueError):
+            nameless['child'].dottedpath
+        nameless.__name__ = 'named'
+        self.assertEqual(nameless['child'].dottedpath, 'named.child')
+
     def test_factory_chain(self):
         # Sometimes we want to wrap inputs by UI candy, primary for usability
         # reasons. This might be a label, some error output or div around. We
@@ -986,6 +1311,260 @@ class TestBase(NodeTestCase):
             ['extracted inner', 'extracted special', 'extracted outer']
         )
 
+    def test_factory_chain_cache(self):
+        # Expanded blueprint chains get cached by blueprint definition
+        def inner_renderer(widget, data):
+            return u'<INNER />'
+
+        def outer_renderer(widget, data):
+            return u'<OUTER>%s</OUTER>' % data.rendered
+
+        def outer_extractor(widget, data):
+            return 'outer'
+
+        factory = Factory()
+        factory.register('inner', [], [inner_renderer])
+        factory.register('outer', [outer_extractor], [outer_renderer])
+        self.assertEqual(factory.chain_cache_hits, 0)
+        self.assertEqual(factory.chain_cache_misses, 0)
+
+        widget_1 = factory('outer:inner', name='widget_1')
+        self.assertEqual(factory.chain_cache_hits, 0)
+        self.assertEqual(factory.chain_cache_misses, 1)
+
+        widget_2 = factory('outer:inner', name='widget_2')
+        self.assertEqual(factory.chain_cache_hits, 1)
+        self.assertEqual(factory.chain_cache_misses, 1)
+
+        # Chains are shared immutable tuples, blueprints list is per widget
+        self.assertEqual(widget_1.edit_renderers, (
+            ('inner', inner_renderer),
+            ('outer', outer_renderer)
+        ))
+        self.assertTrue(widget_1.edit_renderers is widget_2.edit_renderers)
+        self.assertEqual(widget_1.blueprints, ['outer', 'inner'])
+        self.assertFalse(widget_1.blueprints is widget_2.blueprints)
+        self.assertEqual(widget_2(), u'<OUTER><INNER /></OUTER>')
+
+        # Blueprints as list and as string are different cache keys
+        factory(['outer', 'inner'])
+        self.assertEqual(factory.chain_cache_misses, 2)
+        factory(['outer', 'inner'])
+        self.assertEqual(factory.chain_cache_hits, 2)
+
+        # Registering a blueprint invalidates the cache
+        factory.register('inner', [], [outer_renderer])
+        factory('outer:inner')
+        self.assertEqual(factory.chain_cache_misses, 3)
+
+        # Registering global preprocessors invalidates the cache
+        def global_preprocessor(widget, data):
+            return data
+
+        factory.register_global_preprocessors([global_preprocessor])
+        widget = factory('outer:inner')
+        self.assertEqual(factory.chain_cache_misses, 4)
+        self.assertEqual(
+            widget.preprocessors,
+            (('__GLOBAL__', global_preprocessor),)
+        )
+
+        # Registering macros invalidates the cache. Macro properties are
+        # applied on every widget creation
+        factory.register_macro('macro', 'outer:inner', {'foo': 'macro'})
+        self.assertEqual(len(factory._chain_cache), 0)
+        widget = factory('#macro')
+        self.assertEqual(widget.attrs['foo'], 'macro')
+        widget = factory('#macro', props={'foo': 'custom'})
+        self.assertEqual(widget.attrs['foo'], 'custom')
+        self.assertEqual(factory.chain_cache_hits, 3)
+        self.assertEqual(factory.chain_cache_misses, 5)
+
+        # Custom chain parts are cached by identity
+        custom = {'special': {'extractors': [outer_extractor]}}
+        widget = factory('outer:*special:inner', custom=custom)
+        self.assertEqual(widget.extractors, (
+            ('special', outer_extractor),
+            ('outer', outer_extractor)
+        ))
+        factory('outer:*special:inner', custom=custom)
+        self.assertEqual(factory.chain_cache_misses, 6)
+        self.assertEqual(factory.chain_cache_hits, 4)
+        factory('outer:*special:inner', custom={
+            'special': {'extractors': [outer_extractor]}
+        })
+        self.assertEqual(factory.chain_cache_misses, 7)
+
+        # Cache size is limited
+        factory.chain_cache_size = 2
+        factory('outer')
+        self.assertEqual(len(factory._chain_cache), 2)
+
+        # Pushing and popping state invalidates the cache
+        factory.push_state()
+        factory('inner')
+        factory.pop_state()
+        self.assertEqual(len(factory._chain_cache), 0)
+
+        # Chain parts are returned as copies, reading them keeps the cache
+        factory('outer')
+        size = len(factory._chain_cache)
+        extractors = factory.extractors('outer')
+        self.assertEqual(extractors, [outer_extractor])
+        extractors.append(inner_renderer)
+        self.assertEqual(factory.extractors('outer'), [outer_extractor])
+        self.assertEqual(factory.edit_renderers('outer'), [outer_renderer])
+        self.assertEqual(factory.display_renderers('outer'), [])
+        self.assertEqual(factory.builders('outer'), [])
+        self.assertEqual(len(factory._chain_cache), size)
+
+        # Registered lists modified in place require explicit invalidation
+        extractors = [outer_extractor]
+        factory.register('outer', extractors, [outer_renderer])
+        factory('outer')
+        extractors.append(inner_renderer)
+        self.assertEqual(len(factory('outer').extractors), 1)
+        factory.invalidate_chain_cache()
+        self.assertEqual(factory('outer').extractors, (
+            ('outer', outer_extractor),
+            ('outer', inner_renderer)
+        ))
+
+        # Clearing the factory resets the cache
+        factory('outer')
+        factory.clear()
+        self.assertEqual(len(factory._chain_cache), 0)
+        self.assertEqual(factory.chain_cache_hits, 0)
+        self.assertEqual(factory.chain_cache_misses, 0)
+
+    def test_factory_state(self):
+        # Factory state can be pushed and popped
+        def renderer(widget, data):
+            return u'<RENDERED />'
+
+        factory = Factory()
+        factory.register('widget', [], [renderer])
+        factory.register_macro('macro', 'widget', {'macro': 'value'})
+        factory.register_theme('default', 'widget', js=[{'resource': 'a.js'}])
+        factory.defaults['widget.class'] = 'original'
+        factory.defaults['widget.data'] = {'key': 'original'}
+        factory.doc['props']['widget.class'] = 'Original doc'
+        defaults = factory.defaults
+        doc = factory.doc
+
+        # Pushing state wraps registry in copy on write overlays
+        factory.push_state()
+        self.assertIsInstance(factory.defaults, StateOverlay)
+        self.assertIsInstance(factory.doc, StateOverlay)
+        self.assertIsInstance(factory._blueprints, StateOverlay)
+        self.assertIsInstance(factory._macros, StateOverlay)
+        self.assertIsInstance(factory._themes, StateOverlay)
+
+        # Reading returns original values
+        self.assertEqual(factory.defaults['widget.class'], 'original')
+        self.assertEqual(
+            factory.doc['props']['widget.class'],
+            'Original doc'
+        )
+        self.assertEqual(factory.edit_renderers('widget'), [renderer])
+        self.assertEqual(
+            factory._macros['macro'],
+            (['widget'], {'macro': 'value'})
+        )
+        self.assertEqual(
+            sorted(factory.defaults),
+            ['widget.class', 'widget.data']
+        )
+        self.assertEqual(len(factory.defaults), 2)
+        self.assertTrue('widget.class' in factory.defaults)
+
+        # Values are plain copies, nested dicts are no overlays
+        self.assertIs(type(factory.defaults['widget.data']), dict)
+        self.assertIs(type(factory.doc['props']), dict)
+        self.assertEqual(
+            json.dumps(factory.defaults['widget.data']),
+            '{"key": "original"}'
+        )
+
+        # Modifications do not touch the saved state
+        version = factory.defaults.version
+        factory.defaults['widget.class'] = 'modified'
+        factory.defaults['widget.data']['key'] = 'modified'
+        factory.defaults['widget.id'] = 'new'
+        self.assertTrue(factory.defaults.version > version)
+        del factory.defaults['widget.class']
+        self.assertFalse('widget.class' in factory.defaults)
+        with self.assertRaises(KeyError):
+            factory.defaults['widget.class']
+        with self.assertRaises(KeyError):
+            del factory.defaults['widget.class']
+        self.assertEqual(
+            factory.defaults,
+            {'widget.data': {'key': 'modified'}, 'widget.id': 'new'}
+        )
+        factory.doc['props']['widget.class'] = 'Modified doc'
+        factory.doc['props']['widget.id'] = 'New doc'
+        factory.register('widget', [], [])
+        factory.register('other', [], [renderer])
+        factory.register_macro('macro', 'other', {})
+        factory.register_theme('default', 'widget', js=[{'resource': 'b.js'}])
+        factory.register_global_preprocessors([renderer])
+
+        self.assertEqual(defaults, {
+            'widget.class': 'original',
+            'widget.data': {'key': 'original'},
+        })
+        self.assertEqual(doc['props'], {'widget.class': 'Original doc'})
+
+        # Nested push
+        factory.push_state()
+        factory.defaults['widget.id'] = 'nested'
+        self.assertEqual(factory.defaults['widget.data'], {'key': 'modified'})
+        factory.pop_state()
+        self.assertEqual(factory.defaults['widget.id'], 'new')
+
+        # Overlays get copied as plain dicts
+        self.assertEqual(
+            copy.deepcopy(factory.defaults),
+            {'widget.data': {'key': 'modified'}, 'widget.id': 'new'}
+        )
+        self.assertIsInstance(copy.deepcopy(factory.defaults), dict)
+        self.assertIsInstance(factory.defaults.copy(), dict)
+
+        # Popping state restores original registry
+        factory.pop_state()
+        self.assertTrue(factory.defaults is defaults)
+        self.assertTrue(factory.doc is doc)
+        self.assertEqual(factory.defaults['widget.class'], 'original')
+        self.assertEqual(factory.defaults['widget.data'], {'key': 'original'})
+        self.assertEqual(factory.edit_renderers('widget'), [renderer])
+        self.assertEqual(sorted(factory._blueprints), ['widget'])
+        self.assertEqual(factory._macros['macro'][0], ['widget'])
+        self.assertEqual(
+            factory.resources_for('widget')['js'],
+            [{'resource': 'a.js'}]
+        )
+        self.assertEqual(factory._global_preprocessors, [])
+
+        # Widgets keep the defaults of the state they were created in.
+        # Defaults set in a pushed state do not affect widgets created
+        # before, widgets created in a pushed state keep the pushed defaults
+        # after popping
+        def class_renderer(widget, data):
+            return u'<p>{0}</p>'.format(widget.attrs['class'])
+
+        factory.register('widget', [], [class_renderer])
+        before = factory('widget', name='before')
+        factory.push_state()
+        factory.defaults['widget.class'] = 'pushed'
+        inside = factory('widget', name='inside')
+        self.assertEqual(before(), u'<p>original</p>')
+        self.assertEqual(inside(), u'<p>pushed</p>')
+        factory.pop_state()
+        self.assertEqual(before(), u'<p>original</p>')
+        self.assertEqual(inside(), u'<p>pushed</p>')
+        self.assertEqual(factory('widget', name='after')(), u'<p>original</p>')
+
     def test_prefixes_and_defaults(self):
         # Prefixes with widgets and factories
         # Factory called widget attributes should know about its factory name
@@ -1040,6 +1619,607 @@ class TestBase(NodeTestCase):
         widget = factory('prefix', name='test', props={'prefix.id': 'Test1'})
         self.assertEqual(widget(), u'<ID>Test1</ID>')
 
+    def test_resolved_attributes(self):
+        # Resolved attribute values are cached per chain part
+        factory = Factory()
+        self.assertIsInstance(factory.defaults, FactoryDefaults)
+
+        def resolve_renderer(widget, data):
+            return u'<ID>%s</ID>' % widget.attrs['id']
+
+        factory.register('resolve', [], [resolve_renderer])
+        factory.defaults['id'] = 'default'
+        widget = factory('resolve', name='widget')
+        self.assertEqual(widget(), u'<ID>default</ID>')
+        self.assertEqual(
+            widget.attrs._resolved,
+            {'resolve': {'id': 'default'}}
+        )
+
+        # Unprefixed lookup outside of chain processing
+        self.assertEqual(widget.attrs['id'], 'default')
+        self.assertEqual(sorted(widget.attrs._resolved), ['', 'resolve'])
+
+        # Missing attributes are cached as well
+        self.assertEqual(widget.attrs.get('unknown'), None)
+        self.assertTrue(widget.attrs._resolved['']['unknown'] is _missing)
+        with self.assertRaises(KeyError):
+            widget.attrs['unknown']
+
+        # Modifying factory defaults invalidates resolved values
+        version = factory.defaults.version
+        factory.defaults['resolve.id'] = 'prefixed default'
+        self.assertTrue(factory.defaults.version > version)
+        self.assertEqual(widget(), u'<ID>prefixed default</ID>')
+        self.assertEqual(widget.attrs['id'], 'default')
+
+        factory.defaults.update({'resolve.id': 'updated default'})
+        self.assertEqual(widget(), u'<ID>updated default</ID>')
+
+        factory.defaults.pop('resolve.id')
+        self.assertEqual(widget(), u'<ID>default</ID>')
+
+        del factory.defaults['id']
+        self.assertEqual(widget.attrs.get('id'), None)
+
+        factory.defaults.setdefault('id', 'default')
+        self.assertEqual(widget.attrs.get('id'), 'default')
+
+        # Modifying widget attributes invalidates resolved values
+        widget.attrs['id'] = 'attribute'
+        self.assertEqual(widget.attrs._resolved, {})
+        self.assertEqual(widget(), u'<ID>attribute</ID>')
+
+        widget.attrs['resolve.id'] = 'prefixed attribute'
+        self.assertEqual(widget(), u'<ID>prefixed attribute</ID>')
+        self.assertEqual(widget.attrs['id'], 'attribute')
+
+        del widget.attrs['resolve.id']
+        self.assertEqual(widget(), u'<ID>attribute</ID>')
+
+        # Replacing defaults on widget invalidates resolved values
+        widget = factory('resolve', name='widget')
+        self.assertEqual(widget(), u'<ID>default</ID>')
+        defaults = FactoryDefaults()
+        defaults['id'] = 'other'
+        widget.defaults = defaults
+        self.assertEqual(widget(), u'<ID>other</ID>')
+
+        # Plain dict defaults are not cached
+        widget.defaults = {'id': 'plain'}
+        self.assertEqual(widget(), u'<ID>plain</ID>')
+        widget.defaults['id'] = 'plain modified'
+        self.assertEqual(widget(), u'<ID>plain modified</ID>')
+
+    def test_concurrent_processing(self):
+        # The current chain prefix is bound to the execution context. The same
+        # widget can be processed by several threads at the same time
+        barrier = threading.Barrier(2, timeout=5)
+        prefixes = dict()
+
+        def concurrent_renderer(widget, data):
+            before = widget.attrs['id']
+            # wait until the other thread is inside the chain as well
+            barrier.wait()
+            prefixes[data.request] = widget.current_prefix
+            return u'<ID>{}{}</ID>'.format(before, widget.attrs['id'])
+
+        factory = Factory()
+        factory.register('concurrent', [], [concurrent_renderer])
+        widget = factory(
+            'concurrent',
+            name='widget',
+            props={'concurrent.id': 'Test'}
+        )
+        results = dict()
+
+        def render(request):
+            results[request] = widget(request=request)
+
+        threads = [
+            threading.Thread(target=render, args=(name,))
+            for name in ('thread_1', 'thread_2')
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {
+            'thread_1': u'<ID>TestTest</ID>',
+            'thread_2': u'<ID>TestTest</ID>',
+        })
+        self.assertEqual(prefixes, {
+            'thread_1': 'concurrent',
+            'thread_2': 'concurrent',
+        })
+        self.assertEqual(widget.current_prefix, '')
+
+        # Prefix set outside of chain processing is not visible in other
+        # threads
+        widget.current_prefix = 'concurrent'
+        self.assertEqual(widget.attrs['id'], 'Test')
+        thread_prefixes = list()
+        thread = threading.Thread(
+            target=lambda: thread_prefixes.append(widget.current_prefix)
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual(thread_prefixes, [''])
+        widget.current_prefix = ''
+        self.assertEqual(widget.current_prefix, '')
+
+    def test_prerender(self):
+        calls = []
+
+        @managedprops('text', 'handler')
+        def static_renderer(widget, data):
+            calls.append(widget.name)
+            return u'<p>{0}</p>'.format(
+                data.translate_callable(attr_value('text', widget, data))
+            )
+
+        def compound_renderer(widget, data):
+            calls.append(widget.name)
+            return u''.join([
+                child(request=data.request) for child in widget.values()
+            ])
+
+        compound_renderer = managedprops()(compound_renderer)
+
+        def unmanaged_renderer(widget, data):
+            calls.append(widget.name)
+            return u'<p />'
+
+        def value_extractor(widget, data):
+            return data.request.get(widget.dottedpath)
+
+        factory = Factory()
+        factory.register(
+            'static',
+            edit_renderers=[static_renderer],
+            display_renderers=[static_renderer]
+        )
+        factory.register('compound', [], [compound_renderer])
+        factory.register('unmanaged', [], [unmanaged_renderer])
+        factory.register('value', [value_extractor], [static_renderer])
+
+        # Prerendering is enabled via ``prerender`` property
+        form = factory('compound', name='form')
+        form['a'] = factory('static', props={'text': 'A'})
+        self.assertTrue(form._is_static('edit'))
+        form()
+        form()
+        self.assertEqual(calls, ['form', 'a', 'form', 'a'])
+        self.assertEqual(form._prerendered, None)
+        form.attrs['prerender'] = lambda widget, data: True
+        form()
+        form()
+        self.assertEqual(len(calls), 6)
+        self.assertEqual(len(form._prerendered), 1)
+
+        del calls[:]
+        factory.defaults['prerender'] = True
+        form = factory('compound', name='form')
+        form['a'] = factory('static', props={'text': 'A'})
+        form['b'] = factory('static', props={'text': 'B'})
+        self.assertEqual(form(), u'<p>A</p><p>B</p>')
+        self.assertEqual(calls, ['form', 'a', 'b'])
+
+        # Static widget trees are rendered once
+        del calls[:]
+        self.assertEqual(form(), u'<p>A</p><p>B</p>')
+        self.assertEqual(form(request={'form.a': 'x'}), u'<p>A</p><p>B</p>')
+        self.assertEqual(
+            u''.join(form.iter_render()),
+            u'<p>A</p><p>B</p>'
+        )
+        self.assertEqual(calls, [])
+        self.assertEqual(
+            list(form._prerendered),
+            [('edit', None, 'default', factory.defaults.version, False)]
+        )
+
+        # Prerendered markup is invalidated on attribute change
+        form['a'].attrs['text'] = 'C'
+        self.assertEqual(form._prerendered, None)
+        self.assertEqual(form(), u'<p>C</p><p>B</p>')
+        self.assertEqual(calls, ['form', 'a'])
+
+        # Prerendered markup is invalidated on defaults and tree changes
+        del calls[:]
+        factory.defaults['static.other'] = 'other'
+        self.assertEqual(form(), u'<p>C</p><p>B</p>')
+        self.assertEqual(calls, ['form', 'a', 'b'])
+        del form['a']
+        self.assertEqual(form(), u'<p>B</p>')
+        form['c'] = factory('static', props={'text': 'D'})
+        self.assertEqual(form(), u'<p>B</p><p>D</p>')
+        form.movefirst(form['c'])
+        self.assertEqual(form(), u'<p>D</p><p>B</p>')
+        form['c'].__name__ = 'd'
+        self.assertEqual(form['c'].dottedpath, 'form.d')
+        self.assertTrue(form._prerendered is None)
+
+        # Prerendered markup is kept per mode and locale. Changing the mode
+        # of the widget drops prerendered markup
+        del calls[:]
+        widget = factory('static', name='widget', props={'text': 'A'})
+        widget.mode = 'display'
+        widget()
+        widget()
+        widget.mode = 'edit'
+        widget()
+
+        def translate(widget, data):
+            data.translate_callable = lambda msg: msg.lower()
+            return data
+
+        widget.preprocessors = [('translate', translate)]
+        self.assertEqual(widget(), u'<p>a</p>')
+        self.assertEqual(widget(), u'<p>a</p>')
+        self.assertEqual(calls, ['widget', 'widget', 'widget', 'widget'])
+
+        def locale(widget, data):
+            data.translate_callable = lambda msg: msg.lower()
+            data.locale = 'de'
+            return data
+
+        widget.preprocessors = [('locale', locale)]
+        widget()
+        widget()
+        self.assertEqual(len(calls), 5)
+        self.assertEqual(
+            sorted(widget._prerendered, key=str),
+            [
+                ('edit', 'de', 'default', factory.defaults.version, False),
+                ('edit', None, 'default', factory.defaults.version, False),
+            ]
+        )
+
+        # Widgets with value, callable attributes, callable mode, extractors
+        # or unmanaged renderers are not static. Callable action handlers
+        # are ignored.
+        widget = factory(
+            'static',
+            name='widget',
+            props={'text': 'A', 'handler': lambda widget, data: None}
+        )
+        self.assertTrue(widget._is_static('edit'))
+        widget.getter = 'value'
+        self.assertFalse(widget._is_static('edit'))
+        widget.getter = UNSET
+        widget.attrs['text'] = lambda widget, data: 'A'
+        self.assertFalse(widget._is_static('edit'))
+        widget.attrs['text'] = 'A'
+        widget.mode = lambda widget, data: 'edit'
+        self.assertFalse(widget._is_static('edit'))
+        widget = factory('value', name='widget', props={'text': 'A'})
+        self.assertFalse(widget._is_static('edit'))
+        widget = factory('unmanaged', name='widget')
+        self.assertFalse(widget._is_static('edit'))
+        form = factory('compound', name='form')
+        form['a'] = factory('static', props={'text': 'A'})
+        form['b'] = factory('value', props={'text': 'B'})
+        self.assertFalse(form._is_static('edit'))
+        self.assertTrue(form['a']._is_static('edit'))
+
+        # Prerendered markup is kept per extraction state of the root, which
+        # decides about ``valid_class``
+        @managedprops('valid_class')
+        def valid_renderer(widget, data):
+            calls.append(widget.name)
+            if attr_value('valid_class', widget, data) and data.root.extracted:
+                return u'<p class="valid" />'
+            return u'<p />'
+
+        def children_extractor(widget, data):
+            for child in widget.values():
+                child.extract(data.request, parent=data)
+            return odict([(k, v.extracted) for k, v in data.items()])
+
+        factory.register('valid', [], [valid_renderer])
+        factory.register('form', [children_extractor], [compound_renderer])
+        form = factory('form', name='form')
+        form['a'] = factory('valid', props={'valid_class': True})
+        widget = form['a']
+        del calls[:]
+        self.assertEqual(widget(), u'<p />')
+        data = form.extract({})
+        self.assertEqual(widget(data=data['a']), u'<p class="valid" />')
+        self.assertEqual(widget(data=data['a']), u'<p class="valid" />')
+        self.assertEqual(widget(), u'<p />')
+        self.assertEqual(calls, ['a', 'a'])
+        self.assertEqual(
+            sorted(widget._prerendered, key=str),
+            [
+                ('edit', None, 'default', factory.defaults.version, False),
+                ('edit', None, 'default', factory.defaults.version, True),
+            ]
+        )
+
+        # Prerendered markup is kept for clones of root widgets
+        form = factory('compound', name='form')
+        form['a'] = factory('static', props={'text': 'A'})
+        form()
+        del calls[:]
+        clone = form.clone()
+        self.assertEqual(clone(), u'<p>A</p>')
+        self.assertEqual(calls, [])
+        clone['a'].attrs['text'] = 'B'
+        self.assertEqual(clone(), u'<p>B</p>')
+        self.assertEqual(form(), u'<p>A</p>')
+        self.assertTrue(form['a'].clone()._prerendered is None)
+
+    def test_clone(self):
+        builds = []
+
+        def builder(widget, factory):
+            builds.append(widget.name)
+            widget['child'] = factory('text', props={'class': 'child'})
+
+        def renderer(widget, data):
+            return u'<compound class="{0}">{1}</compound>'.format(
+                attr_value('class', widget, data),
+                u''.join([
+                    u'<{0} class="{1}" />'.format(
+                        child.dottedpath,
+                        attr_value('class', child, data)
+                    ) for child in widget.values()
+                ])
+            )
+
+        def text_renderer(widget, data):
+            return u''
+
+        factory = Factory()
+        factory.register('compound', [], [renderer], builders=[builder])
+        factory.register('text', [], [text_renderer])
+        prototype = factory(
+            'compound',
+            name='prototype',
+            value={'child': 'value'},
+            props={'class': 'compound'}
+        )
+        prototype.runtime_data_factory = CompactRuntimeData
+        self.assertEqual(builds, ['prototype'])
+
+        clone = prototype.clone()
+        self.assertEqual(builds, ['prototype'])
+        self.assertFalse(clone is prototype)
+        self.assertEqual(clone.name, 'prototype')
+        self.assertEqual(clone.parent, None)
+        self.assertEqual(clone.getter, {'child': 'value'})
+        self.assertEqual(clone.runtime_data_factory, CompactRuntimeData)
+        self.assertEqual(clone(), prototype())
+
+        # Chains, defaults and properties are shared
+        self.assertTrue(clone.edit_renderers is prototype.edit_renderers)
+        self.assertTrue(clone.extractors is prototype.extractors)
+        self.assertTrue(clone.defaults is prototype.defaults)
+        self.assertTrue(clone.properties is prototype.properties)
+        self.assertEqual(clone.blueprints, prototype.blueprints)
+        self.assertFalse(clone.blueprints is prototype.blueprints)
+
+        # Children are cloned
+        child = clone['child']
+        self.assertFalse(child is prototype['child'])
+        self.assertTrue(child.parent is clone)
+        self.assertEqual(child.dottedpath, 'prototype.child')
+        self.assertEqual(clone.keys(), ['child'])
+
+        # Attributes are copied on write
+        self.assertTrue(
+            clone.attrs.storage is prototype.attrs.storage
+        )
+        child.attrs['class'] = 'cloned'
+        self.assertEqual(prototype['child'].attrs['class'], 'child')
+        prototype.attrs['class'] = 'changed'
+        self.assertEqual(clone.attrs['class'], 'compound')
+        self.assertEqual(clone(), (
+            u'<compound class="compound">'
+            u'<prototype.child class="cloned" /></compound>'
+        ))
+        self.assertEqual(prototype(), (
+            u'<compound class="changed">'
+            u'<prototype.child class="child" /></compound>'
+        ))
+        del clone.attrs['class']
+        self.assertEqual(prototype.attrs['class'], 'changed')
+
+        # Getter and tree modifications are per clone
+        clone.getter = 'other'
+        self.assertEqual(prototype.getter, {'child': 'value'})
+        clone['other'] = factory('text')
+        self.assertEqual(prototype.keys(), ['child'])
+        clone.__name__ = 'renamed'
+        self.assertEqual(child.dottedpath, 'renamed.child')
+        self.assertEqual(prototype['child'].dottedpath, 'prototype.child')
+
+    def test_extract_async(self):
+        calls = []
+
+        async def async_getter(widget, data):
+            calls.append('getter')
+            return 'value'
+
+        async def async_extractor(widget, data):
+            calls.append('async_extractor')
+            await asyncio.sleep(0)
+            if data.request.get('fail'):
+                raise ExtractionError('failed', abort=True)
+            return data.request.get(widget.dottedpath, data.value)
+
+        def sync_extractor(widget, data):
+            calls.append('sync_extractor')
+            return data.extracted.upper()
+
+        async def async_label(widget, data):
+            calls.append('label')
+            return 'Label of {0}'.format(widget.name)
+
+        def renderer(widget, data):
+            return u'<{0} label="{1}" value="{2}" />'.format(
+                widget.name,
+                attr_value('label', widget, data),
+                data.extracted if data.extracted else data.value
+            )
+
+        factory = Factory()
+        factory.register('upper', [sync_extractor], [])
+        factory.register('async', [async_extractor], [renderer])
+
+        widget = factory(
+            'upper:async',
+            name='widget',
+            value=async_getter,
+            props={'label': async_label}
+        )
+        data = asyncio.run(widget.extract_async({'widget': 'request'}))
+        self.assertEqual(data.value, 'value')
+        self.assertEqual(data.extracted, 'REQUEST')
+        self.assertEqual(data.errors, [])
+        self.assertEqual(
+            calls,
+            ['getter', 'label', 'async_extractor', 'sync_extractor']
+        )
+
+        # Extraction errors
+        del calls[:]
+        data = asyncio.run(widget.extract_async({'fail': True}))
+        self.assertEqual(data.extracted, UNSET)
+        self.assertEqual(data.errors, [ExtractionError('failed')])
+        self.assertEqual(calls, ['getter', 'label', 'async_extractor'])
+
+        # Render asynchronously
+        del calls[:]
+        self.assertEqual(
+            asyncio.run(widget.render_async()),
+            u'<widget label="Label of widget" value="value" />'
+        )
+        self.assertEqual(calls, ['getter', 'label'])
+
+        del calls[:]
+        data = asyncio.run(widget.extract_async({'widget': 'request'}))
+        del calls[:]
+        self.assertEqual(
+            asyncio.run(widget.render_async(data=data)),
+            u'<widget label="Label of widget" value="REQUEST" />'
+        )
+        self.assertEqual(calls, ['label'])
+
+        with self.assertRaises(ValueError):
+            asyncio.run(widget.render_async(data=data, request={}))
+
+        # Action callbacks and properties not read by the chain are not
+        # awaited
+        del calls[:]
+
+        async def async_handler(widget, data):
+            calls.append('handler')
+
+        async def async_next(request):
+            calls.append('next')
+
+        async def async_unused(widget, data):
+            calls.append('unused')
+
+        @managedprops('label')
+        def action_renderer(widget, data):
+            return u'<action label="{0}" />'.format(
+                attr_value('label', widget, data)
+            )
+
+        factory.register('action', [], [action_renderer])
+        widget = factory(
+            'action',
+            name='action',
+            props={
+                'label': async_label,
+                'action.handler': async_handler,
+                'next': async_next,
+                'unused': async_unused,
+            })
+        asyncio.run(widget.extract_async({}))
+        self.assertEqual(
+            asyncio.run(widget.render_async()),
+            u'<action label="Label of action" />'
+        )
+        self.assertEqual(calls, ['label', 'label'])
+
+    def test_iter_render(self):
+        calls = []
+
+        def leaf_renderer(widget, data):
+            calls.append('leaf')
+            return u'<LEAF prefix="{0}" />'.format(widget.current_prefix)
+
+        def wrap_stream_renderer(widget, data, fragments):
+            calls.append('wrap')
+            yield u'<WRAP prefix="{0}">'.format(widget.current_prefix)
+            for fragment in fragments:
+                yield fragment
+            yield u'</WRAP prefix="{0}">'.format(widget.current_prefix)
+
+        @stream_renderer(wrap_stream_renderer)
+        def wrap_renderer(widget, data):
+            return u'<WRAP prefix="{0}">{1}</WRAP prefix="{0}">'.format(
+                widget.current_prefix,
+                data.rendered if data.rendered else u''
+            )
+
+        def upper_renderer(widget, data):
+            return data.rendered.upper()
+
+        factory = Factory()
+        factory.register('leaf', [], [leaf_renderer])
+        factory.register('wrap', [], [wrap_renderer])
+        factory.register('upper', [], [upper_renderer])
+
+        # Streaming renderer yields fragments in document order, string
+        # renderers yield one fragment
+        widget = factory('wrap:leaf', name='widget')
+        fragments = widget.iter_render()
+        self.assertEqual(calls, [])
+        self.assertEqual(next(fragments), u'<WRAP prefix="wrap">')
+        self.assertEqual(calls, ['wrap'])
+        self.assertEqual(widget.current_prefix, '')
+        self.assertEqual(list(fragments), [
+            u'<LEAF prefix="leaf" />',
+            u'</WRAP prefix="wrap">'
+        ])
+        self.assertEqual(calls, ['wrap', 'leaf'])
+        self.assertEqual(widget.current_prefix, '')
+        self.assertEqual(u''.join(widget.iter_render()), widget())
+
+        # Streaming renderer without previous renderers
+        widget = factory('wrap', name='widget')
+        self.assertEqual(list(widget.iter_render()), [
+            u'<WRAP prefix="wrap">',
+            u'</WRAP prefix="wrap">'
+        ])
+        self.assertEqual(u''.join(widget.iter_render()), widget())
+
+        # String renderer gets joined fragments of previous renderers
+        widget = factory('upper:wrap:leaf', name='widget')
+        self.assertEqual(list(widget.iter_render()), [
+            u'<WRAP PREFIX="WRAP"><LEAF PREFIX="LEAF" /></WRAP PREFIX="WRAP">'
+        ])
+        self.assertEqual(u''.join(widget.iter_render()), widget())
+
+        # Skip mode
+        widget = factory('wrap:leaf', name='widget', mode='skip')
+        self.assertEqual(list(widget.iter_render()), [])
+
+        # Passing data and request fails immediately
+        widget = factory('wrap:leaf', name='widget')
+        with self.assertRaises(ValueError):
+            widget.iter_render(data=widget.extract({}), request={})
+
+        # Missing renderers fail immediately
+        widget = factory('wrap:leaf', name='widget', mode='display')
+        with self.assertRaises(ValueError):
+            widget.iter_render()
+
     def test_fetch_value(self):
         dmarker = list()
         defaults = dict(default=dmarker)
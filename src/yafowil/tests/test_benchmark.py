@@ -0,0 +1,198 @@
+from yafowil.benchmark import runtimedata
+from yafowil.base import factory
+from yafowil.benchmark import clone
+from yafowil.benchmark import state
+from yafowil.benchmark import select
+from yafowil.benchmark import suite
+from yafowil.benchmark import threads
+from yafowil.tests import YafowilTestCase
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+
+class TestBenchmark(YafowilTestCase):
+
+    def test_threads(self):
+        form = threads.create_form(2)
+        self.assertEqual(form.keys(), ['field_0', 'field_1'])
+        self.assertEqual(threads.create_request(2), {
+            'form.field_0': 'Value 0',
+            'form.field_1': 'Value 1',
+        })
+        results = threads.run(fields=2, iterations=4, threads=(1, 2))
+        self.assertEqual([_['threads'] for _ in results], [1, 2])
+        for result in results:
+            self.assertTrue(result['duration'] > 0)
+            self.assertTrue(result['throughput'] > 0)
+
+    def test_runtimedata(self):
+        results = runtimedata.run(fields=2, iterations=2)
+        self.assertEqual(
+            [_['name'] for _ in results],
+            ['RuntimeData', 'CompactRuntimeData']
+        )
+        for result in results:
+            self.assertTrue(result['memory'] > 0)
+            self.assertTrue(result['allocations'] > 0)
+            self.assertEqual(result['iterations'], 2)
+            self.assertTrue(result['min'] > 0)
+            self.assertTrue(result['mean'] >= result['min'])
+
+    def test_state(self):
+        results = state.run(iterations=2)
+        self.assertEqual(
+            [_['name'] for _ in results],
+            ['deepcopy registry', 'push/pop', 'push/modify/pop']
+        )
+        for result in results:
+            self.assertEqual(result['iterations'], 2)
+            self.assertTrue(result['min'] > 0)
+            self.assertTrue(result['mean'] >= result['min'])
+
+    def test_clone(self):
+        results = clone.run(fields=2, iterations=2)
+        self.assertEqual([_['name'] for _ in results], ['rebuild', 'clone'])
+        for result in results:
+            self.assertEqual(result['iterations'], 2)
+            self.assertTrue(result['min'] > 0)
+            self.assertTrue(result['mean'] >= result['min'])
+
+    def test_select(self):
+        widget = select.create_select(options=10, selected=2)
+        self.assertEqual(widget.getter, ['option_0', 'option_5'])
+        self.assertEqual(widget.attrs['disabled'], ['option_0'])
+        results = select.run(options=10, selected=2, iterations=2)
+        self.assertEqual(
+            [_['name'] for _ in results],
+            ['block', 'checkbox']
+        )
+        for result in results:
+            self.assertEqual(result['iterations'], 2)
+            self.assertTrue(result['min'] > 0)
+            self.assertTrue(result['mean'] >= result['min'])
+
+    def test_suite_create_request(self):
+        form = factory('form', name='form', props={'action': 'action'})
+        form['text'] = factory('text')
+        form['email'] = factory('email')
+        form['select'] = factory('select', props={'vocabulary': ['a', 'b']})
+        form['file'] = factory('file')
+        self.assertEqual(
+            [_.name for _ in suite.leaf_widgets(form)],
+            ['text', 'email', 'select', 'file']
+        )
+        self.assertEqual(suite.create_request(form), {
+            'form.text': 'value',
+            'form.email': 'benchmark@example.com',
+            'form.select-exists': 'exists',
+            'form.select': 'a',
+        })
+        self.assertEqual(suite.create_request(form, valid=False), {
+            'form.text': '',
+            'form.email': 'invalid',
+            'form.select-exists': 'exists',
+            'form.select': '',
+        })
+
+    def test_suite(self):
+        results = suite.run(iterations=1, synthetic_iterations=1, fields=(3,))
+        results = results['results']
+        names = sorted(results)
+        self.assertEqual(len(names), 70)
+        self.assertEqual(names[:5], [
+            'example.yafowil-block.construct',
+            'example.yafowil-block.extract_invalid',
+            'example.yafowil-block.extract_valid',
+            'example.yafowil-block.render_empty',
+            'example.yafowil-block.render_extracted',
+        ])
+        self.assertEqual(names[-5:], [
+            'synthetic.3.construct',
+            'synthetic.3.extract_invalid',
+            'synthetic.3.extract_valid',
+            'synthetic.3.render_empty',
+            'synthetic.3.render_extracted',
+        ])
+        for result in results.values():
+            self.assertEqual(result['iterations'], 1)
+            self.assertTrue(result['min'] > 0)
+            self.assertEqual(result['min'], result['mean'])
+
+        # Select benchmarks by name
+        results = suite.run(
+            iterations=1,
+            synthetic_iterations=1,
+            fields=(),
+            select='plaintext.render'
+        )
+        self.assertEqual(sorted(results['results']), [
+            'example.yafowil-plaintext.render_empty',
+            'example.yafowil-plaintext.render_extracted',
+        ])
+
+        # Registry is not modified
+        self.assertRaises(KeyError, lambda: factory._macros['field'])
+
+    def test_suite_compare(self):
+        before = {'results': {
+            'a': {'min': 1.0},
+            'b': {'min': 1.0},
+            'c': {'min': 1.0},
+        }}
+        after = {'results': {
+            'a': {'min': 1.05},
+            'b': {'min': 1.5},
+            'd': {'min': 1.0},
+        }}
+        self.assertEqual(suite.compare(before, after), [{
+            'name': 'a',
+            'before': 1.0,
+            'after': 1.05,
+            'change': 0.050000000000000044,
+            'regression': False,
+        }, {
+            'name': 'b',
+            'before': 1.0,
+            'after': 1.5,
+            'change': 0.5,
+            'regression': True,
+        }])
+        comparison = suite.compare(before, after, threshold=0.6)
+        self.assertFalse(comparison[1]['regression'])
+
+    def test_suite_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            before = os.path.join(directory, 'before.json')
+            after = os.path.join(directory, 'after.json')
+            args = [
+                'run',
+                '--iterations', '1',
+                '--fields', '',
+                '--select', 'plaintext.construct',
+                '--output', before
+            ]
+            self.assertEqual(suite.main(args), 0)
+            with open(before) as f:
+                results = json.load(f)
+            self.assertEqual(
+                list(results['results']),
+                ['example.yafowil-plaintext.construct']
+            )
+
+            results['results']['example.yafowil-plaintext.construct'][
+                'min'] *= 2
+            with open(after, 'w') as f:
+                json.dump(results, f)
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertEqual(suite.main(['compare', before, after]), 1)
+                self.assertEqual(suite.main(['compare', after, before]), 0)
+            lines = out.getvalue().split('\n')
+            self.assertEqual(lines[0].split(), [
+                'benchmark', 'before', '(ms)', 'after', '(ms)', 'change'
+            ])
+            self.assertTrue(lines[1].endswith('+100.0%  REGRESSION'))
+            self.assertTrue(lines[3].endswith('-50.0%'))
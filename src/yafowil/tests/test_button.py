@@ -53,6 +53,20 @@ class TestButton(YafowilTestCase):
             'type="submit" value="Action name" />'
         ))
 
+        # Callable properties are evaluated on each rendering
+        disabled = [False]
+        widget = factory(
+            'submit',
+            name='SAVE',
+            props={
+                'action': True,
+                'label': 'Action name',
+                'disabled': lambda w, d: disabled[0],
+            })
+        self.assertFalse('disabled' in widget())
+        disabled[0] = True
+        self.assertTrue('disabled="disabled"' in widget())
+
     def test_button_blueprint(self):
         # Render button element
         widget = factory(
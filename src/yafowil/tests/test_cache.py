@@ -0,0 +1,279 @@
+from node.utils import UNSET
+from yafowil.base import Factory
+from yafowil.base import factory as base_factory
+from yafowil.cache import FileFragmentCache
+from yafowil.cache import FragmentCache
+from yafowil.cache import fingerprint
+from yafowil.cache import LRUFragmentCache
+from yafowil.cache import get_fragment_cache
+from yafowil.cache import set_fragment_cache
+from yafowil.tests import YafowilTestCase
+from yafowil.utils import attr_value
+import datetime
+import os
+import shutil
+import tempfile
+import time
+
+
+class TestCache(YafowilTestCase):
+
+    def test_FragmentCache(self):
+        cache = FragmentCache()
+        with self.assertRaises(NotImplementedError):
+            cache.get('key')
+        with self.assertRaises(NotImplementedError):
+            cache.set('key', u'markup')
+        with self.assertRaises(NotImplementedError):
+            cache.clear()
+
+    def test_LRUFragmentCache(self):
+        cache = LRUFragmentCache(size=2)
+        self.assertEqual(cache.get('a'), None)
+        cache.set('a', u'A')
+        cache.set('b', u'B')
+        self.assertEqual(cache.get('a'), u'A')
+        # least recently used markup gets dropped
+        cache.set('c', u'C')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), u'A')
+        self.assertEqual(cache.get('c'), u'C')
+        self.assertEqual((cache.hits, cache.misses), (3, 2))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+        # expired markup gets dropped
+        cache = LRUFragmentCache(ttl=0)
+        cache.set('a', u'A')
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(len(cache), 0)
+
+    def test_FileFragmentCache(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            directory = os.path.join(tempdir, 'fragments')
+            cache = FileFragmentCache(directory)
+            self.assertTrue(os.path.isdir(directory))
+            self.assertEqual(cache.get(('a', 1)), None)
+            cache.set(('a', 1), u'<p>\xe4</p>')
+            self.assertEqual(cache.get(('a', 1)), u'<p>\xe4</p>')
+            # other instances share the markup
+            self.assertEqual(
+                FileFragmentCache(directory).get(('a', 1)),
+                u'<p>\xe4</p>'
+            )
+            self.assertEqual(len(os.listdir(directory)), 1)
+            cache.clear()
+            self.assertEqual(os.listdir(directory), [])
+
+            # expired markup gets removed
+            cache = FileFragmentCache(directory, ttl=10)
+            cache.set('a', u'A')
+            self.assertEqual(cache.get('a'), u'A')
+            expired = time.time() - 20
+            os.utime(cache._path('a'), (expired, expired))
+            self.assertEqual(cache.get('a'), None)
+            self.assertEqual(os.listdir(directory), [])
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_widget_cache(self):
+        calls = []
+
+        def renderer(widget, data):
+            calls.append(widget.name)
+            value = data.extracted if data.extracted is not UNSET \
+                else data.value
+            return u'<p class="{0}">{1}</p>'.format(
+                attr_value('class', widget, data),
+                value
+            )
+
+        def extractor(widget, data):
+            return data.request[widget.dottedpath]
+
+        factory = Factory()
+        factory.register(
+            'record',
+            extractors=[extractor],
+            edit_renderers=[renderer],
+            display_renderers=[renderer]
+        )
+        cache = LRUFragmentCache()
+        widget = factory(
+            'record',
+            name='record',
+            value='value',
+            mode='display',
+            props={
+                'class': 'record',
+                'cache': cache
+            })
+        self.assertEqual(widget(), u'<p class="record">value</p>')
+        self.assertEqual(widget(), u'<p class="record">value</p>')
+        self.assertEqual(
+            u''.join(widget.iter_render()),
+            u'<p class="record">value</p>'
+        )
+        self.assertEqual(calls, ['record'])
+        self.assertEqual(len(cache), 1)
+
+        # markup is cached per value and mode
+        widget.getter = 'other'
+        self.assertEqual(widget(), u'<p class="record">other</p>')
+        widget.mode = 'edit'
+        self.assertEqual(widget(), u'<p class="record">other</p>')
+        widget.getter = 'value'
+        self.assertEqual(widget(), u'<p class="record">value</p>')
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(len(cache), 4)
+
+        # extracted values are considered
+        data = widget.extract({'record': 'extracted'})
+        self.assertEqual(widget(data=data), u'<p class="record">extracted</p>')
+        self.assertEqual(len(calls), 5)
+
+        # markup is not cached if translations are provided without locale
+        del calls[:]
+
+        def translate(widget, data):
+            data.translate_callable = lambda msg: msg
+            return data
+
+        widget.preprocessors = [('translate', translate)]
+        widget()
+        widget()
+        self.assertEqual(len(calls), 2)
+
+        def locale(widget, data):
+            data.translate_callable = lambda msg: msg
+            data.locale = 'de'
+            return data
+
+        widget.preprocessors = [('locale', locale)]
+        widget()
+        widget()
+        self.assertEqual(len(calls), 3)
+
+        # default fragment cache is used if ``cache`` is ``True``
+        default = get_fragment_cache()
+        self.assertIsInstance(default, LRUFragmentCache)
+        cache = LRUFragmentCache()
+        set_fragment_cache(cache)
+        try:
+            widget = factory(
+                'record',
+                name='record',
+                value='value',
+                props={
+                    'class': 'record',
+                    'cache': True
+                })
+            widget()
+            self.assertEqual(len(cache), 1)
+        finally:
+            set_fragment_cache(default)
+
+        # widgets are not cached by default
+        del calls[:]
+        widget = factory('record', name='record', props={'class': 'record'})
+        widget()
+        widget()
+        self.assertEqual(len(calls), 2)
+
+        # ``cache`` is considered from factory defaults and may be callable
+        cache = LRUFragmentCache()
+        factory.defaults['cache'] = cache
+        widget = factory('record', name='record', props={'class': 'record'})
+        widget()
+        widget()
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(cache), 1)
+        del factory.defaults['cache']
+        widget = factory(
+            'record',
+            name='record',
+            props={
+                'class': 'record',
+                'cache': lambda widget, data: cache
+            })
+        widget.getter = 'other'
+        widget()
+        widget()
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(len(cache), 2)
+
+        # markup is cached per widget definition, widgets with same dotted
+        # path do not share cached markup
+        cache = LRUFragmentCache()
+        first = factory(
+            'record',
+            name='record',
+            value='value',
+            props={'class': 'a', 'cache': cache}
+        )
+        second = factory(
+            'record',
+            name='record',
+            value='value',
+            props={'class': 'b', 'cache': cache}
+        )
+        self.assertEqual(first(), u'<p class="a">value</p>')
+        self.assertEqual(second(), u'<p class="b">value</p>')
+        self.assertEqual(len(cache), 2)
+
+        # clones share the definition until their attributes get modified
+        del calls[:]
+        clone = first.clone()
+        self.assertEqual(clone(), u'<p class="a">value</p>')
+        self.assertEqual(calls, [])
+        clone.attrs['class'] = 'c'
+        self.assertEqual(clone(), u'<p class="c">value</p>')
+        self.assertEqual(first(), u'<p class="a">value</p>')
+        self.assertEqual(calls, ['record'])
+
+        # markup is cached per theme and defaults version
+        del calls[:]
+        factory.defaults['record.other'] = 'other'
+        first()
+        first()
+        self.assertEqual(calls, ['record'])
+        theme = base_factory.theme
+        base_factory.theme = 'other'
+        try:
+            first()
+        finally:
+            base_factory.theme = theme
+        self.assertEqual(calls, ['record', 'record'])
+
+        # values without stable fingerprint are not cached
+        class Record(object):
+            def __str__(self):
+                return 'record'
+
+        del calls[:]
+        first.getter = Record()
+        self.assertEqual(first(), u'<p class="a">record</p>')
+        self.assertEqual(first(), u'<p class="a">record</p>')
+        self.assertEqual(calls, ['record', 'record'])
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint(UNSET), 'UNSET')
+        self.assertEqual(fingerprint(None), 'None')
+        self.assertEqual(fingerprint('a'), "'a'")
+        self.assertEqual(fingerprint(1), '1')
+        self.assertEqual(
+            fingerprint(datetime.date(2025, 1, 1)),
+            'datetime.date(2025, 1, 1)'
+        )
+        self.assertEqual(fingerprint(['a', 1]), "list('a', 1)")
+        self.assertEqual(fingerprint({'b', 'a'}), "set('a', 'b')")
+        self.assertEqual(
+            fingerprint({'b': 2, 'a': [1]}),
+            "dict('a': list(1), 'b': 2)"
+        )
+        self.assertEqual(fingerprint(object()), None)
+        self.assertEqual(fingerprint([object()]), None)
+        self.assertEqual(fingerprint({'a': object()}), None)
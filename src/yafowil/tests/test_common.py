@@ -4,6 +4,7 @@ from yafowil.base import factory
 from yafowil.tests import YafowilTestCase
 from yafowil.tests import fxml
 from yafowil.tests import wrapped_fxml
+import threading
 
 
 class TestCommon(YafowilTestCase):
@@ -247,6 +248,59 @@ class TestCommon(YafowilTestCase):
             mode='skip')
         self.assertEqual(widget(), '')
 
+    def test_concurrent_display_proxy(self):
+        # Display proxies do not modify widget attributes, widgets might get
+        # rendered concurrently
+        widgets = [
+            factory(
+                'text',
+                name='text',
+                value='value',
+                mode='display',
+                props={
+                    'display_proxy': True
+                }),
+            factory(
+                'number',
+                name='number',
+                value=1,
+                mode='display',
+                props={
+                    'display_proxy': True,
+                    'min': 0
+                }),
+            factory(
+                'checkbox',
+                name='checkbox',
+                value=True,
+                mode='display',
+                props={
+                    'display_proxy': True
+                }),
+        ]
+        for widget in widgets:
+            expected = widget()
+            self.assertTrue('type="hidden"' in expected)
+            self.assertFalse('min=' in expected)
+            errors = []
+            results = []
+
+            def render(widget=widget):
+                try:
+                    for _ in range(200):
+                        results.append(widget())
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=render) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(set(results), set([expected]))
+            self.assertFalse('type' in widget.attrs.storage)
+
     def test_bytes_datatype_rendering_and_extraction(self):
         widget = factory(
             'text',
@@ -6,6 +6,7 @@ from yafowil.controller import Controller
 from yafowil.tests import YafowilTestCase
 from yafowil.tests import fxml
 from yafowil.utils import Tag
+import asyncio
 
 
 ###############################################################################
@@ -906,3 +907,313 @@ class TestCompound(YafowilTestCase):
                  type="text" value=""/>
         </form>
         """, fxml(form()))
+
+    def test_iter_render(self):
+        form = factory(
+            'form',
+            name='form',
+            props={
+                'action': 'action'
+            })
+        fieldset = form['fieldset'] = factory(
+            'fieldset',
+            props={
+                'legend': 'Legend'
+            })
+        fieldset['text'] = factory(
+            'field:label:error:text',
+            props={
+                'label': 'Text',
+                'required': 'Text is required'
+            })
+        div = form['div'] = factory(
+            'div',
+            props={
+                'class': 'div',
+                'structural': True
+            })
+        div['number'] = factory('number')
+        form['leaf'] = factory('div', props={'leaf': True})
+        table = form['table'] = factory('table')
+        tr = table['tr'] = factory('tr')
+        tr['td'] = factory('td:text')
+        form['submit'] = factory(
+            'submit',
+            props={
+                'action': 'save',
+                'expression': True
+            })
+
+        # Compounds stream children fragments in document order
+        fragments = list(form.iter_render())
+        self.assertEqual(fragments[0], (
+            '<form action="action" enctype="multipart/form-data" '
+            'id="form-form" method="post" novalidate="novalidate">'
+        ))
+        self.assertEqual(
+            fragments[1],
+            '<fieldset id="fieldset-form-fieldset">'
+        )
+        self.assertEqual(fragments[2], '<legend>Legend</legend>')
+        self.assertEqual(fragments[-1], '</form>')
+        self.assertEqual(u''.join(fragments), form())
+
+        # Render extracted data
+        data = form.extract({'form.fieldset.text': ''})
+        self.assertTrue(data.has_errors)
+        self.assertEqual(
+            u''.join(form.iter_render(data=data)),
+            form(data=data)
+        )
+
+        # Display mode
+        form.mode = 'display'
+        fragments = list(form.iter_render())
+        self.assertEqual(fragments[0], '<div>')
+        self.assertEqual(u''.join(fragments), form())
+
+    def test_compound_async(self):
+        # Children of compounds get extracted concurrently
+        events = {}
+
+        async def wait_for_sibling(widget, data):
+            events[widget.name].set()
+            sibling = 'b' if widget.name == 'a' else 'a'
+            await asyncio.wait_for(events[sibling].wait(), 1)
+            return data.extracted
+
+        async def vocabulary(widget, data):
+            await asyncio.sleep(0)
+            return ['x', 'y']
+
+        form = factory(
+            'form',
+            name='form',
+            props={
+                'action': 'action'
+            })
+        form['a'] = factory(
+            '*wait:text',
+            custom={
+                'wait': {
+                    'extractors': [wait_for_sibling]
+                }
+            })
+        fieldset = form['fieldset'] = factory(
+            'fieldset',
+            props={
+                'structural': True
+            })
+        fieldset['b'] = factory(
+            '*wait:text',
+            custom={
+                'wait': {
+                    'extractors': [wait_for_sibling]
+                }
+            })
+        form['select'] = factory(
+            'select',
+            props={
+                'vocabulary': vocabulary
+            })
+
+        async def extract():
+            events['a'] = asyncio.Event()
+            events['b'] = asyncio.Event()
+            return await form.extract_async({
+                'form.a': 'A',
+                'form.b': 'B',
+                'form.select': 'y'
+            })
+
+        data = asyncio.run(extract())
+        self.assertEqual(list(data.keys()), ['a', 'b', 'select'])
+        self.assertEqual(data.extracted, odict([
+            ('a', 'A'),
+            ('b', 'B'),
+            ('select', 'y')
+        ]))
+        self.assertFalse(data.has_errors)
+
+        # Render with asynchronous vocabulary
+        rendered = asyncio.run(form.render_async(data=data))
+        self.assertTrue(
+            '<option id="input-form-select-y" selected="selected" '
+            'value="y">y</option>' in rendered
+        )
+        rendered = asyncio.run(form.render_async())
+        self.assertTrue(
+            '<option id="input-form-select-x" value="x">x</option>'
+            in rendered
+        )
+
+    def test_partial_extraction(self):
+        form = factory(
+            'form',
+            name='form',
+            props={
+                'action': 'action'
+            })
+        form['name'] = factory(
+            'text',
+            props={
+                'required': True
+            })
+        address = form['address'] = factory('fieldset')
+        address['street'] = factory(
+            'error:text',
+            props={
+                'required': True
+            })
+        structural = address['structural'] = factory(
+            'compound',
+            props={
+                'structural': True
+            })
+        structural['zip'] = factory(
+            'text',
+            props={
+                'required': True
+            })
+        request = {
+            'form.name': '',
+            'form.address.street': '',
+            'form.address.zip': '6020'
+        }
+
+        # Only widgets at given paths get extracted
+        data = form.extract(request, paths=['form.address.zip'])
+        self.assertTrue(data.partial)
+        self.assertEqual(list(data.keys()), ['address'])
+        self.assertTrue(data['address'].partial)
+        self.assertEqual(list(data['address'].keys()), ['zip'])
+        self.assertFalse(data['address']['zip'].partial)
+        self.assertEqual(data.fetch('form.address.zip').extracted, '6020')
+        self.assertEqual(data.extracted, odict([
+            ('address', odict([('zip', '6020')]))
+        ]))
+        self.assertFalse(data.has_errors)
+
+        # Selected compounds get extracted completely
+        data = form.extract(request, paths=['form.address', 'form.name'])
+        self.assertEqual(list(data.keys()), ['address', 'name'])
+        self.assertFalse(data['address'].partial)
+        self.assertEqual(list(data['address'].keys()), ['street', 'zip'])
+        self.assertTrue(data.has_errors)
+        self.assertEqual(data.extracted, odict([
+            ('address', odict([('street', ''), ('zip', '6020')])),
+            ('name', '')
+        ]))
+        data = form.extract(request, paths=['form'])
+        self.assertFalse(data.partial)
+        self.assertEqual(list(data.keys()), ['name', 'address'])
+
+        # Form renders after partial extraction
+        data = form.extract(request, paths=['form.address.street'])
+        rendered = form(data=data)
+        self.assertTrue(rendered.find('Mandatory field was empty') > -1)
+        self.assertTrue(rendered.find('id="input-form-name"') > -1)
+
+        # Asynchronous partial extraction
+        data = asyncio.run(form.extract_async(
+            request,
+            paths=['form.address.zip']
+        ))
+        self.assertTrue(data.partial)
+        self.assertEqual(data.extracted, odict([
+            ('address', odict([('zip', '6020')]))
+        ]))
+
+        # Invalid paths
+        with self.assertRaises(KeyError):
+            form.extract(request, paths=['other.name'])
+        with self.assertRaises(KeyError):
+            form.extract(request, paths=['form.address.inexistent'])
+
+    def test_render_path(self):
+        form = factory(
+            'form',
+            name='form',
+            value={
+                'address': {
+                    'street': 'Street'
+                }
+            },
+            props={
+                'action': 'action'
+            })
+        form['name'] = factory(
+            'error:text',
+            props={
+                'required': True
+            })
+        address = form['address'] = factory('fieldset')
+        address['street'] = factory(
+            'error:text',
+            props={
+                'required': True
+            })
+        structural = address['structural'] = factory(
+            'compound',
+            props={
+                'structural': True
+            })
+        structural['zip'] = factory(
+            'error:text',
+            props={
+                'required': True,
+                'valid_class': 'valid'
+            })
+
+        # Render without runtime data, values of compounds are delegated
+        rendered = form.render_path('form.address')
+        self.checkOutput("""
+        <fieldset id="fieldset-form-address">
+          <input class="required text" id="input-form-address-street"
+                 name="form.address.street" required="required" type="text"
+                 value="Street"/>
+          <input class="required text" id="input-form-address-zip"
+                 name="form.address.zip" required="required" type="text"
+                 value=""/>
+        </fieldset>
+        """, fxml(rendered))
+        rendered = form.render_path('form.address.zip', request={})
+        self.assertTrue(form(request={}).find(rendered) > -1)
+        self.assertEqual(form.render_path('form'), form())
+
+        # Render with extracted runtime data, the same markup as rendered
+        # as part of the form
+        request = {
+            'form.name': '',
+            'form.address.street': '',
+            'form.address.zip': '6020'
+        }
+        data = form.extract(request)
+        rendered = form.render_path('form.address', data=data)
+        self.assertTrue(rendered.find('Mandatory field was empty') > -1)
+        self.assertTrue(rendered.find('class="required text valid"') > -1)
+        self.assertTrue(form(data=data).find(rendered) > -1)
+
+        # Render with runtime data from partial extraction
+        data = form.extract(request, paths=['form.address.zip'])
+        rendered = form.render_path('form.address.zip', data=data)
+        self.assertEqual(rendered, (
+            '<input class="required text valid" id="input-form-address-zip" '
+            'name="form.address.zip" required="required" type="text" '
+            'value="6020" />'
+        ))
+        rendered = form.render_path('form.name', data=data)
+        self.assertTrue(rendered.find('Mandatory field was empty') == -1)
+        self.assertEqual(list(data.keys()), ['address', 'name'])
+
+        # Render path of non root widget
+        self.assertEqual(
+            address.render_path('form.address.zip', data=data['address']),
+            form.render_path('form.address.zip', data=data)
+        )
+
+        # Invalid paths
+        with self.assertRaises(KeyError):
+            form.render_path('other.name')
+        with self.assertRaises(KeyError):
+            form.render_path('form.address.inexistent')
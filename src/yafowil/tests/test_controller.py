@@ -1,5 +1,6 @@
 from yafowil.base import factory
 from yafowil.controller import Controller
+from yafowil.controller import action_index
 from yafowil.tests import fxml
 from yafowil.tests import YafowilTestCase
 
@@ -206,3 +207,241 @@ class TestController(YafowilTestCase):
         self.assertEqual(controller.actions[0].name, 'level1')
         self.assertEqual(controller.actions[1].name, 'level2')
         self.assertEqual(controller.actions[2].name, 'level3')
+
+    def test_action_index(self):
+        calls = []
+
+        def handler(widget, data):
+            calls.append(data.request['row'])
+
+        form = factory(
+            u'form',
+            name='form',
+            props={
+                'action': 'http://fubar.com'
+            })
+        for i in range(3):
+            row = form['row_{0}'.format(i)] = factory('fieldset')
+            row['delete'] = factory(
+                'submit',
+                props={
+                    'action': 'delete',
+                    'handler': handler
+                })
+        form['text'] = factory('text')
+
+        # Actions are indexed by request key in tree order
+        index = action_index(form)
+        self.assertEqual(list(index), [
+            'action.form.row_0.delete',
+            'action.form.row_1.delete',
+            'action.form.row_2.delete'
+        ])
+        self.assertEqual(
+            [item[0] for item in index.values()],
+            [0, 1, 2]
+        )
+        self.assertTrue(action_index(form) is index)
+
+        # Dispatch scans either the request or the index
+        controller = Controller(form, {
+            'action.form.row_1.delete': '1',
+            'row': 1
+        })
+        self.assertTrue(controller.performed)
+        self.assertEqual(calls, [1])
+        self.assertEqual(
+            [action.parent.name for action in controller.triggered_actions],
+            ['row_1']
+        )
+        request = dict([
+            ('form.text.{0}'.format(i), '') for i in range(3)
+        ])
+        request['action.form.row_2.delete'] = '1'
+        request['action.form.row_0.delete'] = '1'
+        request['row'] = 2
+        controller = Controller(form, request)
+        self.assertEqual(
+            [action.parent.name for action in controller.triggered_actions],
+            ['row_0', 'row_2']
+        )
+        self.assertEqual(calls, [1, 2, 2])
+
+        # Index is invalidated on tree modification
+        del form['row_0']
+        self.assertEqual(form._action_index, None)
+        self.assertEqual(list(action_index(form)), [
+            'action.form.row_1.delete',
+            'action.form.row_2.delete'
+        ])
+        form['row_1'].__name__ = 'renamed'
+        self.assertEqual(list(action_index(form)), [
+            'action.form.renamed.delete',
+            'action.form.row_2.delete'
+        ])
+        form['row_2']['delete'].attrs['action'] = False
+        self.assertEqual(list(action_index(form)), [
+            'action.form.renamed.delete'
+        ])
+
+    def test_lazy(self):
+        extracted = []
+
+        def count_extractor(widget, data):
+            extracted.append(widget.name)
+            return data.extracted
+
+        handled = []
+
+        def handler(widget, data):
+            handled.append(data.fetch('form.text').extracted)
+
+        def next(request):
+            return 'next'
+
+        form = factory(
+            u'form',
+            name='form',
+            props={
+                'action': 'http://fubar.com'
+            })
+        form['text'] = factory(
+            '*count:error:text',
+            props={
+                'required': True
+            },
+            custom={
+                'count': {
+                    'extractors': [count_extractor]
+                }
+            })
+        form['save'] = factory(
+            'submit',
+            props={
+                'action': 'save',
+                'handler': handler,
+                'next': next
+            })
+        form['cancel'] = factory(
+            'submit',
+            props={
+                'action': 'cancel',
+                'skip': True,
+                'next': next
+            })
+
+        # No action triggered, form renders without extraction
+        controller = Controller(form, {'form.text': 'value'}, lazy=True)
+        self.assertFalse(controller.performed)
+        self.assertEqual(extracted, [])
+        self.assertTrue(controller.rendered.find('id="input-form-text"') > -1)
+        self.assertEqual(extracted, [])
+
+        # Data gets extracted on access
+        self.assertEqual(controller.data.fetch('form.text').extracted, 'value')
+        self.assertEqual(extracted, ['text'])
+
+        # Skip action, no extraction
+        del extracted[:]
+        controller = Controller(form, {
+            'form.text': '',
+            'action.form.cancel': '1'
+        }, lazy=True)
+        self.assertFalse(controller.performed)
+        self.assertEqual(controller.next, 'next')
+        self.assertEqual(extracted, [])
+
+        # Action triggered, form gets extracted
+        controller = Controller(form, {
+            'form.text': 'value',
+            'action.form.save': '1'
+        }, lazy=True)
+        self.assertTrue(controller.performed)
+        self.assertFalse(controller.error)
+        self.assertEqual(controller.next, 'next')
+        self.assertEqual(extracted, ['text'])
+        self.assertEqual(handled, ['value'])
+
+        controller = Controller(form, {
+            'form.text': '',
+            'action.form.save': '1'
+        }, lazy=True)
+        self.assertTrue(controller.performed)
+        self.assertTrue(controller.error)
+        self.assertEqual(handled, ['value'])
+        self.assertTrue(
+            controller.rendered.find('Mandatory field was empty') > -1
+        )
+
+        # Non lazy controller extracts always
+        del extracted[:]
+        controller = Controller(form, {'form.text': 'value'})
+        self.assertEqual(extracted, ['text'])
+
+        # Lazy controller dispatches actions and ``next`` on the request
+        # converted by preprocessors of the root widget
+        class NativeRequest(object):
+            def __init__(self, params):
+                self.params = params
+
+        def convert_request(widget, data):
+            if isinstance(data.request, NativeRequest):
+                data.request = data.request.params
+            return data
+
+        requests = []
+
+        def next(request):
+            requests.append(request)
+            return 'next'
+
+        form = factory(
+            u'form',
+            name='form',
+            props={
+                'action': 'http://fubar.com'
+            })
+        form.preprocessors = [('convert', convert_request)]
+        form['text'] = factory(
+            '*count:text',
+            custom={
+                'count': {
+                    'extractors': [count_extractor]
+                }
+            })
+        form['cancel'] = factory(
+            'submit',
+            props={
+                'action': 'cancel',
+                'skip': True,
+                'next': next
+            })
+        del extracted[:]
+        controller = Controller(
+            form,
+            NativeRequest({'action.form.cancel': '1'}),
+            lazy=True
+        )
+        self.assertEqual(controller.triggered_actions, [form['cancel']])
+        self.assertTrue(controller.triggered(form['cancel']))
+        self.assertEqual(controller.next, 'next')
+        self.assertEqual(requests, [{'action.form.cancel': '1'}])
+        self.assertEqual(extracted, [])
+
+        # Preprocessors of the root widget run once if data gets extracted
+        preprocessed = []
+
+        def count_preprocessor(widget, data):
+            preprocessed.append(data.request)
+            return convert_request(widget, data)
+
+        form.preprocessors = [('count', count_preprocessor)]
+        controller = Controller(
+            form,
+            NativeRequest({'form.text': 'value'}),
+            lazy=True
+        )
+        self.assertEqual(len(preprocessed), 1)
+        self.assertEqual(controller.data.fetch('form.text').extracted, 'value')
+        self.assertEqual(len(preprocessed), 1)
+        self.assertEqual(extracted, ['text'])
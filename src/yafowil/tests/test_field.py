@@ -62,6 +62,19 @@ class TestField(YafowilTestCase):
         </div>
         """, wrapped_fxml(widget()))
 
+        # Callable title is evaluated on each rendering
+        title = ['A']
+        widget = factory(
+            'label:file',
+            name='MYFILE',
+            props={
+                'label': 'MY FILE',
+                'label.title': lambda w, d: title[0]
+            })
+        self.assertTrue('title="A"' in widget())
+        title[0] = 'B'
+        self.assertTrue('title="B"' in widget())
+
         # Label after widget
         widget = factory(
             'label:file',
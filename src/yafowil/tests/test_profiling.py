@@ -0,0 +1,175 @@
+from yafowil.base import ExtractionError
+from yafowil.base import factory
+from yafowil.profiling import ProfileCollector
+from yafowil.profiling import ProfileStats
+from yafowil.tests import YafowilTestCase
+import asyncio
+
+
+class TestProfiling(YafowilTestCase):
+
+    def test_ProfileStats(self):
+        stats = ProfileStats()
+        self.assertEqual(stats.mean, 0.)
+        stats.add(2., None)
+        stats.add(1., ExtractionError('error'))
+        self.assertEqual(stats.calls, 2)
+        self.assertEqual(stats.errors, 1)
+        self.assertEqual(stats.total, 3.)
+        self.assertEqual(stats.min, 1.)
+        self.assertEqual(stats.max, 2.)
+        self.assertEqual(stats.mean, 1.5)
+
+    def test_profiler_hooks(self):
+        calls = []
+
+        def profiler(dottedpath, part, phase, duration, exception):
+            calls.append((dottedpath, part, phase, exception))
+            self.assertTrue(duration >= 0.)
+
+        form = factory('form', name='form', props={'action': 'action'})
+        form['field'] = factory(
+            'error:text',
+            props={
+                'required': True
+            })
+
+        # Profilers affect widgets already created
+        factory.register_profiler(profiler)
+        form['other'] = factory('text')
+        data = form.extract({'form.field': '', 'form.other': 'value'})
+        # Each extractor of the text blueprint is reported, required
+        # extractor aborts extraction of field
+        self.assertEqual([call[:3] for call in calls], [
+            ('form.field', 'text', 'extract'),
+            ('form.field', 'text', 'extract'),
+            ('form.other', 'text', 'extract'),
+            ('form.other', 'text', 'extract'),
+            ('form.other', 'text', 'extract'),
+            ('form.other', 'text', 'extract'),
+            ('form', 'form', 'extract'),
+        ])
+        self.assertEqual(calls[0][3], None)
+        self.assertTrue(isinstance(calls[1][3], ExtractionError))
+        self.assertEqual(calls[2][3], None)
+
+        del calls[:]
+        form(data=data)
+        self.assertEqual([call[:3] for call in calls], [
+            ('form.field', 'text', 'render'),
+            ('form.field', 'error', 'render'),
+            ('form.other', 'text', 'render'),
+            ('form', 'form', 'render'),
+            ('form', 'form', 'render'),
+        ])
+
+        # Asynchronous extraction
+        del calls[:]
+        asyncio.run(form.extract_async({
+            'form.field': '',
+            'form.other': 'value'
+        }))
+        self.assertEqual(
+            sorted([call[:3] for call in calls]),
+            sorted([
+                ('form.field', 'text', 'extract'),
+                ('form.field', 'text', 'extract'),
+                ('form.other', 'text', 'extract'),
+                ('form.other', 'text', 'extract'),
+                ('form.other', 'text', 'extract'),
+                ('form.other', 'text', 'extract'),
+                ('form', 'form', 'extract'),
+            ])
+        )
+
+        # Streaming renderers are reported once
+        del calls[:]
+        u''.join(form.iter_render(data=data))
+        self.assertEqual(
+            sorted([call[:3] for call in calls]),
+            sorted([
+                ('form.field', 'text', 'render'),
+                ('form.field', 'error', 'render'),
+                ('form.other', 'text', 'render'),
+                ('form', 'form', 'render'),
+                ('form', 'form', 'render'),
+            ])
+        )
+
+        # Exceptions are reported and raised
+        def failing_renderer(widget, data):
+            raise ValueError('failed')
+
+        form['failing'] = factory(
+            '*custom',
+            custom={
+                'custom': {
+                    'edit_renderers': [failing_renderer]
+                }
+            })
+        del calls[:]
+        with self.assertRaises(ValueError):
+            form['failing']()
+        self.assertEqual(calls[0][:3], ('form.failing', 'custom', 'render'))
+        self.assertTrue(isinstance(calls[0][3], ValueError))
+        del form['failing']
+
+        # Unregistered profilers are not called any more
+        factory.unregister_profiler(profiler)
+        del calls[:]
+        form(data=form.extract({}))
+        self.assertEqual(calls, [])
+
+    def test_ProfileCollector(self):
+        form = factory('form', name='form', props={'action': 'action'})
+        for name in ['a', 'b']:
+            form[name] = factory(
+                'field:label:error:text',
+                props={
+                    'label': name,
+                    'required': True
+                })
+        collector = ProfileCollector()
+        factory.register_profiler(collector)
+        try:
+            form(data=form.extract({'form.a': 'a', 'form.b': ''}))
+        finally:
+            factory.unregister_profiler(collector)
+
+        self.assertEqual(
+            sorted(collector.parts),
+            [
+                ('extract', 'form'),
+                ('extract', 'text'),
+                ('render', 'error'),
+                ('render', 'field'),
+                ('render', 'form'),
+                ('render', 'label'),
+                ('render', 'text'),
+            ]
+        )
+        self.assertEqual(collector.parts[('extract', 'text')].calls, 6)
+        self.assertEqual(collector.parts[('extract', 'text')].errors, 1)
+        self.assertEqual(collector.paths[('render', 'form.a')].calls, 4)
+        self.assertEqual(collector.paths[('extract', 'form.b')].calls, 2)
+        self.assertEqual(collector.paths[('extract', 'form.b')].errors, 1)
+
+        lines = collector.report().split('\n')
+        self.assertEqual(lines[0].split(), [
+            'phase', 'chain', 'part', 'calls', 'errors',
+            'total', '(ms)', 'mean', '(ms)', 'max', '(ms)'
+        ])
+        self.assertEqual(len(lines), 17)
+        self.assertEqual(lines[8], '')
+        self.assertEqual(lines[9].split()[:3], ['phase', 'widget', 'path'])
+        self.assertTrue(
+            ['extract', 'text', '6', '1'] in [_.split()[:4] for _ in lines]
+        )
+        self.assertTrue(
+            ['render', 'form.a', '4', '0'] in [_.split()[:4] for _ in lines]
+        )
+        self.assertEqual(len(collector.report(limit=1).split('\n')), 6)
+
+        collector.clear()
+        self.assertEqual(collector.parts, {})
+        self.assertEqual(collector.paths, {})
@@ -3,11 +3,34 @@ from yafowil.base import ExtractionError
 from yafowil.base import factory
 from yafowil.compat import UNICODE_TYPE
 from yafowil.persistence import write_mapping_writer
+from yafowil.select import _membership
 from yafowil.tests import YafowilTestCase
 from yafowil.tests import fxml
 from yafowil.tests import wrapped_fxml
 from yafowil.utils import EMPTY_VALUE
+from yafowil.utils import LazyVocabulary
 import uuid
+import yafowil.select
+
+
+class NumberVocabulary(LazyVocabulary):
+
+    def __init__(self, count):
+        self.count = count
+        self.lookups = []
+
+    def term_for(self, key):
+        self.lookups.append(key)
+        if not isinstance(key, int) or not 0 <= key < self.count:
+            raise KeyError(key)
+        return u'Number {0}'.format(key)
+
+    def search(self, query=None, limit=None, offset=0):
+        stop = self.count if limit is None else min(offset + limit, self.count)
+        return [(i, self.term_for(i)) for i in range(offset, stop)]
+
+    def __len__(self):
+        return self.count
 
 
 class TestSelect(YafowilTestCase):
@@ -1565,3 +1588,288 @@ class TestSelect(YafowilTestCase):
         self.assertEqual(data.value, UNSET)
         self.assertEqual(data.extracted, ['one', 'two'])
         self.assertEqual(data.errors, [])
+
+    def test_select_membership(self):
+        # Selected and disabled values are looked up in a set
+        membership = _membership(['a', 'b', ['c']])
+        self.assertEqual(membership.hashed, set(['a', 'b']))
+        self.assertTrue('a' in membership)
+        self.assertFalse('c' in membership)
+        # Fallback for unhashable values
+        self.assertTrue(['c'] in membership)
+        self.assertFalse(['d'] in membership)
+        # Strings and empty values are kept
+        self.assertEqual(_membership('abc'), 'abc')
+        self.assertEqual(_membership([]), [])
+        self.assertTrue(_membership(True) is True)
+
+        widget = factory(
+            'select',
+            name='MYSELECT',
+            value=['one', 'three'],
+            props={
+                'multivalued': True,
+                'vocabulary': ['one', 'two', 'three'],
+                'disabled': ['three'],
+            })
+        self.checkOutput("""
+        <div>
+          <input id="exists-MYSELECT" name="MYSELECT-exists" type="hidden"
+                 value="exists"/>
+          <select class="select" id="input-MYSELECT" multiple="multiple"
+                  name="MYSELECT">
+            <option id="input-MYSELECT-one" selected="selected"
+                    value="one">one</option>
+            <option id="input-MYSELECT-two" value="two">two</option>
+            <option disabled="disabled" id="input-MYSELECT-three"
+                    selected="selected" value="three">three</option>
+          </select>
+        </div>
+        """, wrapped_fxml(widget()))
+
+    def test_select_compiled_options(self):
+        widget = factory(
+            'select',
+            name='MYSELECT',
+            value=['one'],
+            props={
+                'multivalued': True,
+                'vocabulary': [('one', 'One'), ('two', 'Two')],
+                'disabled': ['two'],
+            })
+        data = widget.extract({})
+        # module gets reloaded in test setup
+        select = yafowil.select
+        markers, options = select.select_compiled_options(
+            widget,
+            data,
+            [('one', 'One'), ('two', 'Two')],
+            None,
+            EMPTY_VALUE
+        )
+        self.assertEqual(
+            markers,
+            (' disabled="disabled"', ' selected="selected"')
+        )
+        self.assertEqual(options, [
+            ('one', ' id="input-MYSELECT-one"', ' value="one">One</option>'),
+            ('two', ' id="input-MYSELECT-two"', ' value="two">Two</option>')
+        ])
+
+        # Option markup gets spliced from compiled options
+        expected = (
+            '<option id="input-MYSELECT-one" selected="selected" '
+            'value="one">One</option><option disabled="disabled" '
+            'id="input-MYSELECT-two" value="two">Two</option>'
+        )
+        self.assertTrue(expected in widget())
+        compiled = select._compiled_options[widget][None]
+        self.assertTrue(expected in widget())
+        self.assertTrue(select._compiled_options[widget][None] is compiled)
+
+        # Changed vocabulary is compiled again
+        widget.attrs['vocabulary'] = [('three', 'Three')]
+        self.assertTrue('value="three">Three</option>' in widget())
+        self.assertFalse(select._compiled_options[widget][None] is compiled)
+
+        # Options are cached per locale
+        def translate(widget, data):
+            data.translate_callable = lambda msg: msg
+            data.locale = 'de'
+            return data
+
+        widget.preprocessors = [('translate', translate)]
+        widget()
+        self.assertEqual(
+            list(select._compiled_options[widget].keys()),
+            [None, 'de']
+        )
+
+        # Options are not cached if translations are provided without locale
+        widget = factory(
+            'select',
+            name='MYSELECT',
+            props={
+                'vocabulary': ['one'],
+            })
+
+        def translate(widget, data):
+            data.translate_callable = lambda msg: msg
+            return data
+
+        widget.preprocessors = [('translate', translate)]
+        widget()
+        self.assertFalse(widget in select._compiled_options)
+
+
+    def test_select_lazy_vocabulary(self):
+        vocab = NumberVocabulary(100000)
+        widget = factory(
+            'select',
+            name='MYSELECT',
+            value=[50000, 1],
+            props={
+                'multivalued': True,
+                'vocabulary': vocab,
+                'vocabulary_limit': 2,
+                'datatype': int,
+            })
+        # Selected terms are rendered followed by the first page of terms
+        self.checkOutput("""
+        <div>
+          <input id="exists-MYSELECT" name="MYSELECT-exists" type="hidden"
+                 value="exists"/>
+          <select class="select" id="input-MYSELECT" multiple="multiple"
+                  name="MYSELECT">
+            <option id="input-MYSELECT-50000" selected="selected"
+                    value="50000">Number 50000</option>
+            <option id="input-MYSELECT-1" selected="selected"
+                    value="1">Number 1</option>
+            <option id="input-MYSELECT-0" value="0">Number 0</option>
+          </select>
+        </div>
+        """, wrapped_fxml(widget()))
+
+        widget.attrs['format'] = 'single'
+        self.assertEqual(widget().count('type="checkbox"'), 3)
+
+        # Only displayed keys are looked up in display mode
+        del vocab.lookups[:]
+        widget.mode = 'display'
+        self.checkOutput("""
+        <ul class="display-select" id="display-MYSELECT">
+          <li>Number 50000</li>
+          <li>Number 1</li>
+        </ul>
+        """, fxml(widget()))
+        self.assertEqual(vocab.lookups, [50000, 1])
+
+        # Extracted keys are validated against vocabulary
+        widget.mode = 'edit'
+        data = widget.extract({
+            'MYSELECT-exists': 'exists',
+            'MYSELECT': ['2', '3']
+        })
+        self.assertEqual(data.errors, [])
+        self.assertEqual(data.extracted, [2, 3])
+        data = widget.extract({
+            'MYSELECT-exists': 'exists',
+            'MYSELECT': ['2', '100000']
+        })
+        self.assertEqual(
+            data.errors,
+            [ExtractionError('Selected value is not contained in vocabulary')]
+        )
+        # Conversion errors are left to datatype extractor
+        data = widget.extract({
+            'MYSELECT-exists': 'exists',
+            'MYSELECT': ['a']
+        })
+        self.assertEqual(len(data.errors), 1)
+        self.assertNotEqual(
+            data.errors[0].msg,
+            'Selected value is not contained in vocabulary'
+        )
+
+        # Callable vocabularies are not called on extraction unless
+        # validation is enabled explicitly
+        calls = []
+
+        def vocab_callable(widget, data):
+            calls.append(widget.name)
+            return vocab
+
+        widget.attrs['vocabulary'] = vocab_callable
+        data = widget.extract({
+            'MYSELECT-exists': 'exists',
+            'MYSELECT': ['2', '100000']
+        })
+        self.assertEqual(data.errors, [])
+        self.assertEqual(calls, [])
+        widget.attrs['vocabulary_validate'] = True
+        data = widget.extract({
+            'MYSELECT-exists': 'exists',
+            'MYSELECT': ['2', '100000']
+        })
+        self.assertEqual(
+            data.errors,
+            [ExtractionError('Selected value is not contained in vocabulary')]
+        )
+        self.assertEqual(calls, ['MYSELECT'])
+
+    def test_select_vocabulary_iterator(self):
+        consumed = []
+
+        def vocab(widget, data):
+            for key in ['one', 'two', 'three']:
+                consumed.append(key)
+                yield key, key.capitalize()
+
+        widget = factory(
+            'select',
+            name='MYSELECT',
+            value='two',
+            props={
+                'vocabulary': vocab,
+            })
+        # Iterators are consumed while rendering
+        self.checkOutput("""
+        <select class="select" id="input-MYSELECT" name="MYSELECT">
+          <option id="input-MYSELECT-one" value="one">One</option>
+          <option id="input-MYSELECT-two" selected="selected"
+                  value="two">Two</option>
+          <option id="input-MYSELECT-three" value="three">Three</option>
+        </select>
+        """, fxml(widget()))
+        self.assertEqual(consumed, ['one', 'two', 'three'])
+        self.assertFalse(widget in yafowil.select._compiled_options)
+
+        widget.attrs['format'] = 'single'
+        self.assertEqual(widget().count('type="radio"'), 3)
+
+        # Display lookups stop as soon as displayed keys are resolved
+        del consumed[:]
+        widget.mode = 'display'
+        self.checkOutput("""
+        <div class="display-select" id="display-MYSELECT">Two</div>
+        """, fxml(widget()))
+        self.assertEqual(consumed, ['one', 'two'])
+
+        del consumed[:]
+        widget.attrs['multivalued'] = True
+        widget.getter = ['one', 'two']
+        self.checkOutput("""
+        <ul class="display-select" id="display-MYSELECT">
+          <li>One</li>
+          <li>Two</li>
+        </ul>
+        """, fxml(widget()))
+        self.assertEqual(consumed, ['one', 'two'])
+
+        # Lists are looked up the same way
+        widget.attrs['vocabulary'] = [('one', 'One'), ('two', 'Two')]
+        self.assertTrue('<li>Two</li>' in widget())
+        widget.attrs['vocabulary'] = ['One', 'Two']
+        widget.getter = [1]
+        self.assertTrue('<li>Two</li>' in widget())
+
+        # Dict-like vocabularies are looked up directly by displayed keys
+        class Terms(object):
+            lookups = []
+
+            def keys(self):
+                raise AssertionError('Vocabulary must not be copied')
+
+            def __getitem__(self, key):
+                self.lookups.append(key)
+                return {'one': 'One', 'two': 'Two'}[key]
+
+        widget.attrs['vocabulary'] = Terms()
+        widget.getter = ['two', 'four']
+        self.checkOutput("""
+        <ul class="display-select" id="display-MYSELECT">
+          <li>Two</li>
+          <li>four</li>
+        </ul>
+        """, fxml(widget()))
+        self.assertEqual(Terms.lookups, ['two', 'four'])
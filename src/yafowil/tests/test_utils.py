@@ -3,13 +3,17 @@ from node.base import AttributedNode
 from node.base import OrderedNode
 from node.behaviors import Attributes
 from node.utils import UNSET
+from odict import odict
 from plumber import plumbing
 from yafowil.base import factory
 from yafowil.tests import YafowilTestCase
+from yafowil.utils import LazyVocabulary
 from yafowil.utils import Tag
 from yafowil.utils import as_data_attrs
 from yafowil.utils import attr_value
+from yafowil.utils import cached_vocabulary
 from yafowil.utils import callable_value
+from yafowil.utils import clear_vocabulary_cache
 from yafowil.utils import cssclasses
 from yafowil.utils import cssid
 from yafowil.utils import data_attrs_helper
@@ -18,9 +22,14 @@ from yafowil.utils import get_example
 from yafowil.utils import get_example_names
 from yafowil.utils import get_plugin_names
 from yafowil.utils import get_plugins
+from yafowil.utils import is_lazy_vocabulary
+from yafowil.utils import is_vocabulary_iterator
+from yafowil.utils import iter_vocabulary
 from yafowil.utils import managedprops
 from yafowil.utils import tag as deprecated_tag
 from yafowil.utils import vocabulary
+import gc
+import yafowil.utils
 
 
 class TestUtils(YafowilTestCase):
@@ -80,6 +89,136 @@ class TestUtils(YafowilTestCase):
         self.assertEqual(vocabulary(callme), [('bar', 'bar')])
         self.assertTrue(vocabulary(None) is None)
 
+    def test_vocabulary_cache(self):
+        clear_vocabulary_cache()
+        # normalized vocabularies are cached by identity
+        definition = ['a', ('b', 'B'), ('c',)]
+        vocab = vocabulary(definition)
+        self.assertEqual(vocab, [('a', 'a'), ('b', 'B'), ('c', 'c')])
+        self.assertTrue(vocabulary(definition) is vocab)
+        self.assertFalse(vocabulary(list(definition)) is vocab)
+        self.assertEqual(vocabulary(list(definition)), vocab)
+
+        # modifications of definition are detected
+        definition.append('d')
+        self.assertEqual(vocabulary(definition)[-1], ('d', 'd'))
+        definition[0] = 'e'
+        self.assertEqual(vocabulary(definition)[0], ('e', 'e'))
+        mapping = {'x': 'X'}
+        vocabulary(mapping)
+        mapping['x'] = 'Y'
+        self.assertEqual(vocabulary(mapping), [('x', 'Y')])
+
+        # iterators are not cached
+        self.assertEqual(vocabulary(iter(['a'])), [('a', 'a')])
+        self.assertEqual(vocabulary(_ for _ in ['a']), [('a', 'a')])
+
+        # least recently used definitions without weakref support are dropped
+        # if cache size is exceeded
+        size = yafowil.utils.VOCABULARY_CACHE_SIZE
+        yafowil.utils.VOCABULARY_CACHE_SIZE = 2
+        try:
+            x = {'x': 'X'}
+            y = ('y',)
+            x_vocab = vocabulary(x)
+            y_vocab = vocabulary(y)
+            self.assertTrue(vocabulary(x) is x_vocab)
+            vocabulary(['z'])
+            self.assertEqual(len(yafowil.utils._strong_vocabularies), 2)
+            self.assertTrue(vocabulary(x) is x_vocab)
+            self.assertFalse(vocabulary(y) is y_vocab)
+        finally:
+            yafowil.utils.VOCABULARY_CACHE_SIZE = size
+
+        # definitions supporting weakrefs are dropped if garbage collected
+        definition = odict([('a', 'A'), ('b', 'B')])
+        vocab = vocabulary(definition)
+        self.assertEqual(vocab, [('a', 'A'), ('b', 'B')])
+        self.assertTrue(vocabulary(definition) is vocab)
+        self.assertEqual(len(yafowil.utils._weak_vocabularies), 1)
+        del definition
+        gc.collect()
+        self.assertEqual(len(yafowil.utils._weak_vocabularies), 0)
+
+        clear_vocabulary_cache()
+        self.assertEqual(len(yafowil.utils._strong_vocabularies), 0)
+
+    def test_iter_vocabulary(self):
+        consumed = []
+
+        def rows():
+            for row in [('a', 'A'), ('b', 'B', 'x'), ('c',)]:
+                consumed.append(row)
+                yield row
+
+        self.assertTrue(is_vocabulary_iterator(rows()))
+        self.assertFalse(is_vocabulary_iterator([('a', 'A')]))
+
+        # iterators are consumed lazily
+        clear_vocabulary_cache()
+        entries = iter_vocabulary(rows())
+        self.assertEqual(next(entries), ('a', 'A'))
+        self.assertEqual(len(consumed), 1)
+        self.assertEqual(list(entries), [('b', 'B'), ('c', 'c')])
+        self.assertEqual(len(yafowil.utils._weak_vocabularies), 0)
+
+        # callables returning iterators are called
+        self.assertEqual(list(iter_vocabulary(rows)), [
+            ('a', 'A'), ('b', 'B'), ('c', 'c')
+        ])
+
+        # other definitions are normalized and cached
+        definition = ['a', 'b']
+        self.assertEqual(
+            list(iter_vocabulary(definition)),
+            [('a', 'a'), ('b', 'b')]
+        )
+        self.assertEqual(len(yafowil.utils._strong_vocabularies), 1)
+        self.assertEqual(list(iter_vocabulary('a')), [('a', 'a')])
+        clear_vocabulary_cache()
+
+    def test_LazyVocabulary(self):
+        vocab = LazyVocabulary()
+        with self.assertRaises(NotImplementedError):
+            vocab.term_for('key')
+        with self.assertRaises(NotImplementedError):
+            vocab.search('query', limit=10)
+        with self.assertRaises(NotImplementedError):
+            len(vocab)
+        self.assertTrue(is_lazy_vocabulary(vocab))
+        self.assertFalse(is_lazy_vocabulary(['a']))
+        # lazy vocabularies are not normalized
+        self.assertTrue(vocabulary(vocab) is vocab)
+
+    def test_cached_vocabulary(self):
+        calls = []
+
+        @cached_vocabulary(ttl=60)
+        def vocab(widget, data):
+            calls.append(widget)
+            return ['a', 'b']
+
+        widget = factory('select', name='select', props={'vocabulary': vocab})
+        widget()
+        widget()
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(
+            vocabulary(vocab(None, None)) is vocabulary(vocab(None, None))
+        )
+        vocab.clear()
+        widget()
+        self.assertEqual(len(calls), 2)
+
+        # expired definitions are recomputed
+        @cached_vocabulary(ttl=0)
+        def vocab(widget, data):
+            calls.append(widget)
+            return ['a', 'b']
+
+        vocab(None, None)
+        vocab(None, None)
+        self.assertEqual(len(calls), 4)
+
     def test_Tag(self):
         tag = Tag(lambda msg: msg)
         t = tag('p', b'Lorem Ipsum. ', u'Hello World!',
@@ -96,6 +235,61 @@ class TestUtils(YafowilTestCase):
         # deprecated test
         self.assertEqual(deprecated_tag('div', 'foo'), u'<div>foo</div>')
 
+    def test_CompiledTag(self):
+        tag = Tag(lambda msg: msg)
+        compiled = tag.compile('input', type='radio', class_='radio')
+        self.assertEqual(compiled.tag_name, 'input')
+        self.assertEqual(
+            compiled.static_attributes,
+            u' class="radio" type="radio"'
+        )
+
+        # No dynamic attributes
+        self.assertEqual(compiled(), u'<input class="radio" type="radio" />')
+        self.assertEqual(compiled(), tag('input', type='radio', class_='radio'))
+
+        # Dynamic attributes get merged with static attributes
+        self.assertEqual(
+            compiled(id='a', value=u'1', checked=None),
+            u'<input class="radio" id="a" type="radio" value="1" />'
+        )
+        self.assertEqual(
+            compiled(id='a', value=u'1', checked=None),
+            tag('input', type='radio', class_='radio', id='a', value=u'1',
+                checked=None)
+        )
+
+        # Dynamic attribute overrides static attribute
+        self.assertEqual(
+            compiled(class_='other'),
+            u'<input class="other" type="radio" />'
+        )
+        self.assertEqual(compiled(class_=None), u'<input type="radio" />')
+
+        # Inner content and data attributes
+        compiled = tag.compile('div', **{'data-foo': 'bar', 'class': None})
+        self.assertEqual(compiled.static_attributes, u' data-foo=\'bar\'')
+        self.assertEqual(
+            compiled(u'Hello', b' World', id='x'),
+            u'<div data-foo=\'bar\' id="x">Hello World</div>'
+        )
+
+        # Static attributes are translated at compile time
+        translated = []
+
+        def translate(msg):
+            translated.append(msg)
+            return msg.upper()
+
+        compiled = Tag(translate).compile('span', title='static')
+        self.assertEqual(translated, ['static'])
+        self.assertEqual(
+            compiled(title_='dynamic'),
+            u'<span title="DYNAMIC" />'
+        )
+        self.assertEqual(compiled('x'), u'<span title="STATIC">X</span>')
+        self.assertEqual(translated, ['static', 'dynamic', 'x'])
+
     def test_cssid(self):
         @plumbing(Attributes)
         class CSSTestNode(OrderedNode):
@@ -118,6 +312,36 @@ class TestUtils(YafowilTestCase):
         child = widget[u'Hällo Wörld'] = CSSTestNode()
         self.assertEqual(cssid(child, 'PREFIX'), 'PREFIX-form-Hallo_World')
 
+    def test_cssid_memo(self):
+        form = factory('form', name='form', props={'action': 'action'})
+        form[u'Hällo Wörld'] = factory('text')
+        child = form[u'Hällo Wörld']
+        self.assertEqual(cssid(child, 'PREFIX'), 'PREFIX-form-Hallo_World')
+        self.assertEqual(
+            cssid(child, 'PREFIX', postfix='POSTFIX'),
+            'PREFIX-form-Hallo_World-POSTFIX'
+        )
+        self.assertEqual(child._cssids, {
+            ('PREFIX', None): 'PREFIX-form-Hallo_World',
+            ('PREFIX', 'POSTFIX'): 'PREFIX-form-Hallo_World-POSTFIX'
+        })
+
+        # Unhashable postfix is not memoized
+        self.assertEqual(
+            cssid(child, 'PREFIX', postfix=['a']),
+            "PREFIX-form-Hallo_World-['a']"
+        )
+        self.assertEqual(len(child._cssids), 2)
+
+        # Structural widgets have no css id
+        child.attrs['structural'] = True
+        self.assertEqual(cssid(child, 'PREFIX'), None)
+        del child.attrs['structural']
+
+        # Memoized css ids are invalidated if dotted path changes
+        form.__name__ = 'renamed'
+        self.assertEqual(cssid(child, 'PREFIX'), 'PREFIX-renamed-Hallo_World')
+
     def test_css_classes(self):
         @plumbing(Attributes)
         class CSSTestNode(OrderedNode):
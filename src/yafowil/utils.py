@@ -1,13 +1,20 @@
 # -*- coding: utf-8 -*-
+from collections import OrderedDict
+from contextvars import ContextVar
 from importlib.metadata import entry_points
 from node.utils import UNSET
 from yafowil.compat import STR_TYPE
 from yafowil.compat import UNICODE_TYPE
 from zope.deferredimport import deprecated
+import functools
 import json
 import logging
+import operator
 import re
+import threading
+import time
 import unicodedata
+import weakref
 
 
 class EmptyValue(object):
@@ -111,34 +118,243 @@ def get_example_names():
     return result
 
 
+# normalized vocabularies by ``id`` of the definition. Definitions supporting
+# weak references are dropped when garbage collected, others like plain lists
+# and dicts are referenced by the cache and the least recently used ones are
+# dropped if ``VOCABULARY_CACHE_SIZE`` is exceeded.
+VOCABULARY_CACHE_SIZE = 256
+_weak_vocabularies = dict()
+_strong_vocabularies = OrderedDict()
+_vocabularies_lock = threading.Lock()
+
+
+def _is_dict_like(definition):
+    return hasattr(definition, '__getitem__') and hasattr(definition, 'keys')
+
+
+def _vocabulary_snapshot(definition):
+    # shallow copy of definition used to detect in place modifications
+    if _is_dict_like(definition):
+        keys = tuple(definition.keys())
+        if hasattr(definition, 'values'):
+            return keys + tuple(definition.values())
+        return keys + tuple([definition[_] for _ in keys])
+    return tuple(definition)
+
+
+def _cached_vocabulary(definition, snapshot):
+    key = id(definition)
+    entry = _weak_vocabularies.get(key)
+    if entry is not None:
+        cached = entry[0]()
+    else:
+        with _vocabularies_lock:
+            entry = _strong_vocabularies.get(key)
+            if entry is None:
+                return None
+            _strong_vocabularies.move_to_end(key)
+        cached = entry[0]
+    if cached is not definition:
+        return None
+    cached_snapshot = entry[1]
+    if (
+        len(cached_snapshot) != len(snapshot)
+        or not all(map(operator.is_, cached_snapshot, snapshot))
+    ):
+        return None
+    return entry[2]
+
+
+def _cache_vocabulary(definition, snapshot, vocab):
+    key = id(definition)
+
+    def evict(ref):
+        entry = _weak_vocabularies.get(key)
+        if entry is not None and entry[0] is ref:
+            del _weak_vocabularies[key]
+
+    try:
+        ref = weakref.ref(definition, evict)
+    except TypeError:
+        with _vocabularies_lock:
+            _strong_vocabularies[key] = (definition, snapshot, vocab)
+            _strong_vocabularies.move_to_end(key)
+            while len(_strong_vocabularies) > VOCABULARY_CACHE_SIZE:
+                _strong_vocabularies.popitem(last=False)
+    else:
+        _weak_vocabularies[key] = (ref, snapshot, vocab)
+
+
+def clear_vocabulary_cache():
+    """Drop all cached normalized vocabularies.
+    """
+    with _vocabularies_lock:
+        _weak_vocabularies.clear()
+        _strong_vocabularies.clear()
+
+
+def _iter_normalized(definition):
+    # dict-like
+    if _is_dict_like(definition):
+        for key in definition.keys():
+            yield key, definition[key]
+        return
+    # iterable
+    for entry in definition:
+        if isinstance(entry, STR_TYPE):
+            # entry is a string
+            yield entry, entry
+        elif hasattr(entry, '__iter__'):
+            # entry is a sequence
+            try:
+                count = len(entry)
+            except TypeError:
+                count = len([_ for _ in entry])
+            if count > 1:
+                # take first two parts and skips others
+                yield entry[0:2]
+            else:
+                # rare case, inner has one value only
+                yield entry[0], entry[0]
+
+
+def _normalize_vocabulary(definition):
+    return list(_iter_normalized(definition))
+
+
+def is_vocabulary_iterator(definition):
+    """Check whether definition is an iterator, which can be consumed once.
+    """
+    return hasattr(definition, '__next__')
+
+
+def iter_vocabulary(definition):
+    """Iterate bi-tuples of definition like returned by ``vocabulary``.
+
+    Iterators like generators reading from database cursors are consumed
+    once without building intermediate lists. Other definitions are
+    normalized via ``vocabulary`` and thus cached.
+    """
+    if callable(definition):
+        definition = definition()
+    if is_vocabulary_iterator(definition):
+        return _iter_normalized(definition)
+    return iter(vocabulary(definition))
+
+
 def vocabulary(definition):
     """Convert different kinds of input into a list of bi-tuples, both strings.
+
+    Normalized vocabularies of dict-like and iterable definitions are cached
+    by identity of the definition. Adding, removing or replacing entries of
+    the definition is detected, in place modifications of the entries
+    themselves are not. Iterators are not cached. The returned list is shared
+    and must not be modified.
+
+    Callable definitions are called on each lookup, use ``cached_vocabulary``
+    to reuse their result for a period of time.
     """
     if callable(definition):
         definition = definition()
     if isinstance(definition, STR_TYPE):
         return [(definition, definition), ]
-    # dict-like
-    if hasattr(definition, '__getitem__') and hasattr(definition, 'keys'):
-        return [(_, definition[_]) for _ in definition.keys()]
-    # iterable
-    if hasattr(definition, '__iter__'):
-        new_vocab = []
-        for entry in definition:
-            if isinstance(entry, STR_TYPE):
-                # entry is a string
-                new_vocab.append((entry, entry))
-            elif hasattr(entry, '__iter__'):
-                # entry is a sequence
-                parts = [_ for _ in entry]
-                if len(parts) > 1:
-                    # take first two parts and skips others
-                    new_vocab.append(entry[0:2])
-                else:
-                    # rare case, inner has one value only
-                    new_vocab.append((entry[0], entry[0]))
-        return new_vocab
-    return definition
+    if not _is_dict_like(definition):
+        if not hasattr(definition, '__iter__'):
+            return definition
+        if is_vocabulary_iterator(definition):
+            # iterators can be consumed only once
+            return _normalize_vocabulary(definition)
+    snapshot = _vocabulary_snapshot(definition)
+    vocab = _cached_vocabulary(definition, snapshot)
+    if vocab is None:
+        vocab = _normalize_vocabulary(definition)
+        _cache_vocabulary(definition, snapshot, vocab)
+    return vocab
+
+
+class LazyVocabulary(object):
+    """Base class of lazy vocabularies.
+
+    Lazy vocabularies are not materialized by the select blueprint. Only terms
+    of selected keys are looked up and a bounded page of terms is rendered.
+    Implementations must provide ``term_for``, ``search`` and ``__len__``.
+    """
+
+    def term_for(self, key):
+        """Return term for key. Raise ``KeyError`` if key is not contained.
+        """
+        raise NotImplementedError(
+            'Abstract ``LazyVocabulary`` does not implement ``term_for``'
+        )
+
+    def search(self, query=None, limit=None, offset=0):
+        """Return list of ``(key, term)`` tuples matching query.
+
+        If query is ``None``, all terms match. At most ``limit`` terms are
+        returned, starting at ``offset``.
+        """
+        raise NotImplementedError(
+            'Abstract ``LazyVocabulary`` does not implement ``search``'
+        )
+
+    def __len__(self):
+        """Return number of terms.
+        """
+        raise NotImplementedError(
+            'Abstract ``LazyVocabulary`` does not implement ``__len__``'
+        )
+
+
+def is_lazy_vocabulary(definition):
+    """Check whether definition provides the lazy vocabulary protocol.
+    """
+    return hasattr(definition, 'term_for') and hasattr(definition, 'search')
+
+
+class cached_vocabulary(object):
+    """Decorator for callable vocabularies.
+
+    The vocabulary definition returned by the decorated callable is reused for
+    ``ttl`` seconds. Since the same definition object is returned, its
+    normalized vocabulary is cached as well. Call arguments are ignored, the
+    decorated callable must not return different vocabularies per widget or
+    request::
+
+        @cached_vocabulary(ttl=300)
+        def countries(widget, data):
+            return load_countries()
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    def __call__(self, func):
+        ttl = self.ttl
+        lock = threading.Lock()
+        state = dict(definition=None, expires=0.)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kw):
+            now = time.monotonic()
+            if state['expires'] > now:
+                return state['definition']
+            with lock:
+                if state['expires'] <= now:
+                    state['definition'] = func(*args, **kw)
+                    state['expires'] = time.monotonic() + ttl
+                return state['definition']
+
+        def clear():
+            state['expires'] = 0.
+
+        wrapper.clear = clear
+        return wrapper
+
+
+def _join_attributes(formatted):
+    if not formatted:
+        return u''
+    return u' {0}'.format(u' '.join(sorted(formatted)))
 
 
 class Tag(object):
@@ -167,7 +383,42 @@ class Tag(object):
             <p class="fancy" id="2f5b8a234ff">Lorem Ipsum. Hello World.</p>
 
         """
-        cl = list()
+        formatted = [attr for _, attr in self._attributes(attributes)]
+        return self._markup(tag_name, _join_attributes(formatted), inners)
+
+    def compile(self, tag_name, **attributes):
+        """Create a ``CompiledTag`` for ``tag_name``.
+
+        Given attributes are static. They get translated and formatted once.
+        Output of the compiled tag is the same as calling this tag with
+        static and dynamic attributes.
+
+        Example::
+
+            >>> option = tag.compile('option', class_='fancy')
+            >>> option('Lorem Ipsum.', value='lorem')
+            <option class="fancy" value="lorem">Lorem Ipsum.</option>
+
+        """
+        return CompiledTag(self, tag_name, attributes)
+
+    def stream(self, tag_name, fragments, **attributes):
+        """Stream markup of tag with ``fragments`` as inner content.
+
+        ``fragments`` is an iterable of inner markup fragments. Yields opening
+        tag, translated fragments and closing tag. Joined output is the same
+        as calling this tag with the joined fragments as inner content.
+        """
+        formatted = [attr for _, attr in self._attributes(attributes)]
+        yield u'<{0}{1}>'.format(tag_name, _join_attributes(formatted))
+        for fragment in fragments:
+            yield self._inner(fragment)
+        yield u'</{0}>'.format(tag_name)
+
+    def _attributes(self, attributes):
+        """Return list of ``(name, formatted attribute)`` tuples.
+        """
+        formatted = list()
         for key, value in attributes.items():
             if value is None or value is UNSET:
                 continue
@@ -177,31 +428,30 @@ class Tag(object):
                     value = value.decode(self.encoding)
                 else:
                     value = str(value)
-            cl.append((key.strip('_'), value))
-        attributes = u''
-        # NOTE: data attributes are enclosed in single quotes, since this makes
-        # passing json lists possible. jQuery only recognizes JSON lists in
-        # data attributes as such, if they are enclosed in single quotes,
-        # because the JSON standard requires string values to be enclosed in
-        # double quotes.
-        if cl:
-            attributes = list()
-            for attr in cl:
-                if 'data-' in attr[0]:
-                    attributes.append(u"{0}='{1}'".format(*attr))
-                else:
-                    attributes.append(u'{0}="{1}"'.format(*attr))
-            attributes = u' {0}'.format(u' '.join(sorted(attributes)))
-        cl = list()
-        for inner in inners:
-            inner = self.translate(inner)
-            if not isinstance(inner, UNICODE_TYPE):
-                # XXX: inner = str(inner).decode(self.encoding)
-                if isinstance(inner, bytes):
-                    inner = inner.decode(self.encoding)
-                else:
-                    inner = str(inner)
-            cl.append(inner)
+            key = key.strip('_')
+            # NOTE: data attributes are enclosed in single quotes, since this
+            # makes passing json lists possible. jQuery only recognizes JSON
+            # lists in data attributes as such, if they are enclosed in single
+            # quotes, because the JSON standard requires string values to be
+            # enclosed in double quotes.
+            if 'data-' in key:
+                formatted.append((key, u"{0}='{1}'".format(key, value)))
+            else:
+                formatted.append((key, u'{0}="{1}"'.format(key, value)))
+        return formatted
+
+    def _inner(self, inner):
+        inner = self.translate(inner)
+        if not isinstance(inner, UNICODE_TYPE):
+            # XXX: inner = str(inner).decode(self.encoding)
+            if isinstance(inner, bytes):
+                inner = inner.decode(self.encoding)
+            else:
+                inner = str(inner)
+        return inner
+
+    def _markup(self, tag_name, attributes, inners):
+        cl = [self._inner(inner) for inner in inners]
         if not cl:
             return u'<{name}{attrs} />'.format(**{
                 'name': tag_name,
@@ -210,10 +460,45 @@ class Tag(object):
         return u'<{name}{attrs}>{value}</{name}>'.format(**{
             'name': tag_name,
             'attrs': attributes,
-            'value': u''.join(i for i in cl),
+            'value': u''.join(cl),
         })
 
 
+class CompiledTag(object):
+    """Tag with pre-formatted static attributes.
+
+    Only dynamic attributes passed at call time get translated and formatted.
+    A dynamic attribute overrides the static attribute with the same name.
+    """
+
+    def __init__(self, tag, tag_name, attributes):
+        self.tag = tag
+        self.tag_name = tag_name
+        self.static = tag._attributes(attributes)
+        self.static_attributes = _join_attributes(
+            [attr for _, attr in self.static]
+        )
+
+    def __call__(self, *inners, **attributes):
+        if not attributes:
+            return self.tag._markup(
+                self.tag_name,
+                self.static_attributes,
+                inners
+            )
+        names = set([key.strip('_') for key in attributes])
+        formatted = [
+            attr for name, attr in self.static
+            if name not in names
+        ]
+        formatted += [attr for _, attr in self.tag._attributes(attributes)]
+        return self.tag._markup(
+            self.tag_name,
+            _join_attributes(formatted),
+            inners
+        )
+
+
 # Deprecation message
 def _deprecated_null_localization(msg):
     logging.warning(
@@ -236,9 +521,71 @@ class managedprops(object):
         return func
 
 
+class async_extractor(object):
+    """Decorator providing an asynchronous variant of an extractor.
+
+    ``extractor`` is a coroutine function with the signature of the decorated
+    extractor. It is awaited by ``Widget.extract_async`` instead of calling
+    the decorated extractor. Extractors delegating extraction to child
+    widgets need to provide an asynchronous variant in order to extract
+    children with ``Widget.extract_async``.
+    """
+
+    def __init__(self, extractor):
+        self.__yafowil_async_extractor__ = extractor
+
+    def __call__(self, func):
+        func.__yafowil_async_extractor__ = self.__yafowil_async_extractor__
+        return func
+
+
+class stream_renderer(object):
+    """Decorator providing a streaming variant of a renderer.
+
+    ``stream`` is a generator function with signature
+    ``stream(widget, data, fragments)``. ``fragments`` is an iterator over the
+    markup fragments of the previous renderers in the chain. The generator
+    yields the markup fragments of the renderer in document order. It is used
+    by ``Widget.iter_render``, while calling the widget still uses the
+    decorated renderer.
+    """
+
+    def __init__(self, stream):
+        self.__yafowil_stream_renderer__ = stream
+
+    def __call__(self, func):
+        func.__yafowil_stream_renderer__ = self.__yafowil_stream_renderer__
+        return func
+
+
+# maximum number of memoized css ids per widget
+CSSID_CACHE_SIZE = 1000
+
+
 def cssid(widget, prefix, postfix=None):
+    """Return CSS id for widget by ``prefix`` and optional ``postfix``.
+
+    Computed ids are memoized on the widget until its dotted path changes.
+    """
     if widget.attrs.get('structural', False):
         return None
+    cache = getattr(widget, '_cssids', None)
+    if cache is None:
+        return _compute_cssid(widget, prefix, postfix)
+    key = (prefix, postfix)
+    try:
+        return cache[key]
+    except KeyError:
+        value = _compute_cssid(widget, prefix, postfix)
+        if len(cache) < CSSID_CACHE_SIZE:
+            cache[key] = value
+        return value
+    except TypeError:
+        # unhashable postfix
+        return _compute_cssid(widget, prefix, postfix)
+
+
+def _compute_cssid(widget, prefix, postfix):
     path = widget.dottedpath.replace(u'.', u'-')
     cssid = u'{0}-{1}'.format(prefix, path)
     if postfix is not None:
@@ -248,12 +595,27 @@ def cssid(widget, prefix, postfix=None):
         .replace(b' ', b'_').decode()
 
 
+# Results of awaited coroutine function values of widgets, mapped by
+# ``(id(value), id(widget))``. Set while asynchronously extracting or
+# rendering a widget tree.
+_awaited_values = ContextVar('yafowil_awaited_values', default=None)
+
+
 def callable_value(value, widget, data):
     """Call value if callable with widget and data as arguments and return
     the callables return value. If value not callable, return as is.
+
+    If value is a coroutine function already awaited by
+    ``Widget.extract_async`` or ``Widget.render_async``, the awaited result
+    is returned.
     """
     if not callable(value):
         return value
+    awaited = _awaited_values.get()
+    if awaited:
+        key = (id(value), id(widget))
+        if key in awaited:
+            return awaited[key]
     return value(widget, data)
 
 